@@ -0,0 +1,108 @@
+# The frames of the animations of the pygame renderer
+# Every frame is made once, the first time it is needed, and kept, so playing an animation is one blit
+# per frame and never scales or composes an image while it plays:
+# - a placed piece fades and scales in on its cell background
+# - the winning line sweeps from its first cell to its last cell
+# - a full screen window cross-fades over the previous one
+
+import pygame as pg
+
+# Constants
+PIECE_FRAMES = 8
+LINE_FRAMES = 15
+FADE_FRAMES = 12
+LINE_COLOR = (255, 215, 0)
+LINE_WIDTH = 12
+
+# Classes
+
+
+class AnimationFrames:
+    '''Makes and caches the frames of the animations for the images of an Assets object'''
+
+    def __init__(self, assets):
+        '''Initializes the empty caches
+        assets: The Assets object the images come from
+        piece_frames: A dictionary of the piece image, the background and the offset and their frames
+        line_frames: A dictionary of the start and end points of a line and their frames
+        fade_images: A dictionary of the window ids and their opaque copies used to fade them in
+        '''
+        self.assets = assets
+        self.piece_frames = {}
+        self.line_frames = {}
+        self.fade_images = {}
+
+    def get_piece_frames(self, piece, background, offset):
+        '''Returns the frames of a piece fading and scaling in on its cell, as images the size of the cell
+        piece: The image of the piece (X or O)
+        background: The image of the empty cell
+        offset: The position of the piece on the cell
+        '''
+        key = (id(piece), id(background), offset)
+        if key not in self.piece_frames:
+            frames = []
+            width, height = piece.get_size()
+            for i in range(1, PIECE_FRAMES + 1):
+                scale = i / PIECE_FRAMES
+                scaled_piece = pg.transform.smoothscale(
+                    piece, (max(1, int(width * scale)), max(1, int(height * scale))))
+                scaled_piece.set_alpha(int(255 * scale))
+
+                # The piece grows from the center of its final place
+                frame = background.copy()
+                frame.blit(scaled_piece, (offset[0] + (width - scaled_piece.get_width()) // 2,
+                                          offset[1] + (height - scaled_piece.get_height()) // 2))
+                frames.append(frame)
+            self.piece_frames[key] = frames
+        return self.piece_frames[key]
+
+    def get_line_frames(self, start, end):
+        '''Returns the line image and the areas of it drawn by each frame of the sweep
+        start: The point of the screen the line starts from
+        end: The point of the screen the line ends at
+        Returns the position of the line image on the screen, the image and the list of the areas
+        '''
+        key = (start, end)
+        if key not in self.line_frames:
+            bounds = pg.Rect(min(start[0], end[0]), min(start[1], end[1]),
+                             abs(end[0] - start[0]) + 1, abs(end[1] - start[1]) + 1).inflate(LINE_WIDTH * 2, LINE_WIDTH * 2)
+            image = pg.Surface(bounds.size, pg.SRCALPHA)
+            local_start = (start[0] - bounds.left, start[1] - bounds.top)
+            local_end = (end[0] - bounds.left, end[1] - bounds.top)
+
+            # The line is opaque, so drawing the same part again in the next frame does not change it
+            pg.draw.line(image, LINE_COLOR, local_start, local_end, LINE_WIDTH)
+            pg.draw.circle(image, LINE_COLOR, local_start, LINE_WIDTH // 2)
+            pg.draw.circle(image, LINE_COLOR, local_end, LINE_WIDTH // 2)
+
+            areas = []
+            for i in range(1, LINE_FRAMES + 1):
+                t = i / LINE_FRAMES
+                point = (local_start[0] + (local_end[0] - local_start[0]) * t,
+                         local_start[1] + (local_end[1] - local_start[1]) * t)
+                area = pg.Rect(min(local_start[0], point[0]), min(local_start[1], point[1]),
+                               abs(point[0] - local_start[0]) + 1, abs(point[1] - local_start[1]) + 1)
+                areas.append(area.inflate(LINE_WIDTH * 2, LINE_WIDTH * 2).clip(image.get_rect()))
+            self.line_frames[key] = (bounds.topleft, image, areas)
+        return self.line_frames[key]
+
+    def get_fade_image(self, window, cache=True):
+        '''Returns an opaque copy of a full screen window whose alpha can be set for each frame of a fade
+        window: The image of the window
+        cache: A boolean that represents whether the copy is kept or not, windows that change must not be kept
+        '''
+        if not cache:
+            return window.convert() if pg.display.get_surface() is not None else window.copy()
+        if id(window) not in self.fade_images:
+            self.fade_images[id(window)] = self.get_fade_image(window, False)
+        return self.fade_images[id(window)]
+
+# Functions
+
+
+def get_fade_alphas():
+    '''Returns the alpha of each frame of a cross-fade
+    Every frame is blitted over the previous one, so blending 1 / (n - k + 1) of the window at the frame k
+    shows k / n of the window after it
+    '''
+    return [int(255 / (FADE_FRAMES - k + 1)) for k in range(1, FADE_FRAMES)]
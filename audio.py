@@ -0,0 +1,115 @@
+# The audio of the Tic Tac Toe game
+# The mixer is opened with a small buffer so that a sound starts right after a button press
+# Every class of sound effects has its own reserved channels, so a long sound never steals the channel of a click
+# Sounds can be queued from any thread, one audio thread plays them and measures the latency
+
+import collections
+import queue
+import threading
+import time
+import pygame as pg
+
+# Constants
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 256
+EFFECT_CHANNELS = {
+    'ui': ['click_button', 'alert'],
+    'move': ['select', 'start_game'],
+    'result': ['won_game', 'announce_champion'],
+}
+CHANNELS_PER_EFFECT_CLASS = {'ui': 2, 'move': 2, 'result': 1}
+LATENCY_SAMPLES = 100
+
+# Classes
+
+
+class AudioManager:
+    '''Plays the sound effects on reserved channels from a queue that any thread can use'''
+
+    def __init__(self, sounds):
+        '''Initializes the manager with the sounds and starts the audio thread, the mixer must be initialized
+        sounds: A dictionary of the sound names and their pygame Sound objects
+        channels: A dictionary of the effect classes and their reserved channels
+        effect_classes: A dictionary of the sound names and their effect class
+        next_channel: A dictionary of the effect classes and the index of the channel to use next
+        latencies: The latencies of the last sounds, from the request to the sound leaving the buffer
+        '''
+        self.sounds = sounds
+        self.effect_classes = {}
+        self.channels = {}
+        self.next_channel = {}
+
+        # Reserve the first channels so that pygame never gives them to other sounds
+        pg.mixer.set_reserved(sum(CHANNELS_PER_EFFECT_CLASS.values()))
+        channel_id = 0
+        for effect_class, names in EFFECT_CHANNELS.items():
+            self.channels[effect_class] = []
+            for _ in range(CHANNELS_PER_EFFECT_CLASS[effect_class]):
+                self.channels[effect_class].append(pg.mixer.Channel(channel_id))
+                channel_id += 1
+            self.next_channel[effect_class] = 0
+            for name in names:
+                self.effect_classes[name] = effect_class
+
+        # The time the mixer buffer needs to be played
+        frequency, size, channels = pg.mixer.get_init()
+        self.buffer_latency = MIXER_BUFFER / frequency
+
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.requests = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def play(self, name, request_time=None):
+        '''Queues a sound effect, it can be called from any thread
+        name: The name of the sound
+        request_time: The time.perf_counter() of the button press, the time of the call is used if it is None
+        '''
+        if request_time is None:
+            request_time = time.perf_counter()
+        self.requests.put((name, request_time))
+
+    def run(self):
+        '''Plays the queued sound effects'''
+        while True:
+            name, request_time = self.requests.get()
+            try:
+                self.play_now(name)
+            except Exception as e:
+                print('\n')
+                print(e)
+                continue
+            self.latencies.append(
+                time.perf_counter() - request_time + self.buffer_latency)
+
+    def play_now(self, name):
+        '''Plays the sound on the next reserved channel of its effect class'''
+        effect_class = self.effect_classes.get(name, 'ui')
+        channels = self.channels[effect_class]
+
+        # Use an idle channel of the class if there is one, else the one that has played the longest
+        index = self.next_channel[effect_class]
+        for i in range(len(channels)):
+            if not channels[(index + i) % len(channels)].get_busy():
+                index = (index + i) % len(channels)
+                break
+        self.next_channel[effect_class] = (index + 1) % len(channels)
+
+        channels[index].play(self.sounds[name])
+
+    def get_latency_report(self):
+        '''Returns the number of measured sounds and the average and maximum latency in milliseconds'''
+        latencies = list(self.latencies)
+        if not latencies:
+            return 0, 0, 0
+        return len(latencies), sum(latencies) / len(latencies) * 1000, max(latencies) * 1000
+
+# Functions
+
+
+def pre_init_mixer():
+    '''Sets the mixer settings, it must be called before pygame is initialized'''
+    pg.mixer.pre_init(MIXER_FREQUENCY, MIXER_SIZE,
+                      MIXER_CHANNELS, MIXER_BUFFER)
@@ -0,0 +1,243 @@
+# Audits the heuristic computer player on every position it can be asked to play
+# Every reachable position where player 2 (the computer) is to move is given to heuristic_candidate_moves,
+# and every candidate it can pick with random.choice is compared with the game-theoretic value of the position
+# The lines of the heuristic run for a position are traced, so a bad candidate is reported with the branch
+# of the big position table (or the win, block or fallback step) that added it
+# The positions are split over all the cores and the report is cached until the code of the heuristic changes
+#
+# Usage: python audit.py [--processes N] [--no-cache]
+
+import argparse
+import ast
+import inspect
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from game_core import LINES, heuristic_candidate_moves
+from move_cache import get_code_version
+
+# Constants
+AUDIT_FILE = 'audit_cache.json'
+LOSS = -1
+DRAW = 0
+WIN = 1
+VALUE_NAMES = {LOSS: 'loss', DRAW: 'draw', WIN: 'win'}
+CHUNK_SIZE = 200
+
+# The solved positions of the worker process
+values = {}
+
+# Functions
+
+
+def get_winner(game_board):
+    '''Returns the player who has a line on the board, 0 if nobody has one'''
+    for line in LINES:
+        if game_board[line[0]] == game_board[line[1]] == game_board[line[2]] != 0:
+            return game_board[line[0]]
+    return 0
+
+
+def get_value(game_board, mover):
+    '''Returns the value of the position for the player to move with perfect play (LOSS, DRAW or WIN)'''
+    key = (game_board, mover)
+    if key not in values:
+        if get_winner(game_board) != 0:
+            # The last move made a line, so the player to move has lost
+            value = LOSS
+        elif 0 not in game_board:
+            value = DRAW
+        else:
+            value = max(-get_value(game_board[:cell] + (mover,) + game_board[cell + 1:], 3 - mover)
+                        for cell in range(9) if game_board[cell] == 0)
+        values[key] = value
+    return values[key]
+
+
+def get_positions():
+    '''Returns every reachable position where player 2 is to move, either player can have played first'''
+    positions = []
+    for game_board in itertools.product((0, 1, 2), repeat=9):
+        ones = game_board.count(1)
+        twos = game_board.count(2)
+        # Player 2 moves when it played first and the counts are equal, or when player 1 has one more piece
+        if ones not in (twos, twos + 1) or 0 not in game_board or get_winner(game_board) != 0:
+            continue
+        positions.append(game_board)
+    return positions
+
+
+def get_branches():
+    '''Returns a dictionary of the line numbers of heuristic_candidate_moves and the branch that adds moves there
+    A branch is the name of the step, the own piece it is next to and its condition, and the cells it adds
+    '''
+    source_lines, first_line = inspect.getsourcelines(
+        heuristic_candidate_moves)
+    branches = {}
+    position = None
+    condition = None
+    returns = 0
+    for i, line in enumerate(source_lines):
+        text = line.strip()
+        line_number = first_line + i
+        if text.startswith(('if position ==', 'elif position ==')):
+            position = int(text.split('==')[1].strip(' :'))
+        elif text.startswith(('if can_', 'elif can_')):
+            condition = text.split(' ', 1)[1].rstrip(':')
+        elif text.startswith('possible_moves = add_available_positions('):
+            cells = ast.literal_eval(source_lines[i + 1].strip().split(', ', 1)[1].rstrip(')'))
+            branches[line_number] = ('table: position == {}, {}'.format(position, condition), cells)
+        elif text.startswith('return [move + 1]'):
+            # The rows, columns and diagonals are checked for a win first, then for a block
+            branches[line_number] = ('win' if returns < 3 else 'block', None)
+            returns += 1
+        elif text.startswith('return [move + 1 for move in all_possible_moves]'):
+            branches[line_number] = ('fallback: any empty cell', None)
+    return branches
+
+
+def trace_candidate_moves(game_board):
+    '''Returns the candidate moves of the heuristic for the board and the line numbers it ran'''
+    code = heuristic_candidate_moves.__code__
+    line_numbers = []
+
+    def trace(frame, event, arg):
+        if frame.f_code is not code:
+            return None
+        if event == 'line':
+            line_numbers.append(frame.f_lineno)
+        return trace
+
+    sys.settrace(trace)
+    try:
+        moves = heuristic_candidate_moves(list(game_board))
+    finally:
+        sys.settrace(None)
+    return moves, line_numbers
+
+
+def get_move_branch(move, line_numbers, branches):
+    '''Returns the name of the branch that made the move a candidate'''
+    for line_number in line_numbers:
+        branch = branches.get(line_number)
+        if branch is None:
+            continue
+        name, cells = branch
+        if cells is None or move - 1 in cells:
+            return name
+    return 'unknown'
+
+
+def audit_positions(positions):
+    '''Audits the positions and returns the bad candidates as (branch, kind, board, move, best value, move value)'''
+    branches = get_branches()
+    findings = []
+    for game_board in positions:
+        best_value = get_value(game_board, 2)
+        moves, line_numbers = trace_candidate_moves(game_board)
+        for move in set(moves):
+            branch = get_move_branch(move, line_numbers, branches)
+            if game_board[move - 1] != 0:
+                findings.append((branch, 'illegal', game_board, move, best_value, None))
+                continue
+
+            child = game_board[:move - 1] + (2,) + game_board[move:]
+            move_value = -get_value(child, 1)
+            if move_value < best_value:
+                kind = 'loss' if move_value == LOSS else 'draw instead of win'
+                findings.append((branch, kind, game_board, move, best_value, move_value))
+    return len(positions), findings
+
+
+def run_audit(processes=None):
+    '''Audits every position on a process pool and returns the report'''
+    positions = get_positions()
+    chunks = [positions[i:i + CHUNK_SIZE]
+              for i in range(0, len(positions), CHUNK_SIZE)]
+
+    audited = 0
+    findings = []
+    with multiprocessing.Pool(processes) as pool:
+        for count, chunk_findings in pool.imap_unordered(audit_positions, chunks):
+            audited += count
+            findings.extend(chunk_findings)
+
+    # Group the bad candidates by branch and kind, with the first board as an example
+    groups = {}
+    for branch, kind, game_board, move, best_value, move_value in sorted(findings):
+        group = groups.setdefault((branch, kind), {
+            'branch': branch, 'kind': kind, 'count': 0,
+            'example': {'board': format_board(game_board), 'move': move,
+                        'best': VALUE_NAMES[best_value],
+                        'move_value': VALUE_NAMES.get(move_value, 'illegal')}})
+        group['count'] += 1
+
+    return {'positions': audited,
+            'bad_candidates': len(findings),
+            'positions_with_bad_candidates': len(set(finding[2] for finding in findings)),
+            'branches': sorted(groups.values(), key=lambda group: -group['count'])}
+
+
+def format_board(game_board):
+    '''Returns the board as 3 rows of ., O (player 1) and X (player 2)'''
+    symbols = ''.join('.OX'[value] for value in game_board)
+    return '/'.join(symbols[i:i + 3] for i in range(0, 9, 3))
+
+
+def load_report(version):
+    '''Returns the cached report of the version of the heuristic, or None'''
+    if not os.path.exists(AUDIT_FILE):
+        return None
+    try:
+        with open(AUDIT_FILE) as file:
+            cache = json.load(file)
+    except (OSError, ValueError) as e:
+        print('Error while loading the audit cache: {}'.format(e))
+        return None
+    return cache['report'] if cache.get('version') == version else None
+
+
+def save_report(version, report):
+    '''Saves the report with the version of the heuristic it was made for'''
+    try:
+        with open(AUDIT_FILE, 'w') as file:
+            json.dump({'version': version, 'report': report}, file)
+    except OSError as e:
+        print('Error while saving the audit cache: {}'.format(e))
+
+
+def print_report(report):
+    '''Prints the report, one line per branch and kind of bad candidate'''
+    print('Positions with player 2 to move: {}'.format(report['positions']))
+    print('Positions with a bad candidate: {}'.format(
+        report['positions_with_bad_candidates']))
+    print('Bad candidates: {}'.format(report['bad_candidates']))
+    print('\n{:>6}  {:<20}{:<48}{}'.format(
+        'Count', 'Kind', 'Branch', 'Example (board, move, best -> move value)'))
+    for group in report['branches']:
+        example = group['example']
+        print('{:>6}  {:<20}{:<48}{} {} {} -> {}'.format(
+            group['count'], group['kind'], group['branch'], example['board'], example['move'],
+            example['best'], example['move_value']))
+
+
+# Main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Audit the heuristic computer player on every position')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='the number of worker processes, all the cores by default')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='audit again even if the heuristic has not changed')
+    args = parser.parse_args()
+
+    version = get_code_version(heuristic_candidate_moves)
+    report = None if args.no_cache else load_report(version)
+    if report is None:
+        report = run_audit(args.processes)
+        save_report(version, report)
+    else:
+        print('The heuristic has not changed, using the cached audit')
+    print_report(report)
@@ -0,0 +1,159 @@
+# Plays a cabinet as a player of a table of the game server
+# The navigation and select buttons choose and select a cell like in a local game, the move is sent to the server
+# and the LEDs show the board the server replies or pushes, so a cabinet and remote players share one table
+# The back button leaves the table. The screen of the cabinet is not used, the state is printed
+#
+# Usage: python cabinet_client.py [--config FILE] [--host HOST] [--port PORT] [--table N] [--computer]
+
+import argparse
+import asyncio
+from pyfirmata import util
+from cabinet_config import CONFIG_FILE, PinTable, load_config, open_board
+from game_core import GameRules
+from serial_writer import SerialWriter
+from server import ERROR, PORT, REPLY, GameClient, decode_state
+from tictactoe import Led, blink_all
+
+# Classes
+
+
+class RemoteCabinet:
+    '''Plays the buttons and LEDs of a cabinet on a table of the game server'''
+
+    def __init__(self, config, board, table, computer_vs_human_mode=False):
+        '''Resolves the pins of the board and creates the LEDs
+        config: The CabinetConfig of the board
+        board: The Arduino board object
+        table: The number of the table to join
+        computer_vs_human_mode: A boolean that represents whether the cabinet plays against the computer or not
+        rules: The rules on the LEDs, they only move the highlighted cell, the server plays the moves
+        player: The player of the cabinet on the table (1 or 2), 0 before it has joined
+        state: The last state of the table, see decode_state
+        '''
+        self.config = config
+        self.table = table
+        self.computer_vs_human_mode = computer_vs_human_mode
+        pin_table = PinTable(board, config)
+        self.serial_writer = SerialWriter(board)
+        self.rules = GameRules([Led(pin, board, self.serial_writer, pin_table.leds[pin])
+                                for pin in config.led_pins.values()])
+        self.buttons = [pin_table.nav_button, pin_table.select_button, pin_table.back_button]
+        for button in self.buttons:
+            button.enable_reporting()
+        self.last_button_states = [False, False, False]
+        self.player = 0
+        self.state = None
+
+    def is_my_turn(self):
+        '''Returns True if the cabinet can play a move'''
+        cells, player, current_player, remaining_chances, finished, score, champion = self.state
+        return not finished and current_player == self.player
+
+    def apply_state(self, reply):
+        '''Shows the state of a reply or a pushed state on the LEDs and prints what has changed'''
+        if reply[0] == ERROR:
+            print('The server refused the request with the error {}'.format(REPLY.unpack(reply)[1]))
+            return
+        state = decode_state(reply)
+        cells, player, current_player, remaining_chances, finished, score, champion = state
+        old_state = self.state
+        self.state = state
+        self.player = player
+        self.rules.current_player = current_player
+
+        # Player 1 is shown by a lit LED and player 2 by a blinking LED, like in a local game
+        for led, value in zip(self.rules.leds, cells):
+            if led.selected != value:
+                led.reset()
+                led.selected = value
+                if value == 1:
+                    led.turn_on()
+                elif value == 2:
+                    led.start_blinking()
+        self.clear_highlight()
+
+        if old_state is None or old_state[1:] != state[1:]:
+            if finished and remaining_chances == 0:
+                print('Match over, {} with the score {} to {}'.format(
+                    'player {} is the champion'.format(champion) if champion else 'it is a draw', score[1], score[2]))
+            elif finished:
+                print('Round over, the score is {} to {}'.format(score[1], score[2]))
+            elif current_player == player:
+                print('Your turn, you are player {}'.format(player))
+
+    def clear_highlight(self):
+        '''Turns off the highlighted cell if it is not selected'''
+        position = self.rules.navigation_button_position
+        if position != 0 and self.rules.leds[position - 1].selected == 0:
+            self.rules.leds[position - 1].turn_off()
+            self.rules.leds[position - 1].stop_blinking()
+        self.rules.navigation_button_position = 0
+
+    def read_presses(self):
+        '''Returns whether the navigation, select and back buttons were pressed since the last read'''
+        states = [bool(button.read()) for button in self.buttons]
+        presses = [state and not last_state for state, last_state in zip(states, self.last_button_states)]
+        self.last_button_states = states
+        return presses
+
+    async def follow(self, client):
+        '''Shows the states pushed after the requests of the other player'''
+        while True:
+            self.apply_state(await client.wait_for_state())
+
+    async def play(self, host='127.0.0.1', port=PORT):
+        '''Joins the table and plays the presses of the buttons until the back button is pressed'''
+        client = await GameClient.connect(host, port)
+        follow_task = None
+        try:
+            reply = await client.join(self.table, self.computer_vs_human_mode)
+            if reply[0] == ERROR:
+                raise ConnectionError('the table {} is full'.format(self.table))
+            self.apply_state(reply)
+            follow_task = asyncio.ensure_future(self.follow(client))
+
+            while not follow_task.done():
+                await asyncio.sleep(self.config.update_interval)
+                nav_pressed, select_pressed, back_pressed = self.read_presses()
+                if back_pressed:
+                    break
+                if nav_pressed and self.state[4]:
+                    self.apply_state(await client.next_chance())
+                elif nav_pressed and self.is_my_turn():
+                    self.rules.navigate()
+                elif select_pressed and self.is_my_turn() and self.rules.navigation_button_position != 0:
+                    self.apply_state(await client.move(self.rules.navigation_button_position))
+                blink_all(self.rules.leds, self.config.blink_interval)
+        finally:
+            if follow_task is not None:
+                follow_task.cancel()
+            client.close()
+            self.rules.turn_off_all()
+
+
+# Main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play a cabinet on a table of the game server')
+    parser.add_argument('--config', default=CONFIG_FILE, help='the config file of the cabinet')
+    parser.add_argument('--host', default='127.0.0.1', help='the host of the game server')
+    parser.add_argument('--port', type=int, default=PORT, help='the port of the game server')
+    parser.add_argument('--table', type=int, default=0, help='the number of the table to join')
+    parser.add_argument('--computer', action='store_true', help='play against the computer of the server')
+    args = parser.parse_args()
+
+    try:
+        config = load_config(args.config)
+        board = open_board(config)
+        # Start an iterator thread so that serial buffer doesn't overflow
+        util.Iterator(board).start()
+    except Exception as e:
+        print('Error while connecting to the Arduino board: {}'.format(e))
+        exit(1)
+
+    try:
+        asyncio.run(RemoteCabinet(config, board, args.table, args.computer).play(args.host, args.port))
+    except (ConnectionError, OSError) as e:
+        print('Error while playing on the server: {}'.format(e))
+    except KeyboardInterrupt:
+        pass
+    board.exit()
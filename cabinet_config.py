@@ -0,0 +1,183 @@
+# Loads the wiring and the timing of a cabinet from a config file
+# The serial port, the pins of the LEDs and buttons, the board size and the timing of the loop are read and
+# checked once when the cabinet starts, so differently wired cabinets run the same code with their own file
+# The pin specs are built once from the config and the board pins are resolved once into a pin table
+# The port can be 'auto', the detected port is cached so the next starts open it without scanning the ports
+# The number of the cabinet and the address of the spectator hub tell the cabinets apart on a shared hub
+
+import json
+import os
+from pyfirmata import Arduino
+from spectator import ALL_CABINETS, HUB_HOST, HUB_PORT
+
+# Constants
+CONFIG_FILE = 'cabinet.json'
+PORT_CACHE_FILE = 'serial_port.json'
+AUTO_PORT = 'auto'
+BOARD_SIZES = (3,)
+# Pins 0 and 1 carry the serial link, the Mega has digital pins up to 53
+DIGITAL_PINS = range(2, 54)
+UPDATE_INTERVAL = 0.005
+FPS = 60
+BLINK_INTERVAL = 0.1
+COMPUTER_MOVE_DELAY = 3
+INPUT_LATENCY_TARGET = 0.02
+SPECTATOR_HUB = (HUB_HOST, HUB_PORT)
+# The USB vendor ids of the Arduino boards and of the USB serial chips of their clones
+ARDUINO_VENDOR_IDS = (0x2341, 0x2A03, 0x1A86, 0x0403, 0x10C4)
+
+# Classes
+
+
+class CabinetConfig:
+    '''The checked wiring and timing of a cabinet'''
+
+    def __init__(self, port, led_pins, nav_button_pin, select_button_pin, back_button_pin, board_size=3,
+                 update_interval=UPDATE_INTERVAL, fps=FPS, blink_interval=BLINK_INTERVAL,
+                 computer_move_delay=COMPUTER_MOVE_DELAY, cabinet=0, spectator_hub=SPECTATOR_HUB,
+                 input_latency_target=INPUT_LATENCY_TARGET):
+        '''Checks the config and builds the pin specs
+        port: The serial port of the board, or 'auto' to detect it
+        led_pins: The pins of the LEDs of the cells, as a list in the order of the cells or a dictionary of the cells from 1
+        nav_button_pin, select_button_pin, back_button_pin: The pins of the buttons
+        board_size: The number of cells of a side of the board
+        update_interval: The time in seconds between the logic updates
+        fps: The number of frames rendered per second
+        blink_interval: The time in seconds between the blinks of the LEDs
+        computer_move_delay: The longest time in seconds the computer thinks before its move
+        cabinet: The number of the cabinet on the spectator hub, every cabinet of a hub needs its own number
+        spectator_hub: The host and port of the spectator hub, the game is not streamed if it is None
+        input_latency_target: The p99 latency in seconds from a button message to the press seen by the game,
+                              a warning is printed when it is over
+        led_specs: A dictionary of the LED pins and their pyfirmata output spec
+        button_specs: The pyfirmata input specs of the navigation, select and back buttons
+        '''
+        if not isinstance(port, str) or not port:
+            raise TypeError('port must be a serial port name or {!r}'.format(AUTO_PORT))
+        if board_size not in BOARD_SIZES:
+            raise ValueError('board_size must be one of {}, the game rules are 3x3'.format(BOARD_SIZES))
+
+        if isinstance(led_pins, dict):
+            try:
+                led_pins = [led_pins[cell] for cell in sorted(led_pins, key=int)]
+            except ValueError:
+                raise TypeError('the cells of led_pins must be numbers from 1')
+        if not isinstance(led_pins, list) or len(led_pins) != board_size * board_size:
+            raise TypeError('led_pins must have {} pins'.format(board_size * board_size))
+
+        button_pins = [nav_button_pin, select_button_pin, back_button_pin]
+        for pin in led_pins + button_pins:
+            if not isinstance(pin, int) or isinstance(pin, bool):
+                raise TypeError('the pins must be integers')
+            if pin not in DIGITAL_PINS:
+                raise ValueError('pin {} is not a digital pin from {} to {}'.format(
+                    pin, DIGITAL_PINS[0], DIGITAL_PINS[-1]))
+        if len(set(led_pins + button_pins)) != len(led_pins + button_pins):
+            raise ValueError('a pin is used twice')
+
+        for name, value in (('update_interval', update_interval), ('fps', fps), ('blink_interval', blink_interval),
+                            ('input_latency_target', input_latency_target)):
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+                raise ValueError('{} must be a positive number'.format(name))
+        if not isinstance(computer_move_delay, int) or computer_move_delay < 1:
+            raise ValueError('computer_move_delay must be a whole number of seconds from 1')
+        if not isinstance(cabinet, int) or isinstance(cabinet, bool) or not 0 <= cabinet < ALL_CABINETS:
+            raise ValueError('cabinet must be a number from 0 to {}'.format(ALL_CABINETS - 1))
+        if spectator_hub is not None:
+            if (not isinstance(spectator_hub, (list, tuple)) or len(spectator_hub) != 2
+                    or not isinstance(spectator_hub[0], str) or not isinstance(spectator_hub[1], int)):
+                raise TypeError('spectator_hub must be a host and a port, or null to not stream the game')
+            spectator_hub = tuple(spectator_hub)
+
+        self.port = port
+        self.led_pins = {cell: pin for cell, pin in enumerate(led_pins, 1)}
+        self.nav_button_pin = nav_button_pin
+        self.select_button_pin = select_button_pin
+        self.back_button_pin = back_button_pin
+        self.board_size = board_size
+        self.update_interval = update_interval
+        self.fps = fps
+        self.blink_interval = blink_interval
+        self.computer_move_delay = computer_move_delay
+        self.cabinet = cabinet
+        self.spectator_hub = spectator_hub
+        self.input_latency_target = input_latency_target
+        self.led_specs = {pin: 'd:{}:o'.format(pin) for pin in led_pins}
+        self.button_specs = ['d:{}:i'.format(pin) for pin in button_pins]
+
+
+class PinTable:
+    '''The pyfirmata pins of a board, resolved once from the specs of its config'''
+
+    def __init__(self, board, config):
+        '''Resolves the pins of the LEDs and the buttons on the board
+        board: The Arduino board object
+        config: The CabinetConfig of the board
+        leds: A dictionary of the LED pin numbers and their output pins
+        nav_button, select_button, back_button: The input pins of the buttons
+        '''
+        self.leds = {pin: board.get_pin(spec) for pin, spec in config.led_specs.items()}
+        self.nav_button, self.select_button, self.back_button = [
+            board.get_pin(spec) for spec in config.button_specs]
+
+# Functions
+
+
+def load_config(file_name=CONFIG_FILE):
+    '''Returns the CabinetConfig of a JSON config file, a ValueError tells what is wrong with the file'''
+    try:
+        with open(file_name) as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ValueError('cannot read the config file {}: {}'.format(file_name, e))
+    if not isinstance(data, dict):
+        raise ValueError('the config file {} must have a JSON object'.format(file_name))
+    try:
+        return CabinetConfig(**data)
+    except TypeError as e:
+        raise ValueError('the config file {} is not valid: {}'.format(file_name, e))
+
+
+def detect_serial_port():
+    '''Returns the first serial port with an Arduino board or a USB serial chip of a clone'''
+    from serial.tools import list_ports
+    ports = sorted((port.device for port in list_ports.comports() if port.vid in ARDUINO_VENDOR_IDS))
+    if not ports:
+        raise ValueError('no Arduino board was found on the serial ports')
+    return ports[0]
+
+
+def find_serial_port(cache_file=PORT_CACHE_FILE, refresh=False):
+    '''Returns the serial port of the board, the port found by the last detection if there is one
+    refresh: A boolean that represents whether the ports are scanned again or not
+    '''
+    if not refresh and os.path.exists(cache_file):
+        try:
+            with open(cache_file) as file:
+                return json.load(file)['port']
+        except (OSError, ValueError, KeyError) as e:
+            print('Error while loading the detected serial port: {}'.format(e))
+
+    port = detect_serial_port()
+    try:
+        with open(cache_file, 'w') as file:
+            json.dump({'port': port}, file)
+    except OSError as e:
+        print('Error while saving the detected serial port: {}'.format(e))
+    return port
+
+
+def open_board(config, connect=Arduino):
+    '''Connects to the board of the config and returns it, on the detected port if the port is auto
+    connect: The function that opens the board on a port
+    '''
+    if config.port != AUTO_PORT:
+        return connect(config.port)
+
+    port = find_serial_port()
+    try:
+        return connect(port)
+    except Exception as e:
+        # The board is on another port since the last detection
+        print('Error while connecting to the Arduino board on {}: {}'.format(port, e))
+        return connect(find_serial_port(refresh=True))
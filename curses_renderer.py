@@ -0,0 +1,258 @@
+# The terminal renderer of the Tic Tac Toe game
+# It shows the board, the current player, the lives and the score with curses, for the boards that drive only
+# the LED matrix and have no display. Every draw writes only the characters of the cell or the HUD field that
+# changed, and curses sends only the changed characters to the terminal when the frame is rendered
+# The messages printed by the game are shown on the status line instead of scrolling the screen
+
+import atexit
+import curses
+import sys
+from game_core import Renderer
+
+# Constants
+BOARD_TOP = 2
+BOARD_LEFT = 4
+CELL_WIDTH = 3
+HUD_LEFT = 20
+STATUS_ROW = 9
+NOTIFICATION_ROW = 10
+WINDOW_TOP = 2
+QUIT_KEYS = (ord('q'), ord('Q'))
+WINDOW_TEXTS = {
+    'loading': ['Loading...'],
+    'instruction': ['NAV moves to the next free cell, SELECT plays it and BACK undoes the last move',
+                    'Every player gets 3 chances, a win is 100 points and a tie is 50 points',
+                    '', 'Press NAV to continue'],
+    'choose_mode': ['Choose the mode', '', 'NAV     player vs player', 'SELECT  player vs computer'],
+    'thankyou': ['Thank you for playing'],
+    'champion_o': ['Player O is the champion!', '', 'Press NAV to play again'],
+    'champion_x': ['Player X is the champion!', '', 'Press NAV to play again'],
+    'match_is_draw': ['The match is a draw', '', 'Press NAV to play again'],
+}
+
+# Classes
+
+
+class CursesRenderer(Renderer):
+    '''Shows the game in a terminal with curses'''
+
+    def __init__(self, screen=None):
+        '''Initializes the terminal and shows the title
+        screen: The curses window to draw on, the whole terminal is used if it is None
+        own_terminal: A boolean that represents whether the renderer set up the terminal and restores it or not
+        drawn_hud: A dictionary of the HUD fields and the text drawn in them
+        closed: A boolean that represents whether the player pressed a quit key or not
+        '''
+        super().__init__()
+        self.own_terminal = screen is None
+        if screen is None:
+            screen = curses.initscr()
+            curses.noecho()
+            curses.cbreak()
+            try:
+                curses.curs_set(0)
+            except curses.error:
+                pass
+            atexit.register(self.close)
+        self.screen = screen
+        self.screen.nodelay(True)
+        self.drawn_hud = {}
+        self.closed = False
+        self.stdout = None
+
+        self.o_attribute = curses.A_BOLD
+        self.x_attribute = curses.A_BOLD
+        self.win_attribute = curses.A_BOLD | curses.A_UNDERLINE
+        if self.own_terminal and curses.has_colors():
+            curses.start_color()
+            curses.init_pair(1, curses.COLOR_CYAN, curses.COLOR_BLACK)
+            curses.init_pair(2, curses.COLOR_MAGENTA, curses.COLOR_BLACK)
+            curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+            self.o_attribute |= curses.color_pair(1)
+            self.x_attribute |= curses.color_pair(2)
+            self.win_attribute |= curses.color_pair(3)
+
+        # Show what the game prints on the status line, a print would scroll the screen
+        if self.own_terminal:
+            self.stdout = sys.stdout
+            sys.stdout = self
+
+        self.put(0, 0, 'Tic Tac Toe', curses.A_BOLD)
+        self.render()
+
+    def close(self):
+        '''Restores the terminal'''
+        if self.stdout is not None:
+            sys.stdout = self.stdout
+            self.stdout = None
+        if self.own_terminal and not curses.isendwin():
+            curses.endwin()
+
+    def write(self, text):
+        '''Shows the last line printed by the game on the status line'''
+        text = text.strip()
+        if text:
+            self.put(STATUS_ROW, 0, text, clear=True)
+
+    def flush(self):
+        '''Nothing is buffered, the status line is shown by the next render'''
+
+    def put(self, row, column, text, attribute=curses.A_NORMAL, clear=False):
+        '''Writes the text at the row and column, the part that does not fit in the terminal is cut
+        clear: A boolean that represents whether the rest of the row is cleared or not
+        '''
+        try:
+            if clear:
+                self.screen.move(row, column)
+                self.screen.clrtoeol()
+            height, width = self.screen.getmaxyx()
+            self.screen.addstr(row, column, text[:max(0, width - column - 1)], attribute)
+        except curses.error:
+            pass
+        self.dirty = True
+
+    def render(self, overlay=None):
+        '''Sends the characters that changed since the last frame to the terminal'''
+        if self.dirty:
+            self.screen.refresh()
+            self.dirty = False
+
+    def is_closed(self):
+        '''Returns True when the player has pressed a quit key'''
+        key = self.screen.getch()
+        while key != -1:
+            if key in QUIT_KEYS:
+                self.closed = True
+            key = self.screen.getch()
+        return self.closed
+
+    def show_text_window(self, name):
+        '''Clears the terminal and shows the lines of a window'''
+        self.screen.erase()
+        self.drawn_hud = {}
+        self.put(0, 0, 'Tic Tac Toe', curses.A_BOLD)
+        for i, line in enumerate(WINDOW_TEXTS[name]):
+            self.put(WINDOW_TOP + i, 2, line)
+
+    def get_cell_position(self, cell):
+        '''Returns the row and column of the cell from 0 to 8'''
+        return BOARD_TOP + cell // 3 * 2, BOARD_LEFT + cell % 3 * (CELL_WIDTH + 1)
+
+    def draw_cell(self, cell, text, attribute=curses.A_NORMAL):
+        '''Writes the text centered in the cell'''
+        row, column = self.get_cell_position(cell)
+        self.put(row, column, text.center(CELL_WIDTH), attribute)
+
+    def draw_hud_field(self, row, label, text):
+        '''Writes a field of the HUD if its text has changed'''
+        if self.drawn_hud.get(row) == text:
+            return
+        self.drawn_hud[row] = text
+        self.put(row, HUD_LEFT, '{:<8}{}'.format(label, text), clear=True)
+
+    def show_computer_is_thinking(self):
+        '''Shows the computer is thinking message'''
+        self.put(NOTIFICATION_ROW, 0, 'The computer is thinking...', clear=True)
+        self.notification_in_screen = True
+
+    def show_select_position(self):
+        '''Shows the select position message'''
+        self.put(NOTIFICATION_ROW, 0, 'Move to a free cell with NAV first', clear=True)
+        self.notification_in_screen = True
+
+    def clear_notification(self):
+        '''Clears the notification'''
+        self.put(NOTIFICATION_ROW, 0, '', clear=True)
+        self.notification_in_screen = False
+
+    def show_player_o_won(self):
+        '''Shows the player O won message'''
+        self.put(STATUS_ROW, 0, 'Player O won! NAV plays the next chance, SELECT leaves', self.o_attribute, True)
+
+    def show_player_x_won(self):
+        '''Shows the player X won message'''
+        self.put(STATUS_ROW, 0, 'Player X won! NAV plays the next chance, SELECT leaves', self.x_attribute, True)
+
+    def show_game_is_tie(self):
+        '''Shows the game is tie message'''
+        self.put(STATUS_ROW, 0, 'It is a tie! NAV plays the next chance, SELECT leaves', clear=True)
+
+    def draw_win_line(self, line):
+        '''Highlights the winning cells
+        line: The cells from 0 to 8 of the winning line
+        '''
+        for cell in line:
+            self.draw_cell(cell, 'OX'[self.drawn_cells[cell] - 1], self.win_attribute)
+
+    def draw_x(self, cell):
+        '''Draws X on the cell'''
+        self.draw_cell(cell, 'X', self.x_attribute)
+
+    def draw_o(self, cell):
+        '''Draws O on the cell'''
+        self.draw_cell(cell, 'O', self.o_attribute)
+
+    def draw_cell_selected(self, cell):
+        '''Draws the cell highlighted by the navigation button'''
+        self.draw_cell(cell, '', curses.A_REVERSE)
+
+    def draw_cell_not_selected(self, cell):
+        '''Draws the cell empty'''
+        self.draw_cell(cell, '')
+
+    def draw_player_x(self):
+        '''Draws player X as the current player'''
+        self.draw_hud_field(BOARD_TOP, 'Player', 'X')
+
+    def draw_player_o(self):
+        '''Draws player O as the current player'''
+        self.draw_hud_field(BOARD_TOP, 'Player', 'O')
+
+    def draw_life(self, remaining_chances):
+        '''Draws the remaining chances'''
+        self.draw_hud_field(BOARD_TOP + 2, 'Lives', '* ' * remaining_chances)
+
+    def draw_score(self, score):
+        '''Draws the score of the players'''
+        self.draw_hud_field(BOARD_TOP + 4, 'Score', 'O {}  X {}'.format(score[1], score[2]))
+
+    def show_game_board(self):
+        '''Shows the empty board'''
+        self.screen.erase()
+        self.drawn_hud = {}
+        self.drawn_cells = [0] * 9
+        self.put(0, 0, 'Tic Tac Toe', curses.A_BOLD)
+        separator = '+'.join(['-' * CELL_WIDTH] * 3)
+        for row in range(3):
+            self.put(BOARD_TOP + row * 2, BOARD_LEFT, '|'.join([' ' * CELL_WIDTH] * 3))
+            if row < 2:
+                self.put(BOARD_TOP + row * 2 + 1, BOARD_LEFT, separator)
+        self.put(STATUS_ROW + 2, 0, 'Press q to quit')
+
+    def show_choose_mode_window(self):
+        '''Shows the choose mode window'''
+        self.show_text_window('choose_mode')
+
+    def show_loading_window(self):
+        '''Shows the loading window, there is nothing to load in a terminal'''
+        self.show_text_window('loading')
+
+    def show_instruction_window(self):
+        '''Shows the instruction window'''
+        self.show_text_window('instruction')
+
+    def show_thankyou_window(self):
+        '''Shows the thankyou window'''
+        self.show_text_window('thankyou')
+
+    def show_champion_player_o_window(self):
+        '''Shows the champion player O window'''
+        self.show_text_window('champion_o')
+
+    def show_champion_player_x_window(self):
+        '''Shows the champion player X window'''
+        self.show_text_window('champion_x')
+
+    def show_match_is_draw_window(self):
+        '''Shows the match is draw window'''
+        self.show_text_window('match_is_draw')
@@ -0,0 +1,267 @@
+# The events of the game and the bus that delivers them to their subscribers
+# The game emits a typed event when a session starts, a move is made, a round is won or drawn, a champion is
+# decided or a session is left, and every output that is not the board itself (records, logs, metrics, network)
+# subscribes to the events it needs instead of adding code to the button handlers
+# A subscriber is called in the game thread, on a background thread with its own bounded queue, or on an
+# asyncio event loop, so a slow subscriber never delays the next button press or LED write
+
+import asyncio
+import queue
+import threading
+import time
+
+# Constants
+MAX_QUEUE_DEPTH = 256
+
+# Classes
+
+
+class Event:
+    '''An event of a game'''
+
+    __slots__ = ('cabinet', 'session_id', 'time')
+
+    def __init__(self, cabinet, session_id):
+        '''Initializes the event
+        cabinet: The name of the cabinet the game is played on
+        session_id: The id of the session in the session store, None if the session is not recorded
+        time: The time the event happened at
+        '''
+        self.cabinet = cabinet
+        self.session_id = session_id
+        self.time = time.time()
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(name, getattr(self, name))
+                           for cls in reversed(type(self).__mro__) for name in getattr(cls, '__slots__', ()))
+        return '{}({})'.format(type(self).__name__, fields)
+
+
+class SessionStarted(Event):
+    '''A session was started'''
+
+    __slots__ = ('computer_vs_human_mode',)
+
+    def __init__(self, cabinet, session_id, computer_vs_human_mode):
+        '''Initializes the event
+        computer_vs_human_mode: A boolean that represents whether the session is played against the computer or not
+        '''
+        super().__init__(cabinet, session_id)
+        self.computer_vs_human_mode = computer_vs_human_mode
+
+
+class MoveMade(Event):
+    '''A player selected a cell'''
+
+    __slots__ = ('position', 'player', 'computer_move')
+
+    def __init__(self, cabinet, session_id, position, player, computer_move):
+        '''Initializes the event
+        position: The position of the cell from 1 to 9
+        player: The player who made the move (1 or 2)
+        computer_move: A boolean that represents whether the computer made the move or not
+        '''
+        super().__init__(cabinet, session_id)
+        self.position = position
+        self.player = player
+        self.computer_move = computer_move
+
+
+class RoundEnded(Event):
+    '''A round was won or drawn, the base of RoundWon and RoundDrawn'''
+
+    __slots__ = ('winner', 'round_number', 'first_player', 'positions', 'duration', 'score')
+
+    def __init__(self, cabinet, session_id, winner, round_number, first_player, positions, duration, score):
+        '''Initializes the event
+        winner: The player who won the round (1 or 2), 0 for a draw
+        round_number: The number of the round from 1
+        first_player: The player who played first (1 or 2)
+        positions: The positions from 1 to 9 of the moves in the order they were played
+        duration: The duration of the round in seconds
+        score: The score of the players after the round
+        '''
+        super().__init__(cabinet, session_id)
+        self.winner = winner
+        self.round_number = round_number
+        self.first_player = first_player
+        self.positions = positions
+        self.duration = duration
+        self.score = score
+
+
+class RoundWon(RoundEnded):
+    '''A player made a line'''
+
+    __slots__ = ('line',)
+
+    def __init__(self, cabinet, session_id, winner, round_number, first_player, positions, duration, score, line):
+        '''Initializes the event
+        line: The cells from 0 to 8 of the winning line
+        '''
+        super().__init__(cabinet, session_id, winner, round_number, first_player, positions, duration, score)
+        self.line = line
+
+
+class RoundDrawn(RoundEnded):
+    '''The board was filled without a line'''
+
+    __slots__ = ()
+
+
+class ChampionDecided(Event):
+    '''The last chance of a session was played'''
+
+    __slots__ = ('champion', 'score')
+
+    def __init__(self, cabinet, session_id, champion, score):
+        '''Initializes the event
+        champion: The champion (1 or 2), 0 if the match is a draw
+        score: The final score of the players
+        '''
+        super().__init__(cabinet, session_id)
+        self.champion = champion
+        self.score = score
+
+
+class SessionLeft(Event):
+    '''A session was left before it had a champion'''
+
+    __slots__ = ('score',)
+
+    def __init__(self, cabinet, session_id, score):
+        '''Initializes the event
+        score: The score of the players when the session was left
+        '''
+        super().__init__(cabinet, session_id)
+        self.score = score
+
+
+class BackgroundSubscriber:
+    '''Calls a slow handler from its own thread, the events wait in a bounded queue'''
+
+    def __init__(self, handler, max_queue_depth=MAX_QUEUE_DEPTH):
+        '''Starts the thread of the handler
+        handler: The function called with every event
+        max_queue_depth: The maximum number of events waiting, the new events are dropped above it
+        dropped: The number of events dropped because the handler was too slow
+        '''
+        self.handler = handler
+        self.events = queue.Queue(max_queue_depth)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __call__(self, event):
+        '''Queues the event and returns at once'''
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        '''Calls the handler with the queued events until the subscriber is closed'''
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            try:
+                self.handler(event)
+            except Exception as e:
+                print('Error while handling {}: {}'.format(type(event).__name__, e))
+
+    def close(self):
+        '''Handles the queued events and stops the thread'''
+        self.events.put(None)
+        self.thread.join()
+
+
+class AsyncSubscriber:
+    '''Runs a coroutine handler on an asyncio event loop of another thread'''
+
+    def __init__(self, handler, loop):
+        '''Initializes the subscriber
+        handler: The coroutine function called with every event
+        loop: The running asyncio event loop the handler runs on
+        '''
+        self.handler = handler
+        self.loop = loop
+
+    def __call__(self, event):
+        '''Schedules the handler on the event loop and returns at once'''
+        future = asyncio.run_coroutine_threadsafe(self.handler(event), self.loop)
+        future.add_done_callback(self.report_error)
+
+    def report_error(self, future):
+        '''Prints the error of a handler that failed'''
+        if not future.cancelled() and future.exception() is not None:
+            print('Error while handling an event: {}'.format(future.exception()))
+
+
+class EventBus:
+    '''Delivers the events of the games to the subscribers of their type or of a base type'''
+
+    def __init__(self):
+        '''Initializes the bus without subscribers
+        subscribers: A dictionary of the event types and the subscribers of the type
+        handlers: A dictionary of the event types and all the subscribers an event of the type is delivered to
+        '''
+        self.subscribers = {}
+        self.handlers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, event_type, handler, background=False, loop=None):
+        '''Subscribes a handler to the events of a type and of its subclasses, returns the subscriber
+        event_type: The Event class, Event subscribes to all the events
+        handler: The function called with the event, or a coroutine function if loop is given
+        background: A boolean that represents whether the handler is called from its own thread or not
+        loop: The asyncio event loop a coroutine handler runs on
+        '''
+        if not (isinstance(event_type, type) and issubclass(event_type, Event)):
+            raise TypeError('event_type must be an Event class')
+        if not callable(handler):
+            raise TypeError('handler must be callable')
+
+        if loop is not None:
+            handler = AsyncSubscriber(handler, loop)
+        elif background:
+            handler = BackgroundSubscriber(handler)
+
+        with self.lock:
+            self.subscribers.setdefault(event_type, []).append(handler)
+            self.handlers = {}
+        return handler
+
+    def unsubscribe(self, event_type, handler):
+        '''Removes a subscriber returned by subscribe, a background subscriber handles its queued events first'''
+        with self.lock:
+            self.subscribers[event_type].remove(handler)
+            self.handlers = {}
+        if isinstance(handler, BackgroundSubscriber):
+            handler.close()
+
+    def get_handlers(self, event_type):
+        '''Returns the subscribers an event of the type is delivered to, they are found once per type'''
+        handlers = self.handlers.get(event_type)
+        if handlers is None:
+            with self.lock:
+                handlers = tuple(handler for cls in event_type.__mro__
+                                 for handler in self.subscribers.get(cls, ()))
+                self.handlers[event_type] = handlers
+        return handlers
+
+    def emit(self, event):
+        '''Delivers the event, the handlers of the game thread are called before it returns'''
+        for handler in self.get_handlers(type(event)):
+            try:
+                handler(event)
+            except Exception as e:
+                print('Error while handling {}: {}'.format(type(event).__name__, e))
+
+    def close(self):
+        '''Handles the queued events of the background subscribers and stops their threads'''
+        with self.lock:
+            subscribers = [handler for handlers in self.subscribers.values() for handler in handlers]
+        for handler in subscribers:
+            if isinstance(handler, BackgroundSubscriber):
+                handler.close()
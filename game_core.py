@@ -0,0 +1,859 @@
+# The core of the Tic Tac Toe game: the board, the turns, the chances, the score and the computer player
+# It does not import pygame or pyfirmata so the rules can be used by tests, simulations and servers
+# The GUI, the sounds and the board LEDs plug in through the Renderer and Cell classes
+
+import random
+import struct
+import time
+
+# Constants
+LINES = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6),
+         (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
+SNAPSHOT_VERSION = 1
+SNAPSHOT = struct.Struct('!BIBBBBHHBB')
+
+# Classes
+
+
+class Cell:
+    '''Represents a cell of the board that can be turned on, turned off, blinked, and selected'''
+
+    __slots__ = ('state', 'last_time_blinked', 'can_blink', 'selected')
+
+    def __init__(self):
+        '''Initializes the cell
+        state: The state of the cell (0 or 1)
+        last_time_blinked: The last time the cell blinked
+        can_blink: A boolean that represents whether the cell can blink or not
+        selected: The player who selected the cell (0 if it is not selected)
+        '''
+        self.state = 0
+        self.last_time_blinked = 0
+        self.can_blink = False
+        self.selected = 0
+
+    def turn_on(self):
+        '''Turns the cell on by setting the state to 1'''
+        self.state = 1
+
+    def turn_off(self):
+        '''Turns the cell off by setting the state to 0'''
+        self.state = 0
+
+    def start_blinking(self):
+        '''Starts blinking the cell by setting can_blink to True'''
+        self.can_blink = True
+
+    def stop_blinking(self):
+        '''Stops blinking the cell by setting can_blink to False'''
+        self.can_blink = False
+
+    def reset(self):
+        '''Resets the cell by turning it off, stopping blinking, setting selected to 0, setting last_time_blinked to 0, and setting state to 0'''
+        self.turn_off()
+        self.stop_blinking()
+        self.selected = 0
+        self.last_time_blinked = 0
+        self.can_blink = False
+        self.state = 0
+
+
+class GameRules:
+    '''Represents the rules of a Tic Tac Toe Game without any GUI, it can be played without a display'''
+
+    __slots__ = ('leds', 'chances', 'started', 'finished', 'navigation_button_position',
+                 'navigation_button_last_position', 'current_player', 'player_played_first', 'remaining_chances',
+                 'score', 'computer_vs_human_mode', 'computer_move', 'computer_move_start_time', 'computer_move_delay',
+                 'computer_move_time', 'can_get_input', 'can_start_again', 'computer_player', 'move_history', 'clock')
+
+    def __init__(self, leds, computer_player=None):
+        '''Initializes the rules with the cells and the chances
+        leds: A list of Cell objects, the LEDs of a board or plain cells
+        computer_player: The function that returns the move of the computer, the heuristic is used if it is None
+        chances: The number of chances each player gets
+        started: A boolean that represents whether the game has started or not
+        finished: A boolean that represents whether the game is finished or not
+        navigation_button_position: The position of the navigation button
+        current_player: The current player
+        player_played_first: The player who played first
+        remaining_chances: The remaining chances
+        score: The score of the players
+        computer_vs_human_mode: A boolean that represents whether the game is in computer vs human mode or not
+        computer_move: A boolean that represents whether the computer is making a move or not
+        computer_move_start_time: The time when the computer started making a move
+        computer_move_delay: The delay between the computer moves
+        computer_move_time: The time in seconds the computer player took to choose its last move
+        can_get_input: A boolean that represents whether the game can get input or not
+        can_start_again: A boolean that represents whether the game can start again or not
+        move_history: The stack of the moves of the current chance, used to undo them
+        clock: The function that returns the current time in seconds, a replay can give the game its own time
+        '''
+        if not isinstance(leds, list):
+            raise TypeError('leds must be a list')
+        if not isinstance(leds[0], Cell):
+            raise TypeError('leds must be a list of Cell objects')
+
+        self.leds = leds
+        self.chances = 3
+        self.started = False
+        self.finished = False
+        self.navigation_button_position = 0
+        self.navigation_button_last_position = 0
+        self.current_player = 1
+        self.player_played_first = 1
+        self.remaining_chances = self.chances
+        self.score = {1: 0, 2: 0}
+        self.computer_vs_human_mode = False
+        self.computer_move = False
+        self.computer_move_start_time = 0
+        self.computer_move_delay = 3
+        self.computer_move_time = 0
+        self.can_get_input = False
+        self.can_start_again = False
+        self.computer_player = computer_player or heuristic_computer_move
+        self.move_history = []
+        self.clock = time.time
+
+    def reset_all_leds(self):
+        '''Resets all the LEDs and forgets the moves played on them'''
+        for led in self.leds:
+            led.reset()
+        self.move_history = []
+
+    def turn_on_all(self):
+        '''Turns on all the LEDs'''
+        for led in self.leds:
+            led.turn_on()
+
+    def turn_off_all(self):
+        '''Turns off all the LEDs'''
+        for led in self.leds:
+            led.turn_off()
+            led.stop_blinking()
+
+    def blink_all(self):
+        '''Blinks all the LEDs '''
+        for led in self.leds:
+            led.start_blinking()
+
+    def do_all_leds_selected(self):
+        '''Returns True if all the LEDs are selected'''
+        for led in self.leds:
+            if led.selected == 0:
+                return False
+        return True
+
+    def navigate(self):
+        '''Navigates the LEDS using the navigation button'''
+        if self.do_all_leds_selected():
+            return
+
+        self.navigation_button_last_position = self.navigation_button_position
+
+        self.navigation_button_position = self.navigation_button_position % len(
+            self.leds) + 1
+
+        while self.leds[self.navigation_button_position - 1].selected != 0:
+            self.navigation_button_position = self.navigation_button_position % len(
+                self.leds) + 1
+
+        if self.current_player == 1:
+            self.leds[self.navigation_button_position - 1].turn_on()
+        else:
+            self.leds[self.navigation_button_position - 1].start_blinking()
+
+        for led in self.leds:
+            if led != self.leds[self.navigation_button_position - 1] and led.selected == 0:
+                led.turn_off()
+                led.stop_blinking()
+
+    def enable_computer_vs_human_mode(self):
+        '''Enables computer vs human mode'''
+        self.computer_vs_human_mode = True
+
+    def disable_computer_vs_human_mode(self):
+        '''Disables computer vs human mode'''
+        self.computer_vs_human_mode = False
+
+    def disable_computer_move(self):
+        '''Disables computer move'''
+        self.computer_move = False
+
+    def enable_computer_move(self):
+        '''Enables computer move'''
+        self.computer_move = True
+
+    def do_computer_move(self):
+        '''Sets the navigation button position to the move of the computer player'''
+        game_board = [led.selected for led in self.leds]
+        start_time = time.perf_counter()
+        self.navigation_button_position = self.computer_player(game_board)
+        self.computer_move_time = time.perf_counter() - start_time
+
+    def select(self):
+        '''Selects the LED using the select button'''
+        if self.navigation_button_position == 0:
+            return
+        elif self.leds[self.navigation_button_position - 1].selected != 0:
+            return
+
+        if self.current_player == 1:
+            self.leds[self.navigation_button_position - 1].turn_on()
+            self.leds[self.navigation_button_position - 1].selected = 1
+        else:
+            self.leds[self.navigation_button_position - 1].start_blinking()
+            self.leds[self.navigation_button_position - 1].selected = 2
+
+        # Remember who played the move and whose turn it was, so it can be undone
+        self.move_history.append(
+            (self.navigation_button_position, self.current_player, self.computer_move))
+
+    def undo(self):
+        '''Undoes the last move, and the computer move before it in computer vs human mode
+        Returns the list of the positions from 1 to 9 that were cleared
+        '''
+        cleared_positions = []
+        while self.move_history:
+            position, player, computer_move = self.move_history.pop()
+            self.leds[position - 1].reset()
+            self.current_player = player
+            self.computer_move = computer_move
+            cleared_positions.append(position)
+
+            # In computer vs human mode the turn goes back to the human player
+            if not (self.computer_vs_human_mode and self.computer_move):
+                break
+
+        # The computer thinks again if it is its turn
+        if self.computer_move:
+            self.computer_move_start_time = self.clock()
+
+        self.navigation_button_position = 0
+        self.navigation_button_last_position = 0
+        return cleared_positions
+
+    def switch_players(self):
+        '''Switches the current player'''
+        self.current_player = 1 if self.current_player == 2 else 2
+
+        if self.computer_vs_human_mode:
+            if self.computer_move:
+                self.disable_computer_move()
+            else:
+                self.enable_computer_move()
+                self.computer_move_start_time = self.clock()
+
+    def check_for_win(self):
+        '''Checks if the current player has won'''
+        # Check for rows
+        for i in range(0, len(self.leds), 3):
+            if self.leds[i].selected == self.leds[i + 1].selected == self.leds[i + 2].selected != 0:
+                return True
+        # Check for columns
+        for i in range(0, 3):
+            if self.leds[i].selected == self.leds[i + 3].selected == self.leds[i + 6].selected != 0:
+                return True
+        # Check for diagonals
+        if self.leds[0].selected == self.leds[4].selected == self.leds[8].selected != 0:
+            return True
+        if self.leds[2].selected == self.leds[4].selected == self.leds[6].selected != 0:
+            return True
+        return False
+
+    def get_winning_line(self):
+        '''Returns the cells from 0 to 8 of the line of the winner, or None if nobody has won'''
+        for line in LINES:
+            if self.leds[line[0]].selected == self.leds[line[1]].selected == self.leds[line[2]].selected != 0:
+                return line
+        return None
+
+    def check_for_draw(self):
+        '''Checks if the self is a draw'''
+        if self.do_all_leds_selected():
+            return True
+        return False
+
+    def handle_win(self):
+        '''Handles the win'''
+        self.score[self.current_player] += 100
+        self.finished = True
+        self.remaining_chances -= 1
+
+    def handle_draw(self):
+        '''Handles the draw'''
+        self.score[1] += 50
+        self.score[2] += 50
+        self.finished = True
+        self.remaining_chances -= 1
+
+    def play_next_chance(self):
+        '''Plays the next chance'''
+        self.reset_all_leds()
+        self.finished = False
+        self.navigation_button_position = 0
+        self.switch_players()
+        self.player_played_first = self.current_player
+
+    def reset_game(self):
+        '''Resets the self'''
+        self.reset_all_leds()
+        self.finished = False
+        self.navigation_button_position = 0
+        self.current_player = 1
+        self.player_played_first = 1
+        self.remaining_chances = self.chances
+        self.score = {1: 0, 2: 0}
+        self.computer_vs_human_mode = False
+        self.computer_move = False
+        self.computer_move_start_time = 0
+        self.started = False
+        self.can_start_again = True
+        self.can_get_input = True
+
+    def play_position(self, position):
+        '''Selects the position for the current player and handles the win or the draw
+        position: The position of the cell from 1 to 9
+        '''
+        self.navigation_button_position = position
+        self.select()
+        self.navigation_button_position = 0
+
+        if self.check_for_win():
+            self.handle_win()
+        elif self.check_for_draw():
+            self.handle_draw()
+
+        if not self.finished:
+            self.switch_players()
+
+    def get_snapshot(self):
+        '''Returns the state of the session as bytes: the board, the turn, the chances, the score, the mode and
+        the moves that can be undone
+        '''
+        board = 0
+        for i, led in enumerate(self.leds):
+            board |= led.selected << (2 * i)
+        flags = self.started | (self.finished << 1) | (
+            self.computer_vs_human_mode << 2) | (self.computer_move << 3)
+        moves = bytes(position << 3 | player << 1 | computer_move
+                      for position, player, computer_move in self.move_history)
+        return SNAPSHOT.pack(SNAPSHOT_VERSION, board, self.current_player, self.player_played_first,
+                             self.remaining_chances, self.chances, self.score[1], self.score[2], flags,
+                             len(moves)) + moves
+
+    def restore_snapshot(self, data):
+        '''Restores the state of the session from the bytes of get_snapshot and shows it on the cells
+        data: The bytes of the snapshot
+        '''
+        if len(data) < SNAPSHOT.size:
+            raise ValueError('the snapshot is too short')
+        (version, board, current_player, player_played_first, remaining_chances, chances, score_1, score_2, flags,
+         move_count) = SNAPSHOT.unpack_from(data)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError('the snapshot is not of version {}'.format(SNAPSHOT_VERSION))
+        if len(data) != SNAPSHOT.size + move_count:
+            raise ValueError('the snapshot does not have {} moves'.format(move_count))
+
+        self.reset_all_leds()
+        for i, led in enumerate(self.leds):
+            led.selected = (board >> (2 * i)) & 3
+            # The cells of player 1 are on and the cells of player 2 blink, like when they were selected
+            if led.selected == 1:
+                led.turn_on()
+            elif led.selected == 2:
+                led.start_blinking()
+        self.move_history = [(move >> 3, (move >> 1) & 3, bool(move & 1))
+                             for move in data[SNAPSHOT.size:]]
+
+        self.current_player = current_player
+        self.player_played_first = player_played_first
+        self.remaining_chances = remaining_chances
+        self.chances = chances
+        self.score = {1: score_1, 2: score_2}
+        self.started = bool(flags & 1)
+        self.finished = bool(flags & 2)
+        self.computer_vs_human_mode = bool(flags & 4)
+        self.computer_move = bool(flags & 8)
+        self.computer_move_start_time = self.clock()
+        self.navigation_button_position = 0
+        self.navigation_button_last_position = 0
+        self.can_start_again = False
+
+
+class Renderer:
+    '''Shows the game to the players, this renderer shows nothing and is used to play without a display'''
+
+    def __init__(self):
+        '''Initializes the renderer
+        notification_in_screen: A boolean that represents whether a notification is shown or not
+        dirty: A boolean that represents whether the screen has changed since the host last drew it
+        drawn_cells: The list of the symbols (0, 1 or 2) drawn on the cells
+        '''
+        self.notification_in_screen = False
+        self.dirty = False
+        self.drawn_cells = [0] * 9
+
+    def update_display(self):
+        '''Updates the display'''
+
+    def render(self, overlay=None):
+        '''Presents what was drawn since the last frame
+        overlay: An object with get_area() and draw(surface) methods that draws over the frame, None for no overlay
+        '''
+
+    def is_closed(self):
+        '''Returns True when the player has closed the game, the pygame window is closed with its QUIT event'''
+        return False
+
+    def play_music(self):
+        '''Plays the intro music'''
+
+    def stop_music(self):
+        '''Stops the music'''
+
+    def play_sound(self, name, request_time=None):
+        '''Plays a sound effect
+        name: The name of the sound (select, start_game, won_game, announce_champion, click_button or alert)
+        request_time: The time.perf_counter() of the button press that caused the sound, None if no press did
+        '''
+
+    def show_computer_is_thinking(self):
+        '''Shows the computer is thinking message'''
+        self.notification_in_screen = True
+
+    def show_select_position(self):
+        '''Shows the select position message'''
+        self.notification_in_screen = True
+
+    def clear_notification(self):
+        '''Clears the notification'''
+
+    def show_player_o_won(self):
+        '''Shows the player O won message'''
+
+    def show_player_x_won(self):
+        '''Shows the player X won message'''
+
+    def show_game_is_tie(self):
+        '''Shows the game is tie message'''
+
+    def draw_win_line(self, line):
+        '''Draws a line over the winning cells
+        line: The cells from 0 to 8 of the winning line
+        '''
+
+    def draw_score(self, score):
+        '''Draws the score of the players'''
+
+    def draw_x(self, cell):
+        '''Draws X on the cell from 0 to 8'''
+
+    def draw_o(self, cell):
+        '''Draws O on the cell from 0 to 8'''
+
+    def draw_cell_selected(self, cell):
+        '''Draws the cell from 0 to 8 as selected by the navigation button'''
+
+    def draw_cell_not_selected(self, cell):
+        '''Draws the cell from 0 to 8 as not selected by the navigation button'''
+
+    def draw_player_x(self):
+        '''Draws player X as the current player'''
+
+    def draw_player_o(self):
+        '''Draws player O as the current player'''
+
+    def draw_life(self, remaining_chances):
+        '''Draws the remaining chances'''
+
+    def show_game_board(self):
+        '''Shows the empty game board'''
+
+    def show_choose_mode_window(self):
+        '''Shows the choose mode window'''
+
+    def show_loading_window(self):
+        '''Shows the loading window'''
+
+    def show_instruction_window(self):
+        '''Shows the instruction window'''
+
+    def show_thankyou_window(self):
+        '''Shows the thankyou window'''
+
+    def show_champion_player_o_window(self):
+        '''Shows the champion player O window'''
+
+    def show_champion_player_x_window(self):
+        '''Shows the champion player X window'''
+
+    def show_match_is_draw_window(self):
+        '''Shows the match is draw window'''
+
+    def update_game_board(self, leds):
+        '''Draws X and O on the cells that have changed, a cell that was undone is drawn empty'''
+        for i in range(len(leds)):
+            if leds[i].selected == self.drawn_cells[i]:
+                continue
+            self.drawn_cells[i] = leds[i].selected
+
+            self.draw_cell_not_selected(i)
+            if leds[i].selected == 1:
+                self.draw_o(i)
+            elif leds[i].selected == 2:
+                self.draw_x(i)
+
+    def draw_current_player(self, current_player):
+        '''Draws the current player'''
+        if current_player == 1:
+            self.draw_player_o()
+
+        if current_player == 2:
+            self.draw_player_x()
+
+    def refresh_game_board(self, current_player, remaining_chances, score):
+        '''Refreshes the game board'''
+        self.show_game_board()
+        self.drawn_cells = [0] * 9
+        self.draw_current_player(current_player)
+        self.draw_life(remaining_chances)
+        self.draw_score(score)
+
+# Functions
+
+
+def heuristic_computer_move(game_board, symbol=2):
+    '''Computer move for easy level, returns the position from 1 to 9 it plays
+    game_board: the list of the selected values of the cells (0, 1 or 2)
+    symbol: the player the computer plays as
+    '''
+    return random.choice(heuristic_candidate_moves(game_board, symbol))
+
+
+def heuristic_candidate_moves(game_board, symbol=2):
+    '''Returns the list of the positions from 1 to 9 the easy level computer chooses its move from
+    game_board: the list of the selected values of the cells (0, 1 or 2)
+    symbol: the player the computer plays as
+    '''
+    if 0 not in game_board:
+        raise Exception('All LEDs are selected')
+
+    # Define a list of possible moves
+    all_possible_moves = [
+        i for i, val in enumerate(game_board) if val == 0]
+
+    # Check if there is an opportunity to win the self
+    for move in all_possible_moves:
+        test_board = game_board.copy()
+        test_board[move] = symbol
+        for i in range(3):
+            # Check rows
+            if test_board[i*3:(i+1)*3] == [symbol]*3:
+                return [move + 1]
+            # Check columns
+            if test_board[i::3] == [symbol]*3:
+                return [move + 1]
+        # Check diagonals
+        if test_board[0::4] == [symbol]*3 or test_board[2:7:2] == [symbol]*3:
+            return [move + 1]
+
+    # Check if the opponent has an opportunity to win
+    opponent_symbol = 1 if symbol == 2 else 2
+    for move in all_possible_moves:
+        test_board = game_board.copy()
+        test_board[move] = opponent_symbol
+        for i in range(3):
+            # Check rows
+            if test_board[i*3:(i+1)*3] == [opponent_symbol]*3:
+                return [move + 1]
+            # Check columns
+            if test_board[i::3] == [opponent_symbol]*3:
+                return [move + 1]
+        # Check diagonals
+        if test_board[0::4] == [opponent_symbol]*3 or test_board[2:7:2] == [opponent_symbol]*3:
+            return [move + 1]
+
+    def add_available_positions(list1, list2):
+        for i in list2:
+            if i not in list1:
+                list1.append(i)
+        return list1
+
+        # Check if a empty cell is available near to already selected cell by the computer
+    if symbol in game_board:
+        positions = [i for i, val in enumerate(
+            game_board) if val == symbol]
+        possible_moves = []
+        for position in positions:
+            if position == 0:
+                can_1 = True if (
+                    game_board[1] == 0 and game_board[2] == 0) else False
+                can_3 = True if (
+                    game_board[3] == 0 and game_board[6] == 0) else False
+                can_4 = True if (
+                    game_board[4] == 0 and game_board[8] == 0) else False
+
+                if can_1 and can_3 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 3, 4, 2, 6, 8])
+                elif can_1 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 3, 2, 6])
+                elif can_1 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 4, 2, 8])
+                elif can_3 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [3, 4, 6, 8])
+                elif can_1:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 2])
+                elif can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [3, 6])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [4, 8])
+
+            elif position == 1:
+                can_0 = True if (
+                    game_board[0] == 0 and game_board[2] == 0) else False
+                can_4 = True if (
+                    game_board[0] == 0 and game_board[8] == 0) else False
+
+                if can_0 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 4, 2, 8])
+                elif can_0:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 2])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [4, 8])
+
+            elif position == 2:
+                can_1 = True if (
+                    game_board[0] == 0 and game_board[1] == 0) else False
+                can_5 = True if (
+                    game_board[5] == 0 and game_board[8] == 0) else False
+                can_4 = True if (
+                    game_board[4] == 0 and game_board[6] == 0) else False
+
+                if can_1 and can_5 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 5, 4, 0, 8, 6])
+                elif can_1 and can_5:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 5, 0, 8])
+                elif can_1 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 4, 0, 6])
+                elif can_5 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [5, 4, 8, 6])
+                elif can_1:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 0])
+                elif can_5:
+                    possible_moves = add_available_positions(
+                        possible_moves, [5, 8])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [4, 6])
+
+            elif position == 3:
+                can_0 = True if (
+                    game_board[0] == 0 and game_board[6] == 0) else False
+                can_4 = True if (
+                    game_board[4] == 0 and game_board[5] == 0) else False
+
+                if can_0 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 4, 6, 5])
+                elif can_0:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 6])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [4, 5])
+
+            elif position == 4:
+                can_0 = True if (
+                    game_board[0] == 0 and game_board[8] == 0) else False
+                can_1 = True if (
+                    game_board[1] == 0 and game_board[7] == 0) else False
+                can_2 = True if (
+                    game_board[2] == 0 and game_board[6] == 0) else False
+                can_3 = True if (
+                    game_board[3] == 0 and game_board[5] == 0) else False
+
+                if can_0 and can_1 and can_2 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 1, 2, 3, 5, 6, 7, 8])
+                elif can_0 and can_1 and can_2:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 1, 2, 6, 7, 8])
+                elif can_0 and can_1 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 1, 3, 5, 7, 8])
+                elif can_0 and can_2 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 2, 3, 5, 6, 8])
+                elif can_1 and can_2 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 2, 3, 5, 6, 7])
+                elif can_0 and can_1:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 1, 7, 8])
+                elif can_0 and can_2:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 2, 6, 8])
+                elif can_0 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 3, 5, 8])
+                elif can_1 and can_2:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 2, 6, 7])
+                elif can_1 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 3, 5, 7])
+                elif can_2 and can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 3, 5, 6])
+                elif can_0:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 8])
+                elif can_1:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 7])
+                elif can_2:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 6])
+                elif can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [3, 5])
+
+            elif position == 5:
+                can_2 = True if (
+                    game_board[2] == 0 and game_board[8] == 0) else False
+                can_4 = True if (
+                    game_board[3] == 0 and game_board[4] == 0) else False
+
+                if can_2 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 3, 4, 8])
+                elif can_2:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 8])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [3, 4])
+
+            elif position == 6:
+                can_3 = True if (
+                    game_board[0] == 0 and game_board[3] == 0) else False
+                can_7 = True if (
+                    game_board[7] == 0 and game_board[8] == 0) else False
+                can_4 = True if (
+                    game_board[2] == 0 and game_board[4] == 0) else False
+
+                if can_3 and can_7 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 2, 3, 4, 7, 8])
+                elif can_3 and can_7:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 3, 7, 8])
+                elif can_3 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 2, 3, 4])
+                elif can_7 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 4, 7, 8])
+                elif can_3:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 3])
+                elif can_7:
+                    possible_moves = add_available_positions(
+                        possible_moves, [7, 8])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 4])
+
+            elif position == 7:
+                can_6 = True if (
+                    game_board[6] == 0 and game_board[8] == 0) else False
+                can_4 = True if (
+                    game_board[1] == 0 and game_board[4] == 0) else False
+
+                if can_6 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 4, 6, 8])
+                elif can_6:
+                    possible_moves = add_available_positions(
+                        possible_moves, [6, 8])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [1, 4])
+
+            elif position == 8:
+                can_7 = True if (
+                    game_board[6] == 0 and game_board[7] == 0) else False
+                can_5 = True if (
+                    game_board[2] == 0 and game_board[5] == 0) else False
+                can_4 = True if (
+                    game_board[0] == 0 and game_board[4] == 0) else False
+
+                if can_7 and can_5 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 2, 4, 5, 6, 7])
+                elif can_7 and can_5:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 5, 6, 7])
+                elif can_7 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 4, 6, 7])
+                elif can_5 and can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 2, 4, 5])
+                elif can_7:
+                    possible_moves = add_available_positions(
+                        possible_moves, [6, 7])
+                elif can_5:
+                    possible_moves = add_available_positions(
+                        possible_moves, [2, 5])
+                elif can_4:
+                    possible_moves = add_available_positions(
+                        possible_moves, [0, 4])
+        if len(possible_moves) != 0:
+            return [move + 1 for move in possible_moves]
+
+    # If there is no opportunity to win or block the opponent's winning move, sdo a random move
+    return [move + 1 for move in all_possible_moves]
+
+
+def random_computer_move(game_board, symbol=2):
+    '''Computer move that plays a random empty cell, returns the position from 1 to 9 it plays
+    game_board: the list of the selected values of the cells (0, 1 or 2)
+    symbol: the player the computer plays as
+    '''
+    if 0 not in game_board:
+        raise Exception('All LEDs are selected')
+    return random.choice([i + 1 for i, val in enumerate(game_board) if val == 0])
+
+
+def register_computer_player(name, computer_player):
+    '''Registers a computer player so that it can be chosen by name and played in the tournament
+    name: the name of the computer player
+    computer_player: a function that takes the game board and returns the position from 1 to 9 player 2 plays
+    '''
+    if not isinstance(name, str):
+        raise TypeError('name must be a string')
+    if not callable(computer_player):
+        raise TypeError('computer_player must be callable')
+    computer_players[name] = computer_player
+
+
+# The registered computer players by name, the heuristic of do_computer_move is the first one
+computer_players = {}
+register_computer_player('heuristic', heuristic_computer_move)
+register_computer_player('random', random_computer_move)
@@ -0,0 +1,111 @@
+# Keeps the images of the pygame renderer scaled for a screen size on the disk
+# The images are scaled once per screen size with a smooth filter and saved as raw pixels, so the next start
+# at the same size maps them from the file without decoding, decompressing or scaling the artwork again
+# The raw pixels take 4 bytes per pixel on the disk (about 70 MB for 1920x1080), a start reads them in a few
+# milliseconds when the file is in the page cache
+# The cache of a size is made again when the artwork files or the layout change
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import pygame as pg
+from layout import get_layout_version
+
+# Constants
+CACHE_DIRECTORY = 'asset_cache'
+IMAGE_DIRECTORY = 'assets/images'
+INDEX_LENGTH = struct.Struct('!I')
+
+# Functions
+
+
+def get_cache_key(images, sizes):
+    '''Returns a hash of the image files, their sizes and the layout, it changes when one of them changes
+    images: A dictionary of the image names and their file name and size name
+    sizes: A dictionary of the size names and their size in pixels
+    '''
+    digest = hashlib.sha1(get_layout_version().encode())
+    for name, (file_name, size_name) in sorted(images.items()):
+        stat = os.stat(os.path.join(IMAGE_DIRECTORY, file_name))
+        digest.update(repr((name, file_name, sizes[size_name], stat.st_size, stat.st_mtime_ns)).encode())
+    return digest.hexdigest()
+
+
+def scale_images(images, sizes):
+    '''Loads the image files and returns a dictionary of the names and the images scaled to their sizes'''
+    loaded_files = {}
+    scaled_images = {}
+    for name, (file_name, size_name) in images.items():
+        if file_name not in loaded_files:
+            loaded_files[file_name] = pg.image.load(os.path.join(IMAGE_DIRECTORY, file_name))
+        image = loaded_files[file_name]
+        size = sizes[size_name]
+        if image.get_size() == size:
+            scaled_images[name] = image
+            continue
+        try:
+            scaled_images[name] = pg.transform.smoothscale(image, size)
+        except ValueError:
+            # Smooth scaling needs 24 or 32 bit pixels
+            scaled_images[name] = pg.transform.scale(image, size)
+    return scaled_images
+
+
+def read_cache(file_name, key):
+    '''Returns the images of the cache file, or None if there is no cache file for the key'''
+    try:
+        with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index_length, = INDEX_LENGTH.unpack_from(data)
+            index = json.loads(data[INDEX_LENGTH.size:INDEX_LENGTH.size + index_length])
+            if index['key'] != key:
+                return None
+
+            scaled_images = {}
+            offset = INDEX_LENGTH.size + index_length
+            for name, width, height in index['images']:
+                length = width * height * 4
+                if offset + length > len(data):
+                    raise ValueError('the cache file is truncated')
+                # The surface keeps the bytes of its pixels, the file is closed after
+                scaled_images[name] = pg.image.frombuffer(data[offset:offset + length], (width, height), 'RGBA')
+                offset += length
+            return scaled_images
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print('Error while loading the scaled images: {}'.format(e))
+        return None
+
+
+def write_cache(file_name, key, scaled_images):
+    '''Saves the images to the cache file, the file is replaced at once'''
+    entries = [[name, image.get_width(), image.get_height()] for name, image in scaled_images.items()]
+    index = json.dumps({'key': key, 'images': entries}).encode()
+
+    try:
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name + '.tmp', 'wb') as file:
+            file.write(INDEX_LENGTH.pack(len(index)))
+            file.write(index)
+            for image in scaled_images.values():
+                file.write(pg.image.tobytes(image, 'RGBA'))
+        os.replace(file_name + '.tmp', file_name)
+    except OSError as e:
+        print('Error while saving the scaled images: {}'.format(e))
+
+
+def load_scaled_images(images, sizes, directory=CACHE_DIRECTORY):
+    '''Returns a dictionary of the image names and the images scaled to their sizes, from the cache if it is there
+    images: A dictionary of the image names and their file name in assets/images and the name of their size
+    sizes: A dictionary of the size names and their size in pixels, with the size of the screen as 'screen'
+    directory: The directory of the cache files, one file per screen size
+    '''
+    file_name = os.path.join(directory, '{}x{}.cache'.format(*sizes['screen']))
+    key = get_cache_key(images, sizes)
+    scaled_images = read_cache(file_name, key)
+    if scaled_images is None:
+        scaled_images = scale_images(images, sizes)
+        write_cache(file_name, key, scaled_images)
+    return scaled_images
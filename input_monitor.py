@@ -0,0 +1,114 @@
+# Measures the latency of the buttons and turns off the reporting of the buttons that are not used
+# Every digital message from the board is timestamped when the iterator thread reads it,
+# so the latency from the message to the press seen by the game loop can be measured
+# The p99 latency of the last presses is checked against a target every LATENCY_SAMPLES presses, with a warning
+# when it is over the target
+# Reporting is turned off for the ports whose buttons are ignored on the current screen, the reporting
+# messages are sent by the serial writer thread so the game thread never writes to the serial port
+# Firmata reports the digital pins by port of 8 pins, so the buttons of a port are turned off only together. With
+# the default wiring the three buttons are on port 1 and one of them is always needed, so the reporting stays on
+# and the monitor only measures the latency
+
+import collections
+import time
+from pyfirmata import DIGITAL_MESSAGE
+
+# Constants
+LATENCY_SAMPLES = 50
+LATENCY_TARGET = 0.02
+
+# Classes
+
+
+class InputMonitor:
+    '''Measures the input latency of the buttons and turns the reporting of their ports on and off'''
+
+    def __init__(self, board, buttons, serial_writer=None, latency_target=LATENCY_TARGET):
+        '''Initializes the monitor and timestamps the digital messages of the board
+        board: The Arduino board object
+        buttons: The list of the pyfirmata pins of the buttons
+        serial_writer: The SerialWriter that sends the reporting messages, they are sent directly if it is None
+        latency_target: The p99 latency in seconds the presses should stay under
+        message_times: A dictionary of the port numbers and the time their last digital message was read
+        reporting_ports: The set of the port numbers that report their values
+        latencies: The latencies of the last presses, from the digital message to the press seen by the game loop
+        presses_since_check: The number of presses recorded since the latency was last checked
+        over_target: A boolean that represents whether the p99 latency was over the target at the last check or not
+        messages: The number of digital messages read from the board
+        '''
+        self.board = board
+        self.buttons = buttons
+        self.serial_writer = serial_writer
+        self.message_times = {}
+        self.reporting_ports = set(
+            button.port.port_number for button in buttons)
+        self.latency_target = latency_target
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.presses_since_check = 0
+        self.over_target = False
+        self.messages = 0
+
+        # Wrap the digital message handler of the board to timestamp the messages
+        handler = board._command_handlers[DIGITAL_MESSAGE]
+
+        def timestamp_digital_message(port_nr, lsb, msb):
+            self.message_times[port_nr] = time.perf_counter()
+            self.messages += 1
+            handler(port_nr, lsb, msb)
+        timestamp_digital_message.bytes_needed = handler.bytes_needed
+        board._command_handlers[DIGITAL_MESSAGE] = timestamp_digital_message
+
+    def record_press(self, button):
+        '''Records the latency of a press seen by the game loop
+        button: The pyfirmata pin of the button
+        '''
+        message_time = self.message_times.get(button.port.port_number)
+        if message_time is None:
+            return
+        self.latencies.append(time.perf_counter() - message_time)
+        self.presses_since_check += 1
+        if self.presses_since_check >= LATENCY_SAMPLES:
+            self.check_latency()
+
+    def check_latency(self):
+        '''Checks the p99 latency of the last presses against the target and warns when it is over it'''
+        self.presses_since_check = 0
+        count, average_latency, p95_latency, p99_latency = self.get_latency_report()
+        self.over_target = p99_latency > self.latency_target * 1000
+        if self.over_target:
+            print('Warning: the p99 input latency is {:.1f} ms over {} presses, the target is {:.1f} ms'.format(
+                p99_latency, count, self.latency_target * 1000))
+
+    def update_reporting(self, needed_buttons):
+        '''Turns the reporting on only for the ports of the buttons that are used on the current screen
+        needed_buttons: The list of the pyfirmata pins of the buttons the game can act on
+        '''
+        needed_ports = set(button.port for button in needed_buttons)
+        needed_port_numbers = set(port.port_number for port in needed_ports)
+
+        # A port reports all its pins, so a port is turned off only when none of its buttons is needed
+        for button in self.buttons:
+            port = button.port
+            if port.port_number in needed_port_numbers and port.port_number not in self.reporting_ports:
+                self.set_reporting(port, True)
+                self.reporting_ports.add(port.port_number)
+            elif port.port_number not in needed_port_numbers and port.port_number in self.reporting_ports:
+                self.set_reporting(port, False)
+                self.reporting_ports.discard(port.port_number)
+
+    def set_reporting(self, port, enabled):
+        '''Turns the reporting of the port on or off, from the writer thread if there is a serial writer'''
+        if self.serial_writer is not None:
+            self.serial_writer.set_reporting(port.port_number, enabled)
+        elif enabled:
+            port.enable_reporting()
+        else:
+            port.disable_reporting()
+
+    def get_latency_report(self):
+        '''Returns the number of measured presses and the average, the p95 and the p99 latency in milliseconds'''
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0, 0, 0, 0
+        return (len(latencies), sum(latencies) / len(latencies) * 1000, latencies[len(latencies) * 95 // 100] * 1000,
+                latencies[len(latencies) * 99 // 100] * 1000)
@@ -0,0 +1,136 @@
+# Records a cabinet session as a trace that can be replayed
+# The trace has the edges of the buttons with the step of the game loop they were read at, the seed of
+# the random numbers and the LED writes of the game. While a session is recorded the game takes its time
+# from the number of steps, so replaying the same edges at the same steps gives the same game
+# See replay_trace.py for the replay
+
+import json
+import random
+import time
+
+# Constants
+TRACE_VERSION = 1
+BUTTON_NAMES = ['nav_button', 'select_button', 'back_button']
+
+# Classes
+
+
+class RecordedButton:
+    '''Reads a button pin and records the changes of its value'''
+
+    def __init__(self, pin, name, recorder):
+        '''Wraps the pin of a button
+        pin: The pyfirmata pin of the button
+        name: The name of the button in the trace
+        recorder: The TraceRecorder the edges are recorded to
+        '''
+        self.pin = pin
+        self.name = name
+        self.recorder = recorder
+        self.last_value = None
+
+    def __getattr__(self, name):
+        return getattr(self.pin, name)
+
+    def read(self):
+        '''Reads the value of the pin and records it if it has changed'''
+        value = self.pin.read()
+        if value != self.last_value:
+            self.last_value = value
+            self.recorder.record_edge(self.name, value)
+        return value
+
+
+class RecordedWriter:
+    '''Records the LED writes of the game before they are queued to the serial writer'''
+
+    def __init__(self, serial_writer, recorder):
+        '''Wraps the serial writer of the LEDs
+        serial_writer: The SerialWriter of the board, or None if the LEDs are written directly
+        recorder: The TraceRecorder the writes are recorded to
+        '''
+        self.serial_writer = serial_writer
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.serial_writer, name)
+
+    def write(self, pin, value):
+        '''Records the write and queues it'''
+        self.recorder.record_led_write(pin, value)
+        self.serial_writer.write(pin, value)
+
+
+class TraceRecorder:
+    '''Records the button edges and the LED writes of a game loop'''
+
+    def __init__(self, game_loop, update_interval, led_pins, nav_button_pin, select_button_pin, back_button_pin,
+                 seed=None):
+        '''Starts recording the game loop, it must be called before the loop is started
+        game_loop: The GameLoop to record
+        update_interval: The time in seconds between two steps of the loop
+        led_pins: The dictionary of the LED pins
+        nav_button_pin, select_button_pin, back_button_pin: The pin numbers of the buttons
+        seed: The seed of the random numbers, the current time is used if it is None
+        '''
+        self.game_loop = game_loop
+        self.seed = int(time.time()) if seed is None else seed
+        self.trace = {
+            'version': TRACE_VERSION,
+            'seed': self.seed,
+            'update_interval': update_interval,
+            'led_pins': {str(position): pin for position, pin in led_pins.items()},
+            'button_pins': {'nav_button': nav_button_pin, 'select_button': select_button_pin,
+                            'back_button': back_button_pin},
+            'events': [],
+            'led_writes': [],
+            'steps': 0,
+        }
+
+        # The game takes its time from the steps, so the replay does not depend on the speed of the computer
+        game = game_loop.game
+        game.clock = lambda: game_loop.step_count * update_interval
+        random.seed(self.seed)
+
+        for name in BUTTON_NAMES:
+            setattr(game_loop, name, RecordedButton(
+                getattr(game_loop, name), name, self))
+        for led in game.leds:
+            if led.serial_writer is not None:
+                led.serial_writer = RecordedWriter(led.serial_writer, self)
+
+    def record_edge(self, name, value):
+        '''Records a change of the value of a button at the current step'''
+        self.trace['events'].append([self.game_loop.step_count, name, value])
+
+    def record_led_write(self, pin, value):
+        '''Records a write of an LED pin at the current step'''
+        self.trace['led_writes'].append([self.game_loop.step_count, pin, value])
+
+    def save(self, file_name):
+        '''Saves the trace to a JSON file'''
+        self.trace['steps'] = self.game_loop.step_count
+        save_trace(self.trace, file_name)
+
+# Functions
+
+
+def save_trace(trace, file_name):
+    '''Saves a trace to a JSON file'''
+    try:
+        with open(file_name, 'w') as file:
+            json.dump(trace, file)
+    except OSError as e:
+        print('Error while saving the trace: {}'.format(e))
+
+
+def load_trace(file_name):
+    '''Loads a trace from a JSON file'''
+    with open(file_name) as file:
+        trace = json.load(file)
+    if trace.get('version') != TRACE_VERSION:
+        raise ValueError('{} is not a trace of version {}'.format(
+            file_name, TRACE_VERSION))
+    trace['led_pins'] = {int(position): pin for position,
+                         pin in trace['led_pins'].items()}
+    return trace
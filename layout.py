@@ -0,0 +1,86 @@
+# The layout of the pygame renderer for any screen size
+# The artwork is drawn for a 1200x800 screen and the full screen windows are stretched to the screen, so every
+# position and size of the board, the pieces, the HUD and the messages is kept relative to the screen size and
+# turned into pixels once when the layout of a screen size is made. Nothing is scaled or placed per frame
+
+import hashlib
+
+# Constants
+DESIGN_WIDTH = 1200
+DESIGN_HEIGHT = 800
+
+# Functions
+
+
+def relative(x, y):
+    '''Returns a point or a size of the 1200x800 artwork relative to the width and the height of the screen'''
+    return (x / DESIGN_WIDTH, y / DESIGN_HEIGHT)
+
+
+# The positions on the screen, relative to its size
+CELL_POSITIONS = [relative(73, 77), relative(256, 77), relative(439, 77), relative(73, 259),
+                  relative(256, 259), relative(439, 259), relative(73, 442), relative(256, 442), relative(439, 442)]
+PIECE_POSITIONS = [relative(101, 101), relative(288, 101), relative(468, 101), relative(101, 281),
+                   relative(288, 281), relative(468, 281), relative(101, 466), relative(288, 466), relative(468, 466)]
+PLAYER_POSITION = relative(912, 130)
+LIFE_POSITIONS = [relative(894, 220), relative(960, 220), relative(1026, 220)]
+SCORE_POSITIONS = {1: relative(982, 503), 2: relative(982, 590)}
+NOTIFICATION_POSITION = relative(65, 660)
+MESSAGE_POSITION = relative(218, 116)
+
+# The sizes of the images, relative to the size of the screen
+SIZES = {
+    'screen': (1, 1),
+    'notification': relative(561, 121),
+    'cell': relative(164, 164),
+    'message': relative(764, 548),
+    'piece': relative(107, 118),
+    'player': relative(53.5, 59),
+    'life': relative(54, 48),
+    'score': relative(120, 30),
+}
+
+# Classes
+
+
+class Layout:
+    '''The positions and the sizes of the renderer in pixels for one screen size'''
+
+    def __init__(self, screen_width, screen_height):
+        '''Turns the relative layout into pixels
+        screen_width: The width of the screen
+        screen_height: The height of the screen
+        cell_positions: The top left corners of the backgrounds of the cells
+        piece_positions: The top left corners of the X and O images of the cells
+        player_position, life_positions, score_positions: The positions of the HUD
+        notification_position, message_position: The positions of the notifications and of the end of round messages
+        sizes: A dictionary of the names of the SIZES and their size in pixels
+        font_size: The size of the font of the score
+        '''
+        if not isinstance(screen_width, int) or not isinstance(screen_height, int):
+            raise TypeError('the screen size must be integers')
+
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.cell_positions = [self.get_point(point) for point in CELL_POSITIONS]
+        self.piece_positions = [self.get_point(point) for point in PIECE_POSITIONS]
+        self.player_position = self.get_point(PLAYER_POSITION)
+        self.life_positions = [self.get_point(point) for point in LIFE_POSITIONS]
+        self.score_positions = {player: self.get_point(point) for player, point in SCORE_POSITIONS.items()}
+        self.notification_position = self.get_point(NOTIFICATION_POSITION)
+        self.message_position = self.get_point(MESSAGE_POSITION)
+        self.sizes = {name: self.get_size(size) for name, size in SIZES.items()}
+        self.font_size = self.sizes['score'][1]
+
+    def get_point(self, point):
+        '''Returns the pixel of a point relative to the screen'''
+        return (round(point[0] * self.screen_width), round(point[1] * self.screen_height))
+
+    def get_size(self, size):
+        '''Returns the size in pixels of a size relative to the screen, at least one pixel'''
+        return (max(1, round(size[0] * self.screen_width)), max(1, round(size[1] * self.screen_height)))
+
+
+def get_layout_version():
+    '''Returns a hash of the relative layout, the images scaled for an older layout must be scaled again'''
+    return hashlib.sha1(repr(sorted(SIZES.items())).encode()).hexdigest()
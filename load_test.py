@@ -0,0 +1,133 @@
+# Load test client for the game server
+# Opens many idle connections, many tables that play random moves against the computer and many tables
+# where two clients play random moves against each other, then prints the moves per second and the latency percentiles measured on the clients
+
+import argparse
+import asyncio
+import random
+import time
+from server import GameClient, PORT, STATE, decode_state
+
+# Functions
+
+
+async def play_table(host, port, table, duration, latencies):
+    '''Plays random moves against the computer on one table until the duration has passed
+    host: the host of the server
+    port: the port of the server
+    table: the number of the table
+    duration: the number of seconds to play
+    latencies: the list the latency of every move is appended to
+    '''
+    client = await GameClient.connect(host, port)
+    reply = await client.join(table, True)
+    end_time = time.perf_counter() + duration
+
+    while time.perf_counter() < end_time:
+        if reply[0] != STATE:
+            raise RuntimeError('Table {} got an error reply'.format(table))
+        cells, player, current_player, remaining_chances, finished, score, champion = decode_state(
+            reply)
+
+        start_time = time.perf_counter()
+        if finished:
+            reply = await client.next_chance()
+        else:
+            position = random.choice(
+                [i + 1 for i, cell in enumerate(cells) if cell == 0])
+            reply = await client.move(position)
+        latencies.append(time.perf_counter() - start_time)
+
+    client.close()
+
+
+async def play_human_table(host, port, table, duration, latencies):
+    '''Plays random moves with two clients against each other on one table until the duration has passed
+    Every reply is checked against the state pushed to the other client
+    host: the host of the server
+    port: the port of the server
+    table: the number of the table
+    duration: the number of seconds to play
+    latencies: the list the latency of every move is appended to
+    '''
+    clients = [await GameClient.connect(host, port) for _ in range(2)]
+    await clients[0].join(table)
+    reply = await clients[1].join(table)
+    await clients[0].wait_for_state()
+    end_time = time.perf_counter() + duration
+
+    while time.perf_counter() < end_time:
+        if reply[0] != STATE:
+            raise RuntimeError('Table {} got an error reply'.format(table))
+        cells, player, current_player, remaining_chances, finished, score, champion = decode_state(
+            reply)
+
+        start_time = time.perf_counter()
+        if finished:
+            client, other_client = clients
+            reply = await client.next_chance()
+        else:
+            client, other_client = clients[current_player - 1], clients[2 - current_player]
+            position = random.choice(
+                [i + 1 for i, cell in enumerate(cells) if cell == 0])
+            reply = await client.move(position)
+        latencies.append(time.perf_counter() - start_time)
+
+        # The other client is pushed the same state, only the player of the client differs
+        pushed_state = decode_state(await other_client.wait_for_state())
+        reply_state = decode_state(reply)
+        if pushed_state[0] != reply_state[0] or pushed_state[2:] != reply_state[2:]:
+            raise RuntimeError('Table {} pushed another state than the reply'.format(table))
+
+    for client in clients:
+        client.close()
+
+
+async def open_idle_connections(host, port, count):
+    '''Opens connections that never send a request and returns them'''
+    connections = []
+    for _ in range(count):
+        connections.append(await asyncio.open_connection(host, port))
+    return connections
+
+
+async def run_load_test(host, port, tables, human_tables, idle, duration):
+    '''Runs the load test and prints the report'''
+    idle_connections = await open_idle_connections(host, port, idle)
+
+    latencies = []
+    start_time = time.perf_counter()
+    await asyncio.gather(*[play_table(host, port, table, duration, latencies)
+                           for table in range(tables)],
+                         *[play_human_table(host, port, table, duration, latencies)
+                           for table in range(tables, tables + human_tables)])
+    elapsed_time = time.perf_counter() - start_time
+
+    for reader, writer in idle_connections:
+        writer.close()
+
+    latencies.sort()
+    print('Idle connections: {}'.format(idle))
+    print('Tables against the computer: {}'.format(tables))
+    print('Human vs human tables: {}'.format(human_tables))
+    print('Moves: {}'.format(len(latencies)))
+    print('Moves per second: {:.0f}'.format(len(latencies) / elapsed_time))
+    for percentile in (50, 90, 99):
+        index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+        print('p{} latency: {:.3f} ms'.format(
+            percentile, latencies[index] * 1000))
+
+
+# Main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--tables', type=int, default=100)
+    parser.add_argument('--human-tables', type=int, default=50)
+    parser.add_argument('--idle', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(args.host, args.port,
+                args.tables, args.human_tables, args.idle, args.duration))
@@ -2,26 +2,35 @@
 import pygame as pg
 import sys
 from pygame.locals import *
-from pyfirmata import Arduino, util, INPUT, OUTPUT, PWM
-from tictactoe import play_tic_tac_toe
+from pyfirmata import util, INPUT, OUTPUT, PWM
+from cabinet_config import CONFIG_FILE, load_config, open_board
+from tictactoe import SNAPSHOT_FILE, play_tic_tac_toe
 
 # Constants
-ARDUINO_PORT = 'COM6'
-LED_PINS = {1: 2, 2: 3, 3: 4, 4: 5, 5: 6, 6: 7, 7: 8, 8: 9, 9: 10}
-BUTTON_1 = 11
-BUTTON_2 = 12
-BUTTON_3 = 13
-NAV_BUTTON_PIN = BUTTON_1
-SELECT_BUTTON_PIN = BUTTON_2
-BACK_BUTTON_PIN = BUTTON_3
+# The port, the pins, the timing, the cabinet number and the spectator hub of the cabinet are in its config file,
+# given with --config FILE
+# Any size can be used, from 800x480 to 1920x1080 displays
+SCREEN_SIZE = (1200, 800)
+VALUE_TABLE_FILE = 'value_table_3x3.npy'
 
 
 # Main function
 if __name__ == '__main__':
 
+    config_file = CONFIG_FILE
+    if '--config' in sys.argv[1:-1]:
+        config_file = sys.argv[sys.argv.index('--config') + 1]
+
+    try:
+        # Load and check the wiring of the cabinet once
+        config = load_config(config_file)
+    except ValueError as e:
+        print('Error while loading the config: {}'.format(e))
+        exit(1)
+
     try:
-        # Connect to the Arduino board
-        board = Arduino(ARDUINO_PORT)
+        # Connect to the Arduino board, on the detected port if the port is auto
+        board = open_board(config)
 
         # Start an iterator thread so that serial buffer doesn't overflow
         it = util.Iterator(board)
@@ -30,11 +39,34 @@ if __name__ == '__main__':
         print('Error while connecting to the Arduino board: {}'.format(e))
         exit(1)
 
+    renderer = None
+    if '--terminal' in sys.argv[1:]:
+        # Show the game in the terminal instead of a pygame window, for the boards without a display
+        from curses_renderer import CursesRenderer
+        renderer = CursesRenderer()
+
+    trace_file = None
+    if '--trace' in sys.argv[1:-1]:
+        # Record the button edges and the LED writes of the session, replay_trace.py replays them
+        trace_file = sys.argv[sys.argv.index('--trace') + 1]
+
+    computer_player = None
+    if '--learned' in sys.argv[1:]:
+        # Play against the value table trained by value_learning.py instead of the heuristic
+        try:
+            from value_learning import LearnedPlayer
+            computer_player = LearnedPlayer(VALUE_TABLE_FILE).computer_move
+        except Exception as e:
+            print('Error while loading the value table: {}'.format(e))
+            exit(1)
+
     try:
         # Start to play the tic tac toe game
-        play_tic_tac_toe(NAV_BUTTON_PIN, SELECT_BUTTON_PIN,
-                         BACK_BUTTON_PIN, LED_PINS, board)
+        play_tic_tac_toe(config, board, trace_file=trace_file, spectator_hub=config.spectator_hub,
+                         snapshot_file=SNAPSHOT_FILE, renderer=renderer, screen_size=SCREEN_SIZE, computer_player=computer_player)
     except Exception as e:
+        if renderer is not None:
+            renderer.close()
         print('Error while playing tic-tac-toe: {}'.format(e))
 
     pg.quit()
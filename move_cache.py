@@ -0,0 +1,173 @@
+# Memoisation of the computer moves
+# The candidate moves are stored for the exact board. When the computer player is symmetric by construction,
+# a board and its rotations and reflections get the same moves, so they are stored once for the canonical
+# board (the smallest of its 8 symmetric boards) and mapped back to the real board
+# The cache is a bounded LRU and can be saved to a file to start warm after a restart
+
+import collections
+import hashlib
+import json
+import os
+import random
+import threading
+from game_core import heuristic_candidate_moves, register_computer_player
+
+# Constants
+CACHE_SIZE = 1024
+CACHE_FILE = 'move_cache.json'
+SAVE_EVERY = 20
+
+# Functions
+
+
+def get_symmetries():
+    '''Returns the 8 rotations and reflections of the 3x3 board as lists of cell indexes
+    The cell i of a transformed board is the cell symmetry[i] of the original board
+    '''
+    rotate = [6, 3, 0, 7, 4, 1, 8, 5, 2]
+    reflect = [2, 1, 0, 5, 4, 3, 8, 7, 6]
+    symmetries = []
+    symmetry = list(range(9))
+    for _ in range(4):
+        symmetries.append(symmetry)
+        symmetries.append([symmetry[i] for i in reflect])
+        symmetry = [symmetry[i] for i in rotate]
+    return symmetries
+
+
+SYMMETRIES = get_symmetries()
+
+
+def get_code_version(function):
+    '''Returns a hash of the code of a function and of the functions defined in it, it changes when the code changes'''
+    digest = hashlib.sha1()
+
+    def add_code(code):
+        digest.update(code.co_code)
+        for constant in code.co_consts:
+            # The repr of a code object has its memory address, so nested functions are hashed by their code
+            if hasattr(constant, 'co_code'):
+                add_code(constant)
+            else:
+                digest.update(repr(constant).encode())
+    add_code(function.__code__)
+    return digest.hexdigest()
+
+
+def get_canonical_board(game_board):
+    '''Returns the canonical board and the symmetry that transforms the board into it
+    game_board: the list of the selected values of the cells (0, 1 or 2)
+    '''
+    return min((tuple(game_board[i] for i in symmetry), symmetry) for symmetry in SYMMETRIES)
+
+# Classes
+
+
+class MoveCache:
+    '''Remembers the candidate moves of the computer for the boards, or for the canonical boards'''
+
+    def __init__(self, candidate_moves=heuristic_candidate_moves, size=CACHE_SIZE, file_name=None, symmetric=False):
+        '''Initializes the cache and loads the saved moves
+        candidate_moves: The function that returns the candidate positions from 1 to 9 for a board
+        size: The maximum number of boards in the cache
+        file_name: The file the cache is saved to and loaded from, it is not saved if it is None
+        symmetric: A boolean that represents whether candidate_moves gives the same moves to the rotations and
+                   reflections of a board or not, the heuristic does not so its boards are cached as they are
+        hits: The number of moves found in the cache
+        misses: The number of moves that had to be computed
+        evictions: The number of boards removed because the cache was full
+        '''
+        self.candidate_moves = candidate_moves
+        self.size = size
+        self.file_name = file_name
+        self.symmetric = symmetric
+        self.boards = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.unsaved_boards = 0
+        self.lock = threading.Lock()
+
+        if file_name is not None:
+            self.load()
+
+    def get_candidate_moves(self, game_board):
+        '''Returns the candidate positions from 1 to 9 for the board'''
+        if not self.symmetric:
+            # The games of a multi cabinet host share the cache from their threads
+            with self.lock:
+                return list(self.lookup(tuple(game_board)))
+
+        canonical_board, symmetry = get_canonical_board(game_board)
+        with self.lock:
+            moves = self.lookup(canonical_board)
+
+        # The cell i of the canonical board is the cell symmetry[i] of the real board
+        return [symmetry[move - 1] + 1 for move in moves]
+
+    def lookup(self, board):
+        '''Returns the candidate moves of the board, they are computed if they are not in the cache'''
+        moves = self.boards.get(board)
+        if moves is None:
+            self.misses += 1
+            moves = self.candidate_moves(list(board))
+            self.boards[board] = moves
+            if len(self.boards) > self.size:
+                self.boards.popitem(last=False)
+                self.evictions += 1
+
+            self.unsaved_boards += 1
+            if self.file_name is not None and self.unsaved_boards >= SAVE_EVERY:
+                self.save()
+        else:
+            self.hits += 1
+            self.boards.move_to_end(board)
+        return moves
+
+    def computer_move(self, game_board):
+        '''Returns the position from 1 to 9 the computer plays, it can be used as the computer player of a game'''
+        return random.choice(self.get_candidate_moves(game_board))
+
+    def load(self):
+        '''Loads the saved boards, a missing or broken file starts an empty cache'''
+        if not os.path.exists(self.file_name):
+            return
+        try:
+            with open(self.file_name) as file:
+                saved_boards = json.load(file)
+        except (OSError, ValueError) as e:
+            print('Error while loading the move cache: {}'.format(e))
+            return
+
+        # Moves saved by another version of the computer player or for the other kind of boards are not used
+        if saved_boards.get('version') != self.get_version():
+            return
+
+        for board, moves in saved_boards['boards'][-self.size:]:
+            self.boards[tuple(board)] = moves
+
+    def save(self):
+        '''Saves the boards from the least to the most recently used'''
+        self.unsaved_boards = 0
+        try:
+            with open(self.file_name + '.tmp', 'w') as file:
+                json.dump({'version': self.get_version(),
+                           'boards': [[list(board), moves] for board, moves in self.boards.items()]}, file)
+            os.replace(self.file_name + '.tmp', self.file_name)
+        except OSError as e:
+            print('Error while saving the move cache: {}'.format(e))
+
+    def get_version(self):
+        '''Returns a hash of the code of the computer player, it changes when the code changes or the boards of
+        the cache become canonical
+        '''
+        version = get_code_version(self.candidate_moves)
+        return version + '-symmetric' if self.symmetric else version
+
+    def get_stats(self):
+        '''Returns the number of hits, misses, evictions and boards in the cache'''
+        return self.hits, self.misses, self.evictions, len(self.boards)
+
+
+# The cached heuristic can be played by name, this cache is not saved to a file
+register_computer_player('cached', MoveCache().computer_move)
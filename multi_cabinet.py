@@ -0,0 +1,208 @@
+# Runs several tic tac toe boards from one process
+# Every board gets its own Game that draws on an off screen surface of the size of its viewport, with the assets
+# scaled once for that size, so the host only copies the changed games and never scales a frame
+# The games run their loops in their own threads, so a game that waits (welcome, loading window) never stops the others
+# A game thread copies its screen into a frame buffer under a lock after the steps that drew on it, and the host
+# thread, which owns the window, copies only the new frames into their viewports and updates only those viewports
+#
+# Usage: python multi_cabinet.py [config files]    (the cabinets of CABINETS are played without config files)
+
+import math
+import sys
+import threading
+import time
+import pygame as pg
+from pygame.locals import *
+from pyfirmata import util
+from audio import pre_init_mixer
+from cabinet_config import CabinetConfig, load_config, open_board
+from layout import DESIGN_HEIGHT, DESIGN_WIDTH
+from renderer import PygameRenderer, load_assets
+from spectator import SpectatorStream
+from tictactoe import create_game_loop
+
+# Constants
+WINDOW_WIDTH = 1920
+WINDOW_HEIGHT = 1080
+FPS = 60
+STEP_DELAY = 0.002
+CABINETS = [
+    {'port': 'COM6', 'led_pins': {1: 2, 2: 3, 3: 4, 4: 5, 5: 6, 6: 7, 7: 8, 8: 9, 9: 10},
+     'nav_button_pin': 11, 'select_button_pin': 12, 'back_button_pin': 13, 'cabinet': 0},
+    {'port': 'COM7', 'led_pins': {1: 2, 2: 3, 3: 4, 4: 5, 5: 6, 6: 7, 7: 8, 8: 9, 9: 10},
+     'nav_button_pin': 11, 'select_button_pin': 12, 'back_button_pin': 13, 'cabinet': 1},
+]
+
+# Classes
+
+
+class Cabinet:
+    '''Represents one board and its game running in its own thread'''
+
+    def __init__(self, game_loop, viewport):
+        '''Initializes the cabinet with its game loop and the part of the window it is drawn on
+        game_loop: The GameLoop object of the board
+        viewport: The subsurface of the window the game is copied into
+        running: A boolean that represents whether the thread should keep running or not
+        frame: The last full frame of the game, written by the game thread and read by the host thread
+        frame_ready: A boolean that represents whether the frame has changed since the host drew it or not
+        '''
+        self.game_loop = game_loop
+        self.game = game_loop.game
+        self.viewport = viewport
+        self.running = False
+        self.frame = pg.Surface(viewport.get_size())
+        self.frame_lock = threading.Lock()
+        self.frame_ready = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        '''Starts the game thread'''
+        self.running = True
+        self.thread.start()
+
+    def stop(self):
+        '''Stops the game thread, waits for its last step and then leaves the session of the game'''
+        self.running = False
+        if self.thread.is_alive():
+            self.thread.join()
+        self.game.handle_exit(welcome=False)
+
+    def run(self):
+        '''Runs the game loop until the cabinet is stopped'''
+        try:
+            self.game_loop.start()
+            self.publish_frame()
+            while self.running:
+                self.game_loop.step()
+                self.publish_frame()
+                time.sleep(STEP_DELAY)
+        except Exception as e:
+            print('Error while playing tic-tac-toe: {}'.format(e))
+
+    def publish_frame(self):
+        '''Copies the game screen into the frame if the game has drawn on it, it runs in the game thread'''
+        renderer = self.game.renderer
+        if not renderer.dirty:
+            return
+        renderer.dirty = False
+        with self.frame_lock:
+            self.frame.blit(renderer.screen, (0, 0))
+            self.frame_ready = True
+
+    def draw(self):
+        '''Copies the new frame of the game into the viewport and returns the changed area, it runs in the host thread'''
+        with self.frame_lock:
+            if not self.frame_ready:
+                return None
+            self.frame_ready = False
+            self.viewport.blit(self.frame, (0, 0))
+        return self.viewport.get_abs_offset() + self.viewport.get_size()
+
+# Functions
+
+
+def get_viewports(window, count):
+    '''Splits the window into a grid of viewports that keep the aspect ratio of the game
+    window: the window surface
+    count: the number of viewports
+    '''
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    scale = min(window.get_width() / columns / DESIGN_WIDTH,
+                window.get_height() / rows / DESIGN_HEIGHT)
+    width = int(DESIGN_WIDTH * scale)
+    height = int(DESIGN_HEIGHT * scale)
+
+    viewports = []
+    for i in range(count):
+        x = (i % columns) * width
+        y = (i // columns) * height
+        viewports.append(window.subsurface((x, y, width, height)))
+    return viewports
+
+
+def play_multi_cabinet(cabinets):
+    '''Plays one tic tac toe game per board in a single window
+    cabinets: the list of the CabinetConfig of each board
+    '''
+    if not isinstance(cabinets, list) or len(cabinets) == 0:
+        raise TypeError('cabinets must be a non empty list')
+    if len({cabinet.cabinet for cabinet in cabinets}) != len(cabinets):
+        raise ValueError('every cabinet needs its own cabinet number on the spectator hub')
+
+    # Initialize pygame once for all the games
+    pre_init_mixer()
+    pg.init()
+    window = pg.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pg.display.set_caption('Tic Tac Toe')
+
+    # Load the images and sounds once at the size of the viewports, every game uses the same assets
+    viewports = get_viewports(window, len(cabinets))
+    game_size = viewports[0].get_size()
+    assets = load_assets(*game_size)
+    pg.mixer.music.play(-1)
+
+    running_cabinets = []
+    for number, (cabinet, viewport) in enumerate(zip(cabinets, viewports)):
+        try:
+            # Connect to the Arduino board
+            board = open_board(cabinet)
+
+            # Start an iterator thread so that serial buffer doesn't overflow
+            it = util.Iterator(board)
+            it.start()
+        except Exception as e:
+            print('Error while connecting to the Arduino board on {}: {}'.format(
+                cabinet.port, e))
+            continue
+
+        spectator_stream = None
+        if cabinet.spectator_hub is not None:
+            spectator_stream = SpectatorStream(cabinet.cabinet, board.name, cabinet.spectator_hub)
+        game_loop = create_game_loop(cabinet, board, PygameRenderer(pg.Surface(game_size), assets, False),
+                                     spectator_stream=spectator_stream,
+                                     snapshot_file='session_{}.snapshot'.format(number))
+        running_cabinets.append(Cabinet(game_loop, viewport))
+
+    for cabinet in running_cabinets:
+        cabinet.start()
+
+    fps_clock = pg.time.Clock()
+
+    # Main Loop
+    while True:
+        for event in pg.event.get():
+            if event.type == QUIT:
+                for cabinet in running_cabinets:
+                    cabinet.stop()
+                pg.quit()
+                sys.exit()
+
+        # Update only the viewports of the games that have changed
+        changed_areas = []
+        for cabinet in running_cabinets:
+            area = cabinet.draw()
+            if area is not None:
+                changed_areas.append(area)
+
+        if changed_areas:
+            pg.display.update(changed_areas)
+
+        fps_clock.tick(FPS)
+
+
+# Main function
+if __name__ == '__main__':
+    try:
+        # The configs are checked once before any board is opened
+        if len(sys.argv) > 1:
+            cabinets = [load_config(file_name) for file_name in sys.argv[1:]]
+        else:
+            cabinets = [CabinetConfig(**cabinet) for cabinet in CABINETS]
+        play_multi_cabinet(cabinets)
+    except Exception as e:
+        print('Error while playing tic-tac-toe: {}'.format(e))
+
+    pg.quit()
+    sys.exit()
@@ -0,0 +1,516 @@
+# The pygame renderer of the Tic Tac Toe game
+# It draws the windows, the board and the score on a pygame surface and plays the sounds
+# The window can have any size, the images are scaled once per size and placed with the layout of layout.py
+
+import collections
+import time
+import pygame as pg
+from animation import AnimationFrames, get_fade_alphas
+from audio import AudioManager, pre_init_mixer
+from game_core import Renderer
+from image_cache import load_scaled_images
+from layout import DESIGN_HEIGHT, DESIGN_WIDTH, Layout
+
+# Constants
+# The images of the assets, with their file in assets/images and the name of their size in the layout
+IMAGES = {
+    'loading_window': ('loading.png', 'screen'),
+    'instruction_window': ('instruction.png', 'screen'),
+    'choose_mode_window': ('choose_mode.png', 'screen'),
+    'champion_player_o_window': ('champion_player_o.png', 'screen'),
+    'champion_player_x_window': ('champion_player_x.png', 'screen'),
+    'match_is_draw_window': ('match_is_draw.png', 'screen'),
+    'thankyou_window': ('thankyou.png', 'screen'),
+    'game_board': ('game_board.png', 'screen'),
+    'computer_is_thinking': ('computer_is_thinking.png', 'notification'),
+    'computer_is_thinking_bg': ('computer_is_thinking_bg.png', 'notification'),
+    'select_position': ('select_position.png', 'notification'),
+    'cell_selected_bg': ('cell_selected.png', 'cell'),
+    'cell_not_selected_bg': ('cell_not_selected.png', 'cell'),
+    'player_o_won': ('player_o_won.png', 'message'),
+    'player_x_won': ('player_x_won.png', 'message'),
+    'game_is_tie': ('game_is_tie.png', 'message'),
+    'x_img': ('x.png', 'piece'),
+    'o_img': ('o.png', 'piece'),
+    'player_x': ('x.png', 'player'),
+    'player_o': ('o.png', 'player'),
+    'player_bg': ('player_bg.png', 'player'),
+    'life': ('life.png', 'life'),
+    'life_bg': ('player_bg.png', 'life'),
+}
+
+# Assets loaded per screen size, shared by all the games of the process
+loaded_assets = {}
+
+# Classes
+
+
+class Assets:
+    '''Holds the images, sounds and font of the game so that several games can share them'''
+
+    def __init__(self, screen_width, screen_height):
+        '''Loads the images scaled to the screen size and loads the sounds, pygame must be initialized
+        screen_width: The width the full screen windows are resized to
+        screen_height: The height the full screen windows are resized to
+        layout: The Layout of the screen size, the images are scaled to its sizes
+        '''
+        self.layout = Layout(screen_width, screen_height)
+        self.default_font = pg.font.get_default_font()
+        self.font_renderer = pg.font.Font(
+            self.default_font, self.layout.font_size)
+
+        # Render the digits of the score once
+        self.digit_glyphs = [self.font_renderer.render(
+            str(digit), 1, (255, 255, 255)) for digit in range(10)]
+        self.digit_height = max(glyph.get_height()
+                                for glyph in self.digit_glyphs)
+
+        # Load the images scaled once for this screen size, from the cache of a previous start if it has them
+        for name, image in load_scaled_images(IMAGES, self.layout.sizes).items():
+            setattr(self, name, image)
+
+        # Convert the images to the pixel format of the display so that blitting them is fast
+        if pg.display.get_surface() is not None:
+            for name, image in vars(self).items():
+                if isinstance(image, pg.Surface):
+                    setattr(self, name, image.convert_alpha())
+
+        # Load the sounds
+        self.select_sound = pg.mixer.Sound("assets/sounds/select.wav")
+        self.start_game_sound = pg.mixer.Sound("assets/sounds/start_game.wav")
+        self.won_game_sound = pg.mixer.Sound("assets/sounds/won_game.wav")
+        self.announce_champion_sound = pg.mixer.Sound(
+            "assets/sounds/announce_champion.wav")
+        self.click_button_sound = pg.mixer.Sound(
+            "assets/sounds/click_button.wav")
+        self.alert_sound = pg.mixer.Sound("assets/sounds/alert.wav")
+
+        # Play the sounds on reserved channels from the audio thread
+        self.audio = AudioManager({
+            'select': self.select_sound,
+            'start_game': self.start_game_sound,
+            'won_game': self.won_game_sound,
+            'announce_champion': self.announce_champion_sound,
+            'click_button': self.click_button_sound,
+            'alert': self.alert_sound,
+        })
+
+        # Load the music
+        pg.mixer.music.load("assets/sounds/intro.wav")
+
+
+class PygameRenderer(Renderer):
+    '''Shows the game in a pygame window or on a surface given by a host
+
+    The game board and the HUD (current player, lives and score) are kept composited on one
+    board layer, so showing the board is one blit and a move only draws the cell that changed
+    Everything is drawn through a timeline of frames, so a draw made while an animation plays waits for it
+    '''
+
+    def __init__(self, screen=None, assets=None, music_enabled=True, size=None):
+        '''Initializes the renderer with the screen and the assets
+        screen: The surface to draw on, a new window is created if it is None
+        assets: The shared Assets object for the size of the screen, the assets are loaded if it is None
+        music_enabled: A boolean that represents whether the renderer plays the intro music or not
+        size: The width and height of the new window, 1200x800 if it is None, any size can be used
+        own_display: A boolean that represents whether the renderer owns the window or not
+        board_layer: The game board with the HUD drawn on it
+        drawn_player: The current player drawn on the board layer
+        drawn_life: The remaining chances drawn on the board layer
+        drawn_score: A dictionary of the scores drawn on the board layer
+        changed_areas: The areas drawn since the last frame, None if the whole screen has changed
+        draws: The number of draws on the screen since the renderer was created
+        overlay_area: The area of the display covered by the overlay in the last frame
+        timeline: The queue of the frames waiting to be drawn, with a boolean that tells if they are animated
+        animation_frames: The cached frames of the animations
+        '''
+        super().__init__()
+        self.music_enabled = music_enabled
+        self.dirty = True
+
+        if screen is not None:
+            size = screen.get_size()
+        elif size is None:
+            size = (DESIGN_WIDTH, DESIGN_HEIGHT)
+        self.SCREEN_WIDTH, self.SCREEN_HEIGHT = size
+
+        self.drawn_player = 0
+        self.drawn_life = None
+        self.drawn_score = {}
+        self.changed_areas = []
+        self.draws = 0
+        self.overlay_area = None
+        self.timeline = collections.deque()
+
+        self.initialize_gui(screen, assets)
+
+        # Everything is placed with the layout of the screen size, the positions are never computed per frame
+        layout = self.assets.layout
+        self.CELL_COORDINATES = layout.cell_positions
+        self.BOARD_COORDINATES = layout.piece_positions
+        self.PLAYER_COORDINATES = layout.player_position
+        self.LIFE_COORDINATES = layout.life_positions
+        self.SCORE_COORDINATES = layout.score_positions
+        self.SCORE_WIDTH = layout.sizes['score'][0]
+        self.NOTIFICATION_COORDINATES = layout.notification_position
+        self.MESSAGE_COORDINATES = layout.message_position
+
+        self.board_layer = self.assets.game_board.copy()
+        self.animation_frames = AnimationFrames(self.assets)
+
+    def initialize_gui(self, screen=None, assets=None):
+        '''Initializes the GUI
+        screen: The surface to draw on, a new window is created if it is None
+        assets: The shared Assets object, the assets are loaded if it is None
+        '''
+        if screen is None:
+            # Initialize pygame with a small mixer buffer
+            pre_init_mixer()
+            pg.init()
+
+            # Initialize the font
+            pg.font.init()
+
+            # Create the screen object
+            self.screen = pg.display.set_mode(
+                (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+
+            # Set the window title
+            pg.display.set_caption('Tic Tac Toe')
+            self.own_display = True
+        else:
+            # Draw on the surface given by the host
+            self.screen = screen
+            self.own_display = False
+
+        # Load the images and sounds only once per screen size
+        if assets is None:
+            assets = load_assets(self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
+        elif (assets.layout.screen_width, assets.layout.screen_height) != (self.SCREEN_WIDTH, self.SCREEN_HEIGHT):
+            raise ValueError('the assets are not scaled for a {}x{} screen'.format(
+                self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+        self.assets = assets
+
+        # Play the music
+        self.play_music()
+
+    def update_display(self, areas=None):
+        '''Marks the areas as changed, they are shown by the next render, or by the host if it owns the display
+        areas: The list of rectangles that have changed, the whole display is updated if it is None
+        '''
+        self.dirty = True
+        self.draws += 1
+        if areas is None:
+            self.changed_areas = None
+        elif self.changed_areas is not None:
+            self.changed_areas.extend(areas)
+
+    def render(self, overlay=None):
+        '''Updates the areas of the display that changed since the last frame
+        overlay: An object with get_area() and draw(surface) methods that draws over the frame
+        '''
+        if not self.own_display:
+            return
+
+        # Draw the next frame of the animation that plays, and the static draws queued after it
+        while self.timeline:
+            frames, animated = self.timeline[0]
+            self.draw_frame(frames.popleft())
+            if not frames:
+                self.timeline.popleft()
+            if animated:
+                break
+
+        areas = self.changed_areas
+        self.changed_areas = []
+        self.dirty = False
+
+        # The area of the overlay of the last frame shows the screen again
+        if self.overlay_area is not None and areas is not None:
+            areas.append(self.overlay_area)
+        self.overlay_area = None
+
+        # The overlay is drawn on the screen only for the display update, then the screen under it is restored
+        background = None
+        if overlay is not None:
+            self.overlay_area = overlay.get_area()
+            background = self.screen.subsurface(self.overlay_area).copy()
+            overlay.draw(self.screen)
+            if areas is not None:
+                areas.append(self.overlay_area)
+
+        if areas is None:
+            pg.display.update()
+        elif areas:
+            pg.display.update(areas)
+
+        if background is not None:
+            self.screen.blit(background, self.overlay_area)
+
+    def play_music(self):
+        '''Plays the intro music'''
+        if self.music_enabled:
+            pg.mixer.music.play(-1)
+
+    def stop_music(self):
+        '''Stops the music'''
+        if self.music_enabled:
+            pg.mixer.music.stop()
+
+    def play_sound(self, name, request_time=None):
+        '''Plays a sound effect
+        name: The name of the sound (select, start_game, won_game, announce_champion, click_button or alert)
+        request_time: The time.perf_counter() of the button press that caused the sound, None if no press did
+        '''
+        self.assets.audio.play(name, request_time)
+
+    def draw_frame(self, frame):
+        '''Draws a frame on the screen and updates only the area it covers
+        frame: The image, the position, the area of the image to draw (None for all of it) and the alpha (None to keep it)
+        '''
+        image, position, area, alpha = frame
+        if alpha is not None:
+            image.set_alpha(alpha)
+        self.update_display([self.screen.blit(image, position, area)])
+
+    def play_frames(self, frames, animated=True):
+        '''Draws the frames after the ones already in the timeline
+        frames: The list of the frames, see draw_frame
+        animated: A boolean that represents whether the frames are drawn one per rendered frame or all at once
+        '''
+        if not self.own_display:
+            # The host scales the screen when it wants, so only the end of an animation is drawn
+            for frame in frames[-1:] if animated else frames:
+                self.draw_frame(frame)
+        elif animated or self.timeline:
+            self.timeline.append((collections.deque(frames), animated))
+        else:
+            for frame in frames:
+                self.draw_frame(frame)
+
+    def finish_animations(self):
+        '''Draws the last frame of every queued animation and the queued static draws at once'''
+        while self.timeline:
+            frames, animated = self.timeline.popleft()
+            for frame in [frames[-1]] if animated else frames:
+                self.draw_frame(frame)
+
+    def blit(self, image, position, area=None):
+        '''Draws an image on the screen, after the animations that are playing'''
+        self.play_frames([(image, position, area, None)], False)
+
+    def show_computer_is_thinking(self):
+        '''Shows the computer is thinking message'''
+        self.blit(self.assets.computer_is_thinking,
+                  self.NOTIFICATION_COORDINATES)
+        self.notification_in_screen = True
+
+    def show_select_position(self):
+        '''Shows the select position message'''
+        self.blit(self.assets.select_position, self.NOTIFICATION_COORDINATES)
+        self.notification_in_screen = True
+
+    def clear_notification(self):
+        '''Clears the notification'''
+        self.blit(self.assets.computer_is_thinking_bg,
+                  self.NOTIFICATION_COORDINATES)
+
+    def show_player_o_won(self):
+        '''Shows the player O won message'''
+        self.blit(self.assets.player_o_won, self.MESSAGE_COORDINATES)
+
+    def show_player_x_won(self):
+        '''Shows the player X won message'''
+        self.blit(self.assets.player_x_won, self.MESSAGE_COORDINATES)
+
+    def show_game_is_tie(self):
+        '''Shows the game is tie message'''
+        self.blit(self.assets.game_is_tie, self.MESSAGE_COORDINATES)
+
+    def draw_x(self, cell):
+        '''Draws X on the screen'''
+        self.blit(self.assets.x_img, self.BOARD_COORDINATES[cell])
+
+    def draw_o(self, cell):
+        '''Draws O on the screen'''
+        self.blit(self.assets.o_img, self.BOARD_COORDINATES[cell])
+
+    def draw_cell_selected(self, cell):
+        '''Draws cell selected on the screen'''
+        self.blit(self.assets.cell_selected_bg, self.CELL_COORDINATES[cell])
+
+    def draw_cell_not_selected(self, cell):
+        '''Draws cell not selected on the screen'''
+        self.blit(self.assets.cell_not_selected_bg,
+                  self.CELL_COORDINATES[cell])
+
+    def update_game_board(self, leds):
+        '''Draws only the cells whose symbol has changed since they were last drawn, a new piece fades and scales in'''
+        for i in range(len(leds)):
+            if leds[i].selected == self.drawn_cells[i]:
+                continue
+            self.drawn_cells[i] = leds[i].selected
+
+            if leds[i].selected == 0:
+                self.draw_cell_not_selected(i)
+                continue
+
+            piece = self.assets.o_img if leds[i].selected == 1 else self.assets.x_img
+            offset = (self.BOARD_COORDINATES[i][0] - self.CELL_COORDINATES[i][0],
+                      self.BOARD_COORDINATES[i][1] - self.CELL_COORDINATES[i][1])
+            frames = self.animation_frames.get_piece_frames(
+                piece, self.assets.cell_not_selected_bg, offset)
+            self.play_frames([(frame, self.CELL_COORDINATES[i], None, None)
+                             for frame in frames])
+
+    def draw_win_line(self, line):
+        '''Sweeps a line over the winning cells
+        line: The cells from 0 to 8 of the winning line
+        '''
+        width, height = self.assets.x_img.get_size()
+        start = (self.BOARD_COORDINATES[line[0]][0] + width // 2,
+                 self.BOARD_COORDINATES[line[0]][1] + height // 2)
+        end = (self.BOARD_COORDINATES[line[-1]][0] + width // 2,
+               self.BOARD_COORDINATES[line[-1]][1] + height // 2)
+        position, image, areas = self.animation_frames.get_line_frames(
+            start, end)
+        self.play_frames([(image, (position[0] + area.left, position[1] + area.top), area, None)
+                          for area in areas])
+
+    def show_layer_area(self, area):
+        '''Copies an area of the board layer to the screen'''
+        self.blit(self.board_layer, area.topleft, area)
+
+    def compose_player(self, current_player):
+        '''Draws the current player on the board layer and returns the changed area or None'''
+        if current_player == self.drawn_player:
+            return None
+        self.drawn_player = current_player
+
+        player_image = self.assets.player_o if current_player == 1 else self.assets.player_x
+        area = self.board_layer.blit(
+            self.assets.player_bg, self.PLAYER_COORDINATES)
+        self.board_layer.blit(player_image, self.PLAYER_COORDINATES)
+        return area
+
+    def compose_life(self, remaining_chances):
+        '''Draws the remaining chances on the board layer and returns the changed area or None'''
+        if remaining_chances == self.drawn_life:
+            return None
+        self.drawn_life = remaining_chances
+
+        areas = []
+        for i, position in enumerate(self.LIFE_COORDINATES):
+            life_image = self.assets.life if i < remaining_chances else self.assets.life_bg
+            areas.append(self.board_layer.blit(life_image, position))
+        return areas[0].unionall(areas[1:])
+
+    def compose_score(self, score):
+        '''Draws the scores that have changed on the board layer and returns the changed areas'''
+        changed_areas = []
+        for player in (1, 2):
+            if self.drawn_score.get(player) == score[player]:
+                continue
+            self.drawn_score[player] = score[player]
+
+            # Clear the old digits with the game board behind them
+            area = pg.Rect(self.SCORE_COORDINATES[player],
+                           (self.SCORE_WIDTH, self.assets.digit_height))
+            self.board_layer.blit(self.assets.game_board, area, area)
+
+            # Draw the digits from the glyphs rendered when the assets were loaded
+            x, y = area.topleft
+            for digit in str(score[player]):
+                glyph = self.assets.digit_glyphs[int(digit)]
+                self.board_layer.blit(glyph, (x, y))
+                x += glyph.get_width()
+            changed_areas.append(area)
+        return changed_areas
+
+    def draw_player_x(self):
+        '''Draws player X on the screen'''
+        area = self.compose_player(2)
+        if area is not None:
+            self.show_layer_area(area)
+
+    def draw_player_o(self):
+        '''Draws player O on the screen'''
+        area = self.compose_player(1)
+        if area is not None:
+            self.show_layer_area(area)
+
+    def draw_life(self, remaining_chances):
+        '''Draws the remaining chances'''
+        area = self.compose_life(remaining_chances)
+        if area is not None:
+            self.show_layer_area(area)
+
+    def draw_score(self, score):
+        '''Draws the score on the screen, only the scores that have changed are drawn again'''
+        for area in self.compose_score(score):
+            self.show_layer_area(area)
+
+    def refresh_game_board(self, current_player, remaining_chances, score):
+        '''Shows the empty game board with the HUD in one blit'''
+        self.compose_player(current_player)
+        self.compose_life(remaining_chances)
+        self.compose_score(score)
+        self.show_game_board()
+
+    def show_window(self, window):
+        '''Cross-fades to a full screen window, everything drawn before is covered'''
+        # The board layer changes between the fades, so its fade image is copied every time
+        fade_image = self.animation_frames.get_fade_image(
+            window, window is not self.board_layer)
+        frames = [(fade_image, (0, 0), None, alpha)
+                  for alpha in get_fade_alphas()]
+        self.play_frames(frames + [(window, (0, 0), None, None)])
+
+    def show_game_board(self):
+        '''Shows the empty game board with the HUD of the board layer'''
+        self.show_window(self.board_layer)
+        self.drawn_cells = [0] * 9
+
+    def show_choose_mode_window(self):
+        '''Shows the choose mode window'''
+        self.show_window(self.assets.choose_mode_window)
+
+    def show_loading_window(self):
+        '''Shows the loading window'''
+        self.finish_animations()
+        self.blit(self.assets.loading_window, (0, 0))
+        self.render()
+        time.sleep(3)
+
+    def show_instruction_window(self):
+        '''Shows the instruction window'''
+        self.show_window(self.assets.instruction_window)
+
+    def show_thankyou_window(self):
+        '''Shows the thankyou window'''
+        self.show_window(self.assets.thankyou_window)
+
+    def show_champion_player_o_window(self):
+        '''Shows the champion player O window'''
+        self.show_window(self.assets.champion_player_o_window)
+
+    def show_champion_player_x_window(self):
+        '''Shows the champion player X window'''
+        self.show_window(self.assets.champion_player_x_window)
+
+    def show_match_is_draw_window(self):
+        '''Shows the match is draw window'''
+        self.show_window(self.assets.match_is_draw_window)
+
+# Functions
+
+
+def load_assets(screen_width, screen_height):
+    '''Returns the Assets for the screen size, they are loaded only once per size
+    screen_width: the width of the screen
+    screen_height: the height of the screen
+    '''
+    size = (screen_width, screen_height)
+    if size not in loaded_assets:
+        loaded_assets[size] = Assets(screen_width, screen_height)
+    return loaded_assets[size]
@@ -0,0 +1,259 @@
+# Replays a recorded cabinet session against a fake board and the headless SDL drivers
+# The button edges of the trace are applied at the steps they were recorded at, the LED writes are compared
+# with the recorded ones and the screen after every edge with the screens of the baseline, and the time from
+# every press to the LED write, screen draw or animation it causes is measured
+# The trace is replayed several times and the median latency of every press is compared, since one run of
+# an edge is only a few milliseconds and the noise of the machine is as large
+# The exit code is 1 when the outputs differ or a press is much slower than in the baseline, so a replay
+# can be used as a regression test of the game loop
+#
+# Usage: python replay_trace.py trace.json [--update] [--tolerance 0.5] [--runs 5]
+
+import os
+
+# The replay never opens a window or a sound device
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+import pygame as pg
+from pyfirmata import Arduino, DIGITAL_MESSAGE
+from cabinet_config import CabinetConfig
+from input_trace import TraceRecorder, load_trace, save_trace
+from session_store import SessionStore
+import tictactoe
+
+# Constants
+RENDER_EVERY = 3
+LATENCY_SLACK = 0.005
+RUNS = 5
+
+# Classes
+
+
+class FakePort:
+    '''A port of the fake board'''
+
+    def __init__(self, port_number):
+        self.port_number = port_number
+        self.reporting = False
+
+    def enable_reporting(self):
+        self.reporting = True
+
+    def disable_reporting(self):
+        self.reporting = False
+
+
+class FakePin:
+    '''A digital pin of the fake board, the replay sets the values of the buttons'''
+
+    def __init__(self, pin_number, port):
+        self.pin_number = pin_number
+        self.port = port
+        self.value = None
+        self.writes = []
+
+    def read(self):
+        return self.value
+
+    def write(self, value):
+        self.value = value
+        self.writes.append(value)
+
+    def enable_reporting(self):
+        self.port.enable_reporting()
+
+    def disable_reporting(self):
+        self.port.disable_reporting()
+
+
+class FakeBoard(Arduino):
+    '''An Arduino board without a serial port, its pins are FakePin objects'''
+
+    def __init__(self, name='replay'):
+        self.name = name
+        self.pins = {}
+        self.digital_ports = {}
+
+        def handle_digital_message(port_nr, lsb, msb):
+            pass
+        handle_digital_message.bytes_needed = 2
+        self._command_handlers = {DIGITAL_MESSAGE: handle_digital_message}
+
+    def get_pin(self, pin_def):
+        pin_number = int(pin_def.split(':')[1])
+        port = self.digital_ports.setdefault(pin_number // 8, FakePort(pin_number // 8))
+        self.pins[pin_number] = FakePin(pin_number, port)
+        return self.pins[pin_number]
+
+    def send_sysex(self, sysex_cmd, data=[]):
+        pass
+
+    def exit(self):
+        pass
+
+# Functions
+
+
+def replay(trace):
+    '''Replays the trace and returns the LED writes, the screen checksums and the latencies of the edges
+    The latency of a release, or of a press without an output of its own, is None
+    The sessions are recorded in a temporary store, it is closed and removed after the run
+    '''
+    store_directory = tempfile.mkdtemp()
+    session_store = SessionStore(os.path.join(store_directory, 'sessions.db'))
+    try:
+        return play_trace(trace, session_store)
+    finally:
+        session_store.close()
+        shutil.rmtree(store_directory, ignore_errors=True)
+
+
+def play_trace(trace, session_store):
+    '''Plays the edges of the trace on a fake board, see replay
+    session_store: The SessionStore the sessions of the replay are recorded in
+    '''
+    board = FakeBoard()
+    config = CabinetConfig('replay', trace['led_pins'], trace['button_pins']['nav_button'],
+                           trace['button_pins']['select_button'], trace['button_pins']['back_button'],
+                           update_interval=trace['update_interval'])
+    game_loop = tictactoe.create_game_loop(config, board, session_store=session_store)
+    renderer = game_loop.game.renderer
+
+    # Set up the game like the recorded session, with the same time and random numbers
+    recorder = TraceRecorder(game_loop, trace['update_interval'], trace['led_pins'], trace['button_pins']['nav_button'],
+                             trace['button_pins']['select_button'], trace['button_pins']['back_button'], trace['seed'])
+    led_writes = recorder.trace['led_writes']
+    buttons = {name: board.pins[pin]
+               for name, pin in trace['button_pins'].items()}
+    events = sorted(trace['events'], key=lambda event: event[0])
+    screens = []
+    latencies = []
+
+    game_loop.start()
+    event_index = 0
+    for step in range(trace['steps']):
+        # Apply the edges of this step, only the presses are timed since the game acts on them
+        edges = []
+        press_time = None
+        while event_index < len(events) and events[event_index][0] == step:
+            step_number, name, value = events[event_index]
+            buttons[name].value = value
+            edges.append(bool(value))
+            if value:
+                press_time = time.perf_counter()
+            event_index += 1
+
+        # An output is a new LED write, a draw or frames queued by this step, not an animation that still plays
+        outputs_before = (len(led_writes), renderer.draws, len(renderer.timeline))
+        game_loop.step()
+
+        if edges or step % RENDER_EVERY == 0:
+            has_output = (len(led_writes), renderer.draws, len(renderer.timeline)) != outputs_before
+            renderer.render()
+            if edges:
+                latency = time.perf_counter() - press_time if press_time is not None and has_output else None
+                screen = zlib.crc32(pg.image.tobytes(renderer.screen, 'RGB'))
+                latencies.extend([latency if pressed else None for pressed in edges])
+                screens.extend([screen] * len(edges))
+
+    return led_writes, screens, latencies
+
+
+def replay_runs(trace, runs=RUNS):
+    '''Replays the trace several times and returns the LED writes and the screens of the first run and the
+    median latency of every edge over the runs
+    '''
+    led_writes, screens, latencies = replay(trace)
+    all_latencies = [latencies]
+    for run in range(1, runs):
+        run_led_writes, run_screens, latencies = replay(trace)
+        if run_led_writes != led_writes or run_screens != screens:
+            print('Run {} has other outputs than the first run, the game is not deterministic'.format(run + 1))
+        all_latencies.append(latencies)
+    return led_writes, screens, get_median_latencies(all_latencies)
+
+
+def get_median_latencies(all_latencies):
+    '''Returns the median latency of every edge over the runs, None for an edge without a latency in any run'''
+    medians = []
+    for latencies in zip(*all_latencies):
+        measured = sorted(latency for latency in latencies if latency is not None)
+        medians.append(measured[len(measured) // 2] if measured else None)
+    return medians
+
+
+def compare(trace, led_writes, screens, latencies, tolerance):
+    '''Prints the differences with the trace and returns the number of failures'''
+    failures = 0
+    if led_writes != trace['led_writes']:
+        for i, (expected, actual) in enumerate(zip(trace['led_writes'], led_writes)):
+            if expected != actual:
+                break
+        else:
+            i = min(len(led_writes), len(trace['led_writes']))
+        print('LED writes differ from the write {}: expected {}, got {}'.format(
+            i, trace['led_writes'][i:i + 1], led_writes[i:i + 1]))
+        failures += 1
+
+    if 'screens' in trace and screens != trace['screens']:
+        changed = [i for i, (expected, actual) in enumerate(
+            zip(trace['screens'], screens)) if expected != actual]
+        print('Screens differ after the edges {}'.format(changed[:10] or 'at the end'))
+        failures += 1
+
+    if 'latencies' in trace:
+        for i, (expected, actual) in enumerate(zip(trace['latencies'], latencies)):
+            if expected is not None and actual is not None and actual > expected * (1 + tolerance) + LATENCY_SLACK:
+                print('Edge {} ({}) took a median of {:.2f} ms, the baseline is {:.2f} ms'.format(
+                    i, trace['events'][i][1], actual * 1000, expected * 1000))
+                failures += 1
+    return failures
+
+
+def print_latencies(latencies):
+    '''Prints the distribution of the median press to output latencies'''
+    measured = sorted(latency for latency in latencies if latency is not None)
+    print('Edges: {}, presses with an output: {}'.format(len(latencies), len(measured)))
+    if measured:
+        for percentile in (50, 90, 99):
+            index = min(len(measured) - 1, len(measured) * percentile // 100)
+            print('p{} latency: {:.2f} ms'.format(percentile, measured[index] * 1000))
+        print('Max latency: {:.2f} ms'.format(measured[-1] * 1000))
+
+
+# Main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a recorded session and check its outputs and latency')
+    parser.add_argument('trace_file')
+    parser.add_argument('--update', action='store_true',
+                        help='save the screens and latencies of this replay as the baseline of the trace')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='the allowed slowdown of an edge compared to the baseline, 0.5 is 50%%')
+    parser.add_argument('--runs', type=int, default=RUNS,
+                        help='the number of replays the median latency of every edge is taken over')
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace_file)
+    led_writes, screens, latencies = replay_runs(trace, max(1, args.runs))
+    print_latencies(latencies)
+
+    if args.update:
+        trace['led_writes'] = led_writes
+        trace['screens'] = screens
+        trace['latencies'] = latencies
+        save_trace(trace, args.trace_file)
+        print('Saved the baseline to {}'.format(args.trace_file))
+        sys.exit(0)
+
+    failures = compare(trace, led_writes, screens, latencies, args.tolerance)
+    if failures:
+        print('Replay failed with {} differences'.format(failures))
+        sys.exit(1)
+    print('Replay passed')
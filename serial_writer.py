@@ -0,0 +1,172 @@
+# Writes the LED pins of a board from a background thread
+# The game thread only records the new value of a pin, so a stalled or dropped USB serial link never blocks
+# the loop or the rendering. A write that is superseded before it is sent is merged with the newer one,
+# and the last value of every pin is kept as a shadow state that is replayed when the board is reconnected
+# The reporting of the input ports is turned on and off by the same thread, so only it writes to the serial port
+
+import collections
+import threading
+import time
+import serial
+from pyfirmata import Arduino, util
+
+# Constants
+MAX_QUEUE_DEPTH = 64
+WRITE_TIMEOUT = 0.5
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 30
+
+# Classes
+
+
+class SerialWriter:
+    '''Sends the pin writes of a board from a writer thread and reconnects the board when the link drops'''
+
+    def __init__(self, board, port=None, connect=Arduino, max_queue_depth=MAX_QUEUE_DEPTH):
+        '''Initializes the writer and starts the writer thread
+        board: The Arduino board object
+        port: The serial port the board is reconnected on, the name of the board is used if it is None
+        connect: The function that opens the board on a port
+        max_queue_depth: The maximum number of pins waiting to be written, the oldest write is dropped above it
+        shadow: A dictionary of the pin numbers and the last value written to them
+        pending: An ordered dictionary of the pin numbers and the value waiting to be sent
+        pending_reports: An ordered dictionary of the port numbers and the reporting waiting to be sent
+        connected: A boolean that represents whether the link to the board is up or not
+        sent, coalesced, dropped, reconnects: The counters of the writer
+        '''
+        self.board = board
+        self.port = port or board.name
+        self.connect = connect
+        self.max_queue_depth = max_queue_depth
+        self.output_pins = {}
+        self.shadow = {}
+        self.pending = collections.OrderedDict()
+        self.pending_reports = collections.OrderedDict()
+        self.condition = threading.Condition()
+        self.connected = True
+        self.reconnect_handlers = []
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+        set_write_timeout(board)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def add_output_pin(self, pin, output=None):
+        '''Sets the digital pin as an output written by this writer
+        pin: The pin number
+        output: The pyfirmata output pin, it is resolved from the pin number if it is None
+        '''
+        self.output_pins[pin] = output or self.board.get_pin('d:{}:o'.format(pin))
+
+    def add_reconnect_handler(self, handler):
+        '''Adds a function that is called with the new board object after a reconnection'''
+        self.reconnect_handlers.append(handler)
+
+    def write(self, pin, value):
+        '''Queues a write of the pin and returns at once, it can be called from any thread
+        pin: The pin number
+        value: The value to write (0 or 1)
+        '''
+        with self.condition:
+            self.shadow[pin] = value
+            if pin in self.pending:
+                # The pending write has not been sent yet, so only the newest value is sent
+                self.coalesced += 1
+            elif len(self.pending) >= self.max_queue_depth:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self.pending[pin] = value
+            self.condition.notify()
+
+    def set_reporting(self, port_number, enabled):
+        '''Queues turning the reporting of a digital port on or off and returns at once
+        port_number: The number of the digital port
+        enabled: A boolean that represents whether the port reports its values or not
+        '''
+        with self.condition:
+            self.pending_reports[port_number] = enabled
+            self.condition.notify()
+
+    def run(self):
+        '''Sends the pending writes and reports, and reconnects the board when a write fails'''
+        while True:
+            with self.condition:
+                while not self.pending and not self.pending_reports:
+                    self.condition.wait()
+                writes = self.pending
+                reports = self.pending_reports
+                self.pending = collections.OrderedDict()
+                self.pending_reports = collections.OrderedDict()
+
+            try:
+                for pin, value in writes.items():
+                    self.output_pins[pin].write(value)
+                    self.sent += 1
+                for port_number, enabled in reports.items():
+                    port = self.board.digital_ports[port_number]
+                    if enabled:
+                        port.enable_reporting()
+                    else:
+                        port.disable_reporting()
+                    self.sent += 1
+            except (serial.SerialException, OSError) as e:
+                print('Lost the connection to the Arduino board on {}: {}'.format(
+                    self.port, e))
+                self.connected = False
+                self.reconnect()
+
+    def reconnect(self):
+        '''Opens the board again until it answers, then replays the shadow state of the pins'''
+        try:
+            self.board.exit()
+        except Exception:
+            pass
+
+        delay = RECONNECT_DELAY
+        while True:
+            time.sleep(delay)
+            try:
+                board = self.connect(self.port)
+
+                # Start an iterator thread so that serial buffer doesn't overflow
+                util.Iterator(board).start()
+                break
+            except Exception as e:
+                print('Error while reconnecting to the Arduino board on {}: {}'.format(
+                    self.port, e))
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+        set_write_timeout(board)
+        self.board = board
+        self.output_pins = {pin: board.get_pin('d:{}:o'.format(pin))
+                            for pin in self.output_pins}
+
+        # The board lost its outputs, so every pin is written again with its last value
+        # The reporting of the old board is dropped, the reconnect handlers turn it on again
+        with self.condition:
+            self.pending = collections.OrderedDict(self.shadow)
+            self.pending_reports = collections.OrderedDict()
+
+        self.connected = True
+        self.reconnects += 1
+        for handler in self.reconnect_handlers:
+            try:
+                handler(board)
+            except Exception as e:
+                print('\n')
+                print(e)
+
+    def get_stats(self):
+        '''Returns the number of sent, coalesced and dropped writes, the number of reconnections and the queue depth'''
+        return self.sent, self.coalesced, self.dropped, self.reconnects, len(self.pending)
+
+# Functions
+
+
+def set_write_timeout(board):
+    '''Makes a write on a stalled serial link fail after WRITE_TIMEOUT instead of blocking forever'''
+    if hasattr(board, 'sp'):
+        board.sp.write_timeout = WRITE_TIMEOUT
@@ -0,0 +1,301 @@
+# Network game server that plays the tic tac toe rules for many tables on one asyncio event loop
+# Remote clients and cabinets (see cabinet_client.py) connect over TCP and talk with small fixed size binary messages
+#
+# Request (4 bytes): opcode, argument, table
+#   JOIN  argument 0 joins a human vs human table, argument 1 plays against the computer
+#   MOVE  argument is the position of the cell from 1 to 9
+#   NEXT  plays the next chance after a win or a draw, or starts a new match after the last chance
+# Reply (10 bytes): opcode, board, flags, score of player 1, score of player 2
+#   STATE board holds 2 bits per cell and the champion (bits 18-19, 0 until the last chance or for a draw),
+#         flags hold the player of the client (bits 0-1), the current player (bits 2-3),
+#         the remaining chances (bits 4-5) and finished (bit 6)
+#   ERROR board holds the error code
+#   PUSH  the same state as STATE, sent without a request to the other players of the table after a join,
+#         a move or a next chance, so a client can tell it from the reply to its own request
+
+import asyncio
+import struct
+import sys
+from game_core import Cell, GameRules
+
+# Constants
+HOST = '0.0.0.0'
+PORT = 5005
+REQUEST = struct.Struct('!BBH')
+REPLY = struct.Struct('!BIBHH')
+JOIN = ord('J')
+MOVE = ord('M')
+NEXT = ord('N')
+STATE = ord('S')
+ERROR = ord('E')
+PUSH = ord('P')
+ERROR_TABLE_FULL = 1
+ERROR_NOT_YOUR_TURN = 2
+ERROR_INVALID_MOVE = 3
+ERROR_NOT_JOINED = 4
+ERROR_UNKNOWN_REQUEST = 5
+
+# Classes
+
+
+class Session:
+    '''Represents one table, the rules of its game and the players connected to it'''
+
+    def __init__(self, table, computer_vs_human_mode):
+        '''Initializes the session with a new game
+        table: The number of the table
+        computer_vs_human_mode: A boolean that represents whether the computer plays as player 2 or not
+        players: A dictionary of the stream writers of the players and their player number
+        '''
+        self.table = table
+        self.game = GameRules([Cell() for _ in range(9)])
+        self.game.started = True
+        self.players = {}
+        if computer_vs_human_mode:
+            self.game.enable_computer_vs_human_mode()
+
+    def is_full(self):
+        '''Returns True if no more players can join the table'''
+        if self.game.computer_vs_human_mode:
+            return len(self.players) == 1
+        return len(self.players) == 2
+
+    def join(self, writer):
+        '''Adds the player to the table and returns its player number'''
+        player = 1 if 1 not in self.players.values() else 2
+        self.players[writer] = player
+        return player
+
+    def leave(self, writer):
+        '''Removes the player from the table'''
+        self.players.pop(writer, None)
+
+    def play_move(self, player, position):
+        '''Plays the move of the player and then the computer move if it is its turn, returns an error code or 0'''
+        game = self.game
+        if game.finished or game.current_player != player or game.computer_move:
+            return ERROR_NOT_YOUR_TURN
+        if position < 1 or position > 9 or game.leds[position - 1].selected != 0:
+            return ERROR_INVALID_MOVE
+
+        game.play_position(position)
+        self.play_computer_move()
+        return 0
+
+    def play_next_chance(self):
+        '''Plays the next chance if the current one is finished, or a new match after the last chance,
+        returns an error code or 0
+        '''
+        if not self.game.finished:
+            return ERROR_INVALID_MOVE
+
+        if self.game.remaining_chances == 0:
+            self.start_new_match()
+        else:
+            self.game.play_next_chance()
+        self.play_computer_move()
+        return 0
+
+    def play_computer_move(self):
+        '''Plays the computer move right away if it is the computer's turn'''
+        game = self.game
+        if game.computer_move and not game.finished:
+            game.do_computer_move()
+            game.play_position(game.navigation_button_position)
+
+    def get_champion(self):
+        '''Returns the champion (1 or 2) once the last chance is finished, 0 before it or for a draw'''
+        game = self.game
+        if game.remaining_chances != 0 or not game.finished or game.score[1] == game.score[2]:
+            return 0
+        return 1 if game.score[1] > game.score[2] else 2
+
+    def start_new_match(self):
+        '''Starts a new match in the same mode, the final board and score stay until a player asks for it'''
+        game = self.game
+        computer_vs_human_mode = game.computer_vs_human_mode
+        game.reset_game()
+        game.started = True
+        if computer_vs_human_mode:
+            game.enable_computer_vs_human_mode()
+
+    def encode_state(self, player, opcode=STATE):
+        '''Returns the state reply for the player, or the pushed state if the opcode is PUSH'''
+        game = self.game
+        board = 0
+        for i, led in enumerate(game.leds):
+            board |= led.selected << (2 * i)
+        board |= self.get_champion() << 18
+        flags = player | (game.current_player << 2) | (
+            game.remaining_chances << 4) | (game.finished << 6)
+        return REPLY.pack(opcode, board, flags, game.score[1], game.score[2])
+
+    def broadcast(self, requester):
+        '''Sends the state as the reply to the player who made the request and pushes it to the other players
+        requester: The stream writer of the player who made the request
+        '''
+        for writer, player in self.players.items():
+            writer.write(self.encode_state(player, STATE if writer is requester else PUSH))
+
+
+class GameServer:
+    '''Accepts the connections and routes the requests to the sessions of the tables'''
+
+    def __init__(self):
+        '''Initializes the server without any table
+        sessions: A dictionary of the tables and their sessions
+        '''
+        self.sessions = {}
+
+    async def handle_client(self, reader, writer):
+        '''Reads the requests of one client until it disconnects'''
+        session = None
+        player = 0
+        try:
+            while True:
+                opcode, argument, table = REQUEST.unpack(
+                    await reader.readexactly(REQUEST.size))
+
+                if opcode == JOIN:
+                    if session is not None:
+                        session.leave(writer)
+                        self.close_session_if_empty(session)
+                    session = self.sessions.get(table)
+                    if session is None:
+                        session = Session(table, argument == 1)
+                        self.sessions[table] = session
+                    if session.is_full():
+                        session = None
+                        error = ERROR_TABLE_FULL
+                    else:
+                        player = session.join(writer)
+                        error = 0
+                elif session is None:
+                    error = ERROR_NOT_JOINED
+                elif opcode == MOVE:
+                    error = session.play_move(player, argument)
+                elif opcode == NEXT:
+                    error = session.play_next_chance()
+                else:
+                    error = ERROR_UNKNOWN_REQUEST
+
+                if error:
+                    writer.write(REPLY.pack(ERROR, error, 0, 0, 0))
+                else:
+                    session.broadcast(writer)
+                await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session is not None:
+                session.leave(writer)
+                self.close_session_if_empty(session)
+            writer.close()
+
+    def close_session_if_empty(self, session):
+        '''Removes the session when its last player has left'''
+        if not session.players and self.sessions.get(session.table) is session:
+            del self.sessions[session.table]
+
+    async def serve(self, host=HOST, port=PORT):
+        '''Serves the clients until the server is stopped'''
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class GameClient:
+    '''Connects a remote player or a cabinet to a table of the server, it has one request at a time'''
+
+    def __init__(self, reader, writer):
+        '''Initializes the client with the streams of the connection and starts reading the frames
+        reader: The stream reader of the connection
+        writer: The stream writer of the connection
+        replies: The queue of the replies to the requests, None when the connection is closed
+        pushed: The queue of the states pushed after the requests of the other players, None when it is closed
+        '''
+        self.reader = reader
+        self.writer = writer
+        self.replies = asyncio.Queue()
+        self.pushed = asyncio.Queue()
+        self.read_task = asyncio.ensure_future(self.read_frames())
+
+    async def read_frames(self):
+        '''Routes the frames of the server to the replies or to the pushed states until the connection is closed'''
+        try:
+            while True:
+                frame = await self.reader.readexactly(REPLY.size)
+                if frame[0] == PUSH:
+                    self.pushed.put_nowait(frame)
+                else:
+                    self.replies.put_nowait(frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.replies.put_nowait(None)
+            self.pushed.put_nowait(None)
+
+    @staticmethod
+    async def get_frame(frames):
+        '''Returns the next frame of the queue, a ConnectionError is raised if the connection is closed'''
+        frame = await frames.get()
+        if frame is None:
+            frames.put_nowait(None)
+            raise ConnectionError('the server closed the connection')
+        return frame
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=PORT):
+        '''Opens a connection to the server and returns the client'''
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, opcode, argument=0, table=0):
+        '''Sends a request and returns the reply'''
+        self.writer.write(REQUEST.pack(opcode, argument, table))
+        await self.writer.drain()
+        return await self.get_frame(self.replies)
+
+    async def join(self, table, computer_vs_human_mode=False):
+        '''Joins the table and returns the reply'''
+        return await self.request(JOIN, 1 if computer_vs_human_mode else 0, table)
+
+    async def move(self, position):
+        '''Plays the position from 1 to 9 and returns the reply'''
+        return await self.request(MOVE, position)
+
+    async def next_chance(self):
+        '''Plays the next chance and returns the reply'''
+        return await self.request(NEXT)
+
+    async def wait_for_state(self):
+        '''Waits for the state pushed after a join, a move or a next chance of the other player'''
+        return await self.get_frame(self.pushed)
+
+    def close(self):
+        '''Closes the connection'''
+        self.read_task.cancel()
+        self.writer.close()
+
+# Functions
+
+
+def decode_state(reply):
+    '''Returns the board, player, current player, remaining chances, finished, score and champion of a state reply
+    reply: the bytes of the reply
+    '''
+    opcode, board, flags, score_1, score_2 = REPLY.unpack(reply)
+    cells = [(board >> (2 * i)) & 3 for i in range(9)]
+    return (cells, flags & 3, (flags >> 2) & 3, (flags >> 4) & 3, bool(flags & 64), {1: score_1, 2: score_2},
+            (board >> 18) & 3)
+
+
+# Main function
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+    print('Serving tic-tac-toe on port {}'.format(port))
+    try:
+        asyncio.run(GameServer().serve(HOST, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,368 @@
+# Keeps a record of the played sessions in a SQLite database
+# A session is one match of the chances of a game, with its rounds, its champion and its timings
+# The writes are queued and a background thread commits them in batches, so the game loop never waits on the disk
+# The ids of the sessions are reserved in blocks in the database ahead of their use, so the start of a session takes
+# the next reserved id at once and the writer inserts the session with it, an id is never given twice
+# Every round also updates a per cabinet and per day summary, so the stats of a cabinet read one row per day
+# and the daily leaderboard is an index range scan, however many rows the database has
+# The rounds and the end of the sessions are recorded from the events of the games by a SessionRecorder
+
+import collections
+import queue
+import sqlite3
+import threading
+import time
+from event_bus import ChampionDecided, RoundEnded, SessionLeft
+
+# Constants
+STORE_FILE = 'sessions.db'
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0
+ID_BLOCK_SIZE = 100
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    cabinet TEXT NOT NULL,
+    day TEXT NOT NULL,
+    computer_vs_human INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    champion INTEGER,
+    champion_score INTEGER,
+    score_1 INTEGER,
+    score_2 INTEGER
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    session_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    first_player INTEGER NOT NULL,
+    winner INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    positions TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (session_id, round)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cabinet_days (
+    cabinet TEXT NOT NULL,
+    day TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    rounds INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    moves INTEGER NOT NULL DEFAULT 0,
+    play_time REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (cabinet, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS session_ids (
+    next_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_day_champion_score ON sessions (day, champion_score DESC);
+CREATE INDEX IF NOT EXISTS sessions_cabinet_day ON sessions (cabinet, day);
+'''
+
+# Classes
+
+
+class SessionStore:
+    '''Records the sessions, rounds and champions of the games and answers the leaderboard and stats queries'''
+
+    def __init__(self, file_name=STORE_FILE):
+        '''Creates the tables if needed, reserves the first block of session ids and starts the writer thread
+        file_name: The SQLite database file
+        writes: The queue of the statements the writer thread commits
+        session_ids: The reserved session ids that were not given yet
+        reserving: A boolean that represents whether a block of session ids is waiting to be reserved or not
+        '''
+        self.file_name = file_name
+        first_block = SessionIdBlock()
+        connection = self.connect()
+        try:
+            connection.executescript(SCHEMA)
+            # The databases made before the positions of the rounds were recorded get the column
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(rounds)')]
+            if 'positions' not in columns:
+                connection.execute("ALTER TABLE rounds ADD COLUMN positions TEXT NOT NULL DEFAULT ''")
+            # The databases made before the ids were reserved start after their last session
+            connection.execute('INSERT INTO session_ids (next_id) SELECT (SELECT COALESCE(MAX(id), 0) + 1 FROM sessions) '
+                               'WHERE NOT EXISTS (SELECT * FROM session_ids)')
+            first_block.reserve(connection)
+            connection.commit()
+        finally:
+            connection.close()
+
+        self.session_ids = collections.deque(first_block.get_ids())
+        self.id_lock = threading.Lock()
+        self.reserving = False
+        self.writes = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        '''Opens a connection to the database, readers and the writer can use it at the same time'''
+        connection = sqlite3.connect(self.file_name)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def run(self):
+        '''Commits the queued statements in batches until the store is closed'''
+        connection = self.connect()
+        # The transactions are begun and committed by the writer, so every write can have its own savepoint
+        connection.isolation_level = None
+        running = True
+        while running:
+            # A batch ends early when a caller waits for it to be committed or the session ids run low
+            batch = [self.writes.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE and not isinstance(batch[-1], (threading.Event, SessionIdBlock)) \
+                    and batch[-1] is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.writes.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            # None closes the store, it can only end a batch
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+
+            # A write is a statement and its parameters, a NewSession or a SessionIdBlock, an Event is a flush
+            flushed = []
+            id_blocks = []
+            committed = False
+            try:
+                connection.execute('BEGIN')
+                for write in batch:
+                    if isinstance(write, threading.Event):
+                        flushed.append(write)
+                    elif isinstance(write, SessionIdBlock):
+                        id_blocks.append(write)
+                        self.execute_write(connection, write.reserve)
+                    elif isinstance(write, NewSession):
+                        self.execute_write(connection, write.insert)
+                    else:
+                        self.execute_write(connection, write)
+                connection.execute('COMMIT')
+                committed = True
+            except sqlite3.Error as e:
+                print('Error while saving the sessions: {}'.format(e))
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+
+            for event in flushed:
+                event.set()
+            # The reserved ids are given only once their block is committed
+            for id_block in id_blocks:
+                self.add_session_ids(id_block.get_ids() if committed else [])
+        connection.close()
+
+    def execute_write(self, connection, write):
+        '''Executes a write in its own savepoint, a failing write is rolled back alone and the batch is kept
+        write: A statement and its parameters, or a function called with the connection
+        '''
+        connection.execute('SAVEPOINT write')
+        try:
+            if callable(write):
+                write(connection)
+            else:
+                connection.execute(*write)
+        except sqlite3.Error as e:
+            connection.execute('ROLLBACK TO write')
+            print('Error while saving a session: {}'.format(e))
+        finally:
+            connection.execute('RELEASE write')
+
+    def start_session(self, cabinet, computer_vs_human_mode):
+        '''Records the start of a session and returns its id without waiting for the disk, None if no id is left
+        cabinet: The name of the cabinet the session is played on
+        computer_vs_human_mode: A boolean that represents whether the session is played against the computer or not
+        '''
+        with self.id_lock:
+            if not self.thread.is_alive() or not self.session_ids:
+                return None
+            session_id = self.session_ids.popleft()
+            # The next block is reserved while half of the current one is left
+            if len(self.session_ids) < ID_BLOCK_SIZE // 2 and not self.reserving:
+                self.reserving = True
+                self.writes.put(SessionIdBlock())
+        self.writes.put(NewSession(session_id, cabinet, computer_vs_human_mode))
+        return session_id
+
+    def add_session_ids(self, session_ids):
+        '''Adds the ids of a committed block to the ids that can be given, an empty list if it failed'''
+        with self.id_lock:
+            self.session_ids.extend(session_ids)
+            self.reserving = False
+
+    def record_round(self, session_id, cabinet, round_number, first_player, winner, moves, duration, positions=''):
+        '''Records a finished round of a session
+        session_id: The id returned by start_session
+        cabinet: The name of the cabinet the session is played on
+        round_number: The number of the round from 1
+        first_player: The player who played first (1 or 2)
+        winner: The player who won the round (1 or 2), 0 for a draw
+        moves: The number of moves of the round
+        duration: The duration of the round in seconds
+        positions: The positions from 1 to 9 of the moves in the order they were played, as a string of digits
+        '''
+        self.writes.put(('INSERT OR REPLACE INTO rounds (session_id, round, first_player, winner, moves, duration, '
+                         'positions) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (session_id, round_number, first_player, winner, moves, duration, positions)))
+        self.writes.put(('INSERT INTO cabinet_days (cabinet, day, rounds, draws, moves, play_time) VALUES (?, ?, 1, ?, ?, ?) '
+                         'ON CONFLICT (cabinet, day) DO UPDATE SET rounds = rounds + 1, draws = draws + excluded.draws, '
+                         'moves = moves + excluded.moves, play_time = play_time + excluded.play_time',
+                         (cabinet, get_day(time.time()), int(winner == 0), moves, duration)))
+
+    def end_session(self, session_id, score, champion):
+        '''Records the end of a session
+        session_id: The id returned by start_session
+        score: The score of the players
+        champion: The champion (1 or 2), 0 if the match is a draw, None if the session was left
+        '''
+        champion_score = score[champion] if champion in (1, 2) else None
+        self.writes.put(('UPDATE sessions SET ended_at = ?, champion = ?, champion_score = ?, score_1 = ?, score_2 = ? '
+                         'WHERE id = ?', (time.time(), champion, champion_score, score[1], score[2], session_id)))
+
+    def flush(self):
+        '''Waits until all the queued writes are committed'''
+        event = threading.Event()
+        self.writes.put(event)
+        event.wait()
+
+    def close(self):
+        '''Commits the queued writes and stops the writer thread'''
+        self.writes.put(None)
+        self.thread.join()
+
+    def get_daily_leaderboard(self, day=None, limit=10):
+        '''Returns the best champions of a day as a list of (cabinet, champion, champion score, ended at)
+        day: The day as YYYY-MM-DD, today if it is None
+        limit: The number of champions
+        '''
+        connection = self.connect()
+        try:
+            return connection.execute(
+                'SELECT cabinet, champion, champion_score, ended_at FROM sessions '
+                'WHERE day = ? AND champion_score IS NOT NULL ORDER BY champion_score DESC LIMIT ?',
+                (day or get_day(time.time()), limit)).fetchall()
+        finally:
+            connection.close()
+
+    def get_round_moves(self):
+        '''Returns the positions of the moves of every recorded round, as strings of the digits from 1 to 9'''
+        connection = self.connect()
+        try:
+            return [row[0] for row in connection.execute("SELECT positions FROM rounds WHERE positions != ''")]
+        finally:
+            connection.close()
+
+    def get_cabinet_stats(self, cabinet, first_day=None, last_day=None):
+        '''Returns the number of sessions, rounds, draws, moves and the play time in seconds of a cabinet
+        cabinet: The name of the cabinet
+        first_day: The first day as YYYY-MM-DD, from the first recorded day if it is None
+        last_day: The last day as YYYY-MM-DD, to the last recorded day if it is None
+        '''
+        connection = self.connect()
+        try:
+            stats = connection.execute(
+                'SELECT SUM(sessions), SUM(rounds), SUM(draws), SUM(moves), SUM(play_time) FROM cabinet_days '
+                'WHERE cabinet = ? AND day BETWEEN ? AND ?',
+                (cabinet, first_day or '0000-00-00', last_day or '9999-99-99')).fetchone()
+        finally:
+            connection.close()
+        return tuple(value or 0 for value in stats)
+
+
+class NewSession:
+    '''The start of a session waiting in the write queue, with the reserved id it is inserted with'''
+
+    def __init__(self, session_id, cabinet, computer_vs_human_mode):
+        '''Initializes the start of the session
+        session_id: The reserved id of the session
+        cabinet: The name of the cabinet the session is played on
+        computer_vs_human_mode: A boolean that represents whether the session is played against the computer or not
+        '''
+        self.session_id = session_id
+        self.cabinet = cabinet
+        self.computer_vs_human_mode = computer_vs_human_mode
+        self.started_at = time.time()
+
+    def insert(self, connection):
+        '''Inserts the session and counts it in the summary of its cabinet and day'''
+        day = get_day(self.started_at)
+        connection.execute(
+            'INSERT INTO sessions (id, cabinet, day, computer_vs_human, started_at) VALUES (?, ?, ?, ?, ?)',
+            (self.session_id, self.cabinet, day, int(self.computer_vs_human_mode), self.started_at))
+        connection.execute('INSERT INTO cabinet_days (cabinet, day, sessions) VALUES (?, ?, 1) '
+                           'ON CONFLICT (cabinet, day) DO UPDATE SET sessions = sessions + 1', (self.cabinet, day))
+
+
+class SessionIdBlock:
+    '''A block of session ids reserved in the database, the processes sharing the database never get the same id'''
+
+    def __init__(self, size=ID_BLOCK_SIZE):
+        '''Initializes the block before it is reserved
+        size: The number of ids of the block
+        first_id: The first id of the block once it is reserved, None until then
+        '''
+        self.size = size
+        self.first_id = None
+
+    def reserve(self, connection):
+        '''Moves the next free id of the database past the block, the update comes first so it takes the write lock'''
+        connection.execute('UPDATE session_ids SET next_id = next_id + ?', (self.size,))
+        self.first_id = connection.execute('SELECT next_id FROM session_ids').fetchone()[0] - self.size
+
+    def get_ids(self):
+        '''Returns the ids of the block, none if it was not reserved'''
+        if self.first_id is None:
+            return []
+        return range(self.first_id, self.first_id + self.size)
+
+
+class SessionRecorder:
+    '''Records the rounds and the end of the sessions of a cabinet from the events of its game'''
+
+    def __init__(self, session_store, cabinet):
+        '''Initializes the recorder
+        session_store: The SessionStore the rounds and the ends of the sessions are recorded in
+        cabinet: The name of the cabinet, the events of the other cabinets on the same bus are ignored
+        '''
+        self.session_store = session_store
+        self.cabinet = cabinet
+
+    def subscribe(self, event_bus):
+        '''Subscribes the recorder to the events of the bus, in the game thread since the store only queues the writes'''
+        event_bus.subscribe(RoundEnded, self.record_round)
+        event_bus.subscribe(ChampionDecided, self.record_champion)
+        event_bus.subscribe(SessionLeft, self.record_session_left)
+
+    def is_recorded(self, event):
+        '''Returns True if the event is of a recorded session of the cabinet'''
+        return event.cabinet == self.cabinet and event.session_id is not None
+
+    def record_round(self, event):
+        '''Records a won or drawn round'''
+        if self.is_recorded(event):
+            self.session_store.record_round(event.session_id, event.cabinet, event.round_number, event.first_player,
+                                            event.winner, len(event.positions), event.duration,
+                                            ''.join(str(position) for position in event.positions))
+
+    def record_champion(self, event):
+        '''Records the end of a session with its champion'''
+        if self.is_recorded(event):
+            self.session_store.end_session(event.session_id, event.score, event.champion)
+
+    def record_session_left(self, event):
+        '''Records the end of a session that was left'''
+        if self.is_recorded(event):
+            self.session_store.end_session(event.session_id, event.score, None)
+
+# Functions
+
+
+def get_day(timestamp):
+    '''Returns the local day of the timestamp as YYYY-MM-DD'''
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
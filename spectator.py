@@ -0,0 +1,400 @@
+# Streams the live state of the cabinets to remote spectators over UDP
+# Every cabinet sends its changes (cells, turn, chances, score, screen and the highlighted cell) to a hub as small
+# binary deltas, with a full keyframe every KEYFRAME_INTERVAL so a spectator that joins late or loses a datagram
+# is in sync again within a second. The game loop only compares a tuple of the state and queues it when it has
+# changed, the encoding and the socket are handled by a background thread
+# The hub forwards the datagrams of all the cabinets as they are to the subscribed spectators and answers a new
+# subscription with a keyframe of every cabinet, so it never decodes and encodes a delta again per spectator
+#
+# Datagram header (4 bytes): kind, cabinet, sequence
+#   KEYFRAME board holds 2 bits per cell, then flags, score of player 1, score of player 2, screen,
+#            highlighted cell and the name of the cabinet
+#   DELTA    a list of changes, a cell change is one byte (cell << 2 | value), the other changes are a tag
+#            byte and their value
+# Flags: current player (bits 0-1), remaining chances (bits 2-3), finished (bit 4),
+#        computer vs human mode (bit 5), computer move (bit 6)
+# Subscription (2 bytes): SUBSCRIBE, cabinet (ALL_CABINETS for every cabinet), sent again every SUBSCRIBE_INTERVAL
+#
+# Usage: python spectator.py [--port 5006]                          runs the hub
+#        python spectator.py --watch [--host HOST] [--cabinet N]    prints the changes of the cabinets
+
+import argparse
+import asyncio
+import queue
+import socket
+import struct
+import threading
+import time
+
+# Constants
+HUB_HOST = '127.0.0.1'
+HUB_PORT = 5006
+HEADER = struct.Struct('!BBH')
+KEYFRAME_STATE = struct.Struct('!IBHHBB')
+SCORE = struct.Struct('!HH')
+SUBSCRIPTION = struct.Struct('!BB')
+KEYFRAME = ord('K')
+DELTA = ord('D')
+SUBSCRIBE = ord('W')
+TAG_FLAGS = 0x40
+TAG_SCORE = 0x41
+TAG_SCREEN = 0x42
+TAG_NAVIGATION = 0x43
+ALL_CABINETS = 255
+MAX_NAME_LENGTH = 32
+KEYFRAME_INTERVAL = 1.0
+SUBSCRIBE_INTERVAL = 5.0
+SUBSCRIBER_TIMEOUT = 3 * SUBSCRIBE_INTERVAL
+SCREEN_INSTRUCTIONS = 0
+SCREEN_CHOOSE_MODE = 1
+SCREEN_BOARD = 2
+SCREEN_ROUND_OVER = 3
+SCREEN_MATCH_OVER = 4
+SCREEN_NAMES = {SCREEN_INSTRUCTIONS: 'instructions', SCREEN_CHOOSE_MODE: 'choose mode', SCREEN_BOARD: 'board',
+                SCREEN_ROUND_OVER: 'round over', SCREEN_MATCH_OVER: 'match over'}
+
+# Classes
+
+
+class SpectatorStream:
+    '''Sends the state of one cabinet to the hub from a background thread'''
+
+    def __init__(self, cabinet, name='', hub_address=(HUB_HOST, HUB_PORT), keyframe_interval=KEYFRAME_INTERVAL):
+        '''Opens the socket and starts the sender thread
+        cabinet: The number of the cabinet on the hub, from 0 to 254
+        name: The name of the cabinet shown to the spectators
+        hub_address: The host and port of the hub
+        keyframe_interval: The time in seconds between two keyframes
+        last_state: The last state published by the game loop
+        sent, bytes_sent, dropped: The counters of the stream
+        '''
+        if not isinstance(cabinet, int):
+            raise TypeError('cabinet must be an integer')
+        if not 0 <= cabinet < ALL_CABINETS:
+            raise ValueError('cabinet must be between 0 and {}'.format(ALL_CABINETS - 1))
+
+        self.cabinet = cabinet
+        self.name = name.encode()[:MAX_NAME_LENGTH]
+        self.hub_address = hub_address
+        self.keyframe_interval = keyframe_interval
+        self.last_state = None
+        self.sequence = 0
+        self.sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.states = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def publish(self, game):
+        '''Queues the state of the game if it has changed, the game loop calls it after a press or a computer move'''
+        state = get_state(game)
+        if state != self.last_state:
+            self.last_state = state
+            self.states.put(state)
+
+    def close(self):
+        '''Stops the sender thread'''
+        self.states.put(None)
+        self.thread.join()
+        self.socket.close()
+
+    def run(self):
+        '''Sends the queued states as deltas and a keyframe every keyframe interval until the stream is closed'''
+        sent_state = None
+        next_keyframe_time = time.monotonic()
+        while True:
+            # Nothing is sent before the first state, then a keyframe is due every keyframe interval
+            timeout = None if sent_state is None else max(0, next_keyframe_time - time.monotonic())
+            try:
+                state = self.states.get(timeout=timeout)
+            except queue.Empty:
+                state = sent_state
+
+            # Only the newest state is sent when the thread is behind, its delta has every change
+            try:
+                while state is not None:
+                    state = self.states.get_nowait()
+            except queue.Empty:
+                pass
+            if state is None:
+                return
+
+            if sent_state is None or time.monotonic() >= next_keyframe_time:
+                self.send(encode_keyframe(self.cabinet, self.sequence, state, self.name))
+                next_keyframe_time = time.monotonic() + self.keyframe_interval
+            elif state != sent_state:
+                self.send(encode_delta(self.cabinet, self.sequence, sent_state, state))
+            sent_state = state
+
+    def send(self, data):
+        '''Sends a datagram to the hub, it is dropped if the socket cannot send it right away'''
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        try:
+            self.socket.sendto(data, self.hub_address)
+            self.sent += 1
+            self.bytes_sent += len(data)
+        except OSError as e:
+            self.dropped += 1
+            if self.dropped == 1:
+                print('Error while sending to the spectator hub: {}'.format(e))
+
+    def get_stats(self):
+        '''Returns the number of datagrams sent, the bytes sent and the datagrams dropped'''
+        return {'sent': self.sent, 'bytes_sent': self.bytes_sent, 'dropped': self.dropped}
+
+
+class SpectatorView:
+    '''The state of one cabinet rebuilt from its datagrams'''
+
+    def __init__(self, cabinet):
+        '''Initializes the view, it is not in sync until its first keyframe
+        cabinet: The number of the cabinet
+        state: The state tuple of the cabinet, see get_state
+        synced: A boolean that represents whether the deltas can be applied or not
+        '''
+        self.cabinet = cabinet
+        self.name = ''
+        self.state = None
+        self.sequence = None
+        self.synced = False
+
+    def apply(self, data):
+        '''Applies a keyframe or a delta and returns True if the state has changed'''
+        kind, cabinet, sequence = HEADER.unpack_from(data)
+        if kind == KEYFRAME:
+            state, name = decode_keyframe(data)
+            self.name = name
+        elif kind == DELTA and self.synced and sequence == (self.sequence + 1) & 0xFFFF:
+            state = decode_delta(data, self.state)
+        else:
+            # A datagram was lost, wait for the next keyframe
+            self.synced = False
+            return False
+
+        changed = state != self.state
+        self.state = state
+        self.sequence = sequence
+        self.synced = True
+        return changed
+
+
+class SpectatorHub(asyncio.DatagramProtocol):
+    '''Receives the datagrams of the cabinets and forwards them to the subscribed spectators'''
+
+    def __init__(self):
+        '''Initializes the hub without any cabinet or spectator
+        views: A dictionary of the cabinet numbers and their SpectatorView
+        subscribers: A dictionary of the addresses of the spectators and their cabinet and expiry time
+        '''
+        self.transport = None
+        self.views = {}
+        self.subscribers = {}
+        self.forwarded = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if len(data) == SUBSCRIPTION.size and data[0] == SUBSCRIBE:
+            self.subscribe(address, data[1])
+            return
+        if len(data) < HEADER.size or data[0] not in (KEYFRAME, DELTA):
+            return
+
+        cabinet = data[1]
+        view = self.views.get(cabinet)
+        if view is None:
+            view = self.views[cabinet] = SpectatorView(cabinet)
+        try:
+            view.apply(data)
+        except struct.error:
+            return
+
+        now = time.monotonic()
+        for subscriber, (subscribed_cabinet, expiry_time) in list(self.subscribers.items()):
+            if expiry_time < now:
+                del self.subscribers[subscriber]
+            elif subscribed_cabinet in (cabinet, ALL_CABINETS):
+                self.transport.sendto(data, subscriber)
+                self.forwarded += 1
+
+    def subscribe(self, address, cabinet):
+        '''Adds or renews a spectator and sends it a keyframe of the cabinets it watches if it is new'''
+        is_new = address not in self.subscribers
+        self.subscribers[address] = (cabinet, time.monotonic() + SUBSCRIBER_TIMEOUT)
+        if not is_new:
+            return
+        for view in self.views.values():
+            if view.synced and cabinet in (view.cabinet, ALL_CABINETS):
+                self.transport.sendto(encode_keyframe(view.cabinet, view.sequence, view.state,
+                                                      view.name.encode()), address)
+
+
+class SpectatorClient(asyncio.DatagramProtocol):
+    '''Subscribes to the hub and keeps the views of the watched cabinets'''
+
+    def __init__(self, cabinet=ALL_CABINETS, on_change=None):
+        '''Initializes the client
+        cabinet: The number of the cabinet to watch, ALL_CABINETS to watch every cabinet
+        on_change: The function called with the view of a cabinet when its state changes
+        '''
+        self.cabinet = cabinet
+        self.on_change = on_change
+        self.views = {}
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.subscribe()
+
+    def subscribe(self):
+        '''Sends the subscription to the hub'''
+        self.transport.sendto(SUBSCRIPTION.pack(SUBSCRIBE, self.cabinet))
+
+    def datagram_received(self, data, address):
+        cabinet = data[1]
+        view = self.views.get(cabinet)
+        if view is None:
+            view = self.views[cabinet] = SpectatorView(cabinet)
+        if view.apply(data) and self.on_change is not None:
+            self.on_change(view)
+
+# Functions
+
+
+def get_state(game):
+    '''Returns the state of the game seen by the spectators as a tuple
+    (cells, flags, score, screen, highlighted cell)
+    '''
+    if game.started:
+        screen = SCREEN_ROUND_OVER if game.finished else SCREEN_BOARD
+    elif game.can_start_again:
+        screen = SCREEN_MATCH_OVER
+    elif getattr(game, 'can_use_select_button', False):
+        screen = SCREEN_CHOOSE_MODE
+    else:
+        screen = SCREEN_INSTRUCTIONS
+    flags = game.current_player | (game.remaining_chances << 2) | (game.finished << 4) | (
+        game.computer_vs_human_mode << 5) | (game.computer_move << 6)
+    return (tuple(led.selected for led in game.leds), flags, (game.score[1], game.score[2]), screen,
+            game.navigation_button_position)
+
+
+def encode_keyframe(cabinet, sequence, state, name=b''):
+    '''Returns the keyframe datagram of the state'''
+    cells, flags, score, screen, navigation_position = state
+    board = 0
+    for i, value in enumerate(cells):
+        board |= value << (2 * i)
+    return HEADER.pack(KEYFRAME, cabinet, sequence) + KEYFRAME_STATE.pack(
+        board, flags, score[0], score[1], screen, navigation_position) + name
+
+
+def encode_delta(cabinet, sequence, old_state, new_state):
+    '''Returns the delta datagram with the changes from the old state to the new state'''
+    old_cells, old_flags, old_score, old_screen, old_navigation_position = old_state
+    cells, flags, score, screen, navigation_position = new_state
+    data = bytearray(HEADER.pack(DELTA, cabinet, sequence))
+    for i, (old_value, value) in enumerate(zip(old_cells, cells)):
+        if value != old_value:
+            data.append(i << 2 | value)
+    if flags != old_flags:
+        data += bytes((TAG_FLAGS, flags))
+    if score != old_score:
+        data.append(TAG_SCORE)
+        data += SCORE.pack(*score)
+    if screen != old_screen:
+        data += bytes((TAG_SCREEN, screen))
+    if navigation_position != old_navigation_position:
+        data += bytes((TAG_NAVIGATION, navigation_position))
+    return bytes(data)
+
+
+def decode_keyframe(data):
+    '''Returns the state and the name of the cabinet of a keyframe datagram'''
+    board, flags, score_1, score_2, screen, navigation_position = KEYFRAME_STATE.unpack_from(
+        data, HEADER.size)
+    cells = tuple((board >> (2 * i)) & 3 for i in range(9))
+    name = data[HEADER.size + KEYFRAME_STATE.size:].decode(errors='replace')
+    return (cells, flags, (score_1, score_2), screen, navigation_position), name
+
+
+def decode_delta(data, state):
+    '''Returns the state with the changes of a delta datagram applied'''
+    cells, flags, score, screen, navigation_position = state
+    cells = list(cells)
+    i = HEADER.size
+    while i < len(data):
+        tag = data[i]
+        if tag < TAG_FLAGS:
+            cells[tag >> 2] = tag & 3
+            i += 1
+        elif tag == TAG_SCORE:
+            score = SCORE.unpack_from(data, i + 1)
+            i += 1 + SCORE.size
+        else:
+            if tag == TAG_FLAGS:
+                flags = data[i + 1]
+            elif tag == TAG_SCREEN:
+                screen = data[i + 1]
+            elif tag == TAG_NAVIGATION:
+                navigation_position = data[i + 1]
+            i += 2
+    return (tuple(cells), flags, score, screen, navigation_position)
+
+
+def format_view(view):
+    '''Returns one line that describes the state of a cabinet'''
+    cells, flags, score, screen, navigation_position = view.state
+    board = '/'.join(''.join('.OX'[value] for value in cells[i:i + 3]) for i in range(0, 9, 3))
+    return 'Cabinet {} {}: {} {}, player {}, chances {}, score {}-{}'.format(
+        view.cabinet, view.name, board, SCREEN_NAMES.get(screen, screen), flags & 3, (flags >> 2) & 3,
+        score[0], score[1])
+
+
+async def serve(host='0.0.0.0', port=HUB_PORT):
+    '''Runs the hub until it is stopped'''
+    loop = asyncio.get_running_loop()
+    transport, hub = await loop.create_datagram_endpoint(SpectatorHub, local_addr=(host, port))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        transport.close()
+
+
+async def watch(host=HUB_HOST, port=HUB_PORT, cabinet=ALL_CABINETS):
+    '''Prints the state of the watched cabinets every time it changes'''
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(
+        lambda: SpectatorClient(cabinet, lambda view: print(format_view(view))), remote_addr=(host, port))
+    try:
+        while True:
+            await asyncio.sleep(SUBSCRIBE_INTERVAL)
+            client.subscribe()
+    finally:
+        transport.close()
+
+
+# Main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the spectator hub or watch the cabinets')
+    parser.add_argument('--port', type=int, default=HUB_PORT)
+    parser.add_argument('--watch', action='store_true',
+                        help='print the changes of the cabinets instead of running the hub')
+    parser.add_argument('--host', default=HUB_HOST, help='the host of the hub to watch')
+    parser.add_argument('--cabinet', type=int, default=ALL_CABINETS,
+                        help='the number of the cabinet to watch, every cabinet by default')
+    args = parser.parse_args()
+
+    try:
+        if args.watch:
+            asyncio.run(watch(args.host, args.port, args.cabinet))
+        else:
+            print('Serving the spectator stream on port {}'.format(args.port))
+            asyncio.run(serve(port=args.port))
+    except KeyboardInterrupt:
+        pass
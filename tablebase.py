@@ -0,0 +1,236 @@
+# Builds a complete win/draw/loss tablebase of tic tac toe by retrograde analysis
+# A position with n pieces only depends on the positions with n + 1 pieces, so the levels are
+# solved from the full board down to the empty board and every level is split over a process pool
+# The result is stored with 2 bits per position, indexed by the board read as a base 3 number,
+# so the value of any position is one memory mapped read at game time
+#
+# Usage: python tablebase.py [size] [file]    (size 4 builds the 4x4 variant)
+
+import itertools
+import mmap
+import multiprocessing
+import os
+import random
+import sys
+
+# Constants
+MAGIC = b'TTTB'
+HEADER_SIZE = 8
+INVALID = 0
+LOSS = 1
+DRAW = 2
+WIN = 3
+
+# Shared by the worker processes, set by open_scratch
+scratch = None
+
+# Functions
+
+
+def get_lines(size):
+    '''Returns the bitmasks of the rows, columns and diagonals of a board
+    size: the number of cells of a side of the board
+    '''
+    lines = []
+    for i in range(size):
+        lines.append(sum(1 << (i * size + j) for j in range(size)))
+        lines.append(sum(1 << (j * size + i) for j in range(size)))
+    lines.append(sum(1 << (i * size + i) for i in range(size)))
+    lines.append(sum(1 << (i * size + size - 1 - i) for i in range(size)))
+    return lines
+
+
+def has_line(mask, lines):
+    '''Returns True if the cells of the mask fill a line'''
+    for line in lines:
+        if mask & line == line:
+            return True
+    return False
+
+
+def get_table_file_name(size):
+    '''Returns the default file name of the tablebase of the board size'''
+    return 'tablebase_{0}x{0}.bin'.format(size)
+
+
+def open_scratch(file_name):
+    '''Opens the scratch file of the build in a worker process, it has one byte per position'''
+    global scratch
+    file = open(file_name, 'r+b')
+    scratch = mmap.mmap(file.fileno(), 0)
+
+
+def solve_positions(task):
+    '''Solves the positions of one level whose first occupied cell is the given one, returns their number
+    task: the size of the board, the number of pieces and the first occupied cell
+    '''
+    size, pieces, first_cell = task
+    cells = size * size
+    lines = get_lines(size)
+    powers = [3 ** cell for cell in range(cells)]
+    x_count = (pieces + 1) // 2
+
+    # Player 1 (X) always plays first, so the number of pieces tells who is to move
+    mover = 1 if pieces % 2 == 0 else 2
+
+    if pieces == 0:
+        occupied_sets = [()]
+    else:
+        occupied_sets = ((first_cell,) + rest for rest in itertools.combinations(
+            range(first_cell + 1, cells), pieces - 1))
+
+    solved = 0
+    for occupied in occupied_sets:
+        empty_cells = [cell for cell in range(cells) if cell not in occupied]
+        for x_cells in itertools.combinations(occupied, x_count):
+            index = 0
+            x_mask = 0
+            o_mask = 0
+            for cell in occupied:
+                if cell in x_cells:
+                    index += powers[cell]
+                    x_mask |= 1 << cell
+                else:
+                    index += 2 * powers[cell]
+                    o_mask |= 1 << cell
+
+            mover_mask, last_mover_mask = (
+                x_mask, o_mask) if mover == 1 else (o_mask, x_mask)
+
+            if has_line(mover_mask, lines):
+                # The game would have ended before the player to move got a line
+                value = INVALID
+            elif has_line(last_mover_mask, lines):
+                value = LOSS
+            elif not empty_cells:
+                value = DRAW
+            else:
+                # The best child for the player to move, a child lost by the opponent is a win
+                value = LOSS
+                for cell in empty_cells:
+                    child_value = scratch[index + mover * powers[cell]]
+                    if child_value == LOSS:
+                        value = WIN
+                        break
+                    if child_value == DRAW:
+                        value = DRAW
+
+            scratch[index] = value
+            solved += 1
+    return solved
+
+
+def pack_range(task):
+    '''Packs the values of a range of positions into 2 bits each
+    task: the name of the table file and the first and last position, the first is a multiple of 4
+    '''
+    file_name, start, end = task
+    values = scratch[start:end]
+    values += bytes(-len(values) % 4)
+
+    # Every value fits in 2 bits, so the 4 values of a byte can be combined with big integer shifts
+    packed = 0
+    for i in range(4):
+        packed |= int.from_bytes(values[i::4], 'little') << (2 * i)
+
+    with open(file_name, 'r+b') as file:
+        file.seek(HEADER_SIZE + start // 4)
+        file.write(packed.to_bytes(len(values) // 4, 'little'))
+
+
+def build_tablebase(size, file_name, processes=None):
+    '''Builds the tablebase of the board size and saves it to the file
+    size: the number of cells of a side of the board
+    file_name: the file the packed tablebase is saved to
+    processes: the number of worker processes, all the cores are used if it is None
+    '''
+    cells = size * size
+    positions = 3 ** cells
+    scratch_file_name = file_name + '.scratch'
+
+    with open(scratch_file_name, 'wb') as file:
+        file.truncate(positions)
+
+    with multiprocessing.Pool(processes, open_scratch, (scratch_file_name,)) as pool:
+        for pieces in range(cells, -1, -1):
+            if pieces == 0:
+                tasks = [(size, 0, None)]
+            else:
+                tasks = [(size, pieces, first_cell)
+                         for first_cell in range(cells - pieces + 1)]
+            solved = sum(pool.imap_unordered(solve_positions, tasks))
+            print('Solved {} positions with {} pieces'.format(solved, pieces))
+
+        with open(file_name, 'wb') as file:
+            file.write(MAGIC + bytes([size]) + bytes(HEADER_SIZE - 5))
+            file.truncate(HEADER_SIZE + (positions + 3) // 4)
+
+        chunk = 1 << 20
+        pool.map(pack_range, [(file_name, start, min(start + chunk, positions))
+                              for start in range(0, positions, chunk)])
+
+    os.remove(scratch_file_name)
+
+# Classes
+
+
+class Tablebase:
+    '''Reads the values of the positions from a memory mapped tablebase file'''
+
+    def __init__(self, file_name):
+        '''Opens the tablebase file
+        file_name: the file built by build_tablebase
+        size: the number of cells of a side of the board
+        '''
+        with open(file_name, 'rb') as file:
+            self.table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.table[:4] != MAGIC:
+            raise ValueError('{} is not a tablebase file'.format(file_name))
+        self.size = self.table[4]
+        self.powers = [3 ** cell for cell in range(self.size * self.size)]
+
+    def get_index(self, game_board):
+        '''Returns the index of the board, the board read as a base 3 number'''
+        return sum(value * power for value, power in zip(game_board, self.powers))
+
+    def get_value(self, index):
+        '''Returns the value (INVALID, LOSS, DRAW or WIN) of a position for the player to move'''
+        return (self.table[HEADER_SIZE + index // 4] >> (2 * (index % 4))) & 3
+
+    def get_best_moves(self, game_board, symbol):
+        '''Returns the positions from 1 to the number of cells with the best value for the player
+        game_board: the list of the selected values of the cells (0, 1 or 2)
+        symbol: the player to move, either player can have played first
+        '''
+        # The table stores the player who played first as 1, so the board is swapped if player 2 played first
+        other_symbol = 1 if symbol == 2 else 2
+        if game_board.count(symbol) == game_board.count(other_symbol):
+            mover, players = 1, {0: 0, symbol: 1, other_symbol: 2}
+        else:
+            mover, players = 2, {0: 0, symbol: 2, other_symbol: 1}
+        game_board = [players[value] for value in game_board]
+
+        index = self.get_index(game_board)
+        moves = {LOSS: [], DRAW: [], WIN: []}
+        for cell, value in enumerate(game_board):
+            if value == 0:
+                # A child lost by the opponent is a win for the player
+                child_value = self.get_value(
+                    index + mover * self.powers[cell])
+                moves[WIN if child_value == LOSS else LOSS if child_value == WIN else DRAW].append(
+                    cell + 1)
+        return moves[WIN] or moves[DRAW] or moves[LOSS]
+
+    def computer_move(self, game_board, symbol=2):
+        '''Returns the position the computer plays, it can be used as the computer player of a game'''
+        if 0 not in game_board:
+            raise Exception('All LEDs are selected')
+        return random.choice(self.get_best_moves(game_board, symbol))
+
+
+# Main function
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    file_name = sys.argv[2] if len(sys.argv) > 2 else get_table_file_name(size)
+    build_tablebase(size, file_name)
+    print('Saved the tablebase to {}'.format(file_name))
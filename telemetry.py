@@ -0,0 +1,136 @@
+# The debug overlay of the Tic Tac Toe game
+# It shows the FPS, a graph of the last frame times, the logic updates per second, the serial messages
+# per second, the time the computer took for its last move and the latency from a button press to its sound. It is toggled with the F3 key and drawn
+# by the renderer over the screen only on the display, so the game never has to redraw what it covers
+
+import collections
+import time
+import pygame as pg
+
+# Constants
+TOGGLE_KEY = pg.K_F3
+GRAPH_FRAMES = 120
+GRAPH_HEIGHT = 60
+GRAPH_MAX_FRAME_TIME = 0.05
+PANEL_WIDTH = 260
+LINE_HEIGHT = 18
+STAT_LINES = 7
+STATS_INTERVAL = 0.5
+
+# Classes
+
+
+class Telemetry:
+    '''Measures the frames and the logic updates of a game loop and draws them as an overlay'''
+
+    def __init__(self, game_loop, target_fps):
+        '''Initializes the overlay, it is hidden until it is toggled
+        game_loop: The GameLoop whose game, input monitor, serial writer and sounds are measured
+        target_fps: The FPS the frames are rendered at, drawn as a line on the graph
+        visible: A boolean that represents whether the overlay is shown or not
+        frame_times: The durations of the last frames in seconds
+        updates: The number of logic updates since the stats were last computed
+        lines: The rendered text lines of the stats
+        '''
+        self.game_loop = game_loop
+        self.target_frame_time = 1 / target_fps
+        self.visible = False
+        self.frame_times = collections.deque(maxlen=GRAPH_FRAMES)
+        self.last_frame_time = None
+        self.updates = 0
+        self.last_messages = self.get_serial_messages()
+        self.stats_time = time.perf_counter()
+        self.font = pg.font.Font(pg.font.get_default_font(), 14)
+        self.lines = []
+
+    def toggle(self):
+        '''Shows or hides the overlay'''
+        self.visible = not self.visible
+
+    def handle_event(self, event):
+        '''Toggles the overlay when the toggle key is pressed'''
+        if event.type == pg.KEYDOWN and event.key == TOGGLE_KEY:
+            self.toggle()
+
+    def record_update(self):
+        '''Counts a logic update'''
+        self.updates += 1
+
+    def record_frame(self):
+        '''Records the time since the last frame and computes the stats every STATS_INTERVAL'''
+        now = time.perf_counter()
+        if self.last_frame_time is not None:
+            self.frame_times.append(now - self.last_frame_time)
+        self.last_frame_time = now
+
+        elapsed_time = now - self.stats_time
+        if elapsed_time >= STATS_INTERVAL:
+            messages = self.get_serial_messages()
+            self.update_lines(self.updates / elapsed_time,
+                              (messages - self.last_messages) / elapsed_time)
+            self.updates = 0
+            self.last_messages = messages
+            self.stats_time = now
+
+    def get_serial_messages(self):
+        '''Returns the number of serial messages sent and received by the board of the game loop'''
+        messages = 0
+        if self.game_loop.serial_writer is not None:
+            messages += self.game_loop.serial_writer.sent
+        if self.game_loop.input_monitor is not None:
+            messages += self.game_loop.input_monitor.messages
+        return messages
+
+    def update_lines(self, updates_per_second, messages_per_second):
+        '''Renders the text lines of the stats'''
+        frame_times = list(self.frame_times)
+        average_frame_time = sum(frame_times) / \
+            len(frame_times) if frame_times else 0
+        fps = 1 / average_frame_time if average_frame_time else 0
+        texts = [
+            'FPS: {:.1f}'.format(fps),
+            'Frame time: {:.1f} ms (max {:.1f} ms)'.format(
+                average_frame_time * 1000, max(frame_times, default=0) * 1000),
+            'Logic updates/s: {:.0f}'.format(updates_per_second),
+            'Serial messages/s: {:.0f}'.format(messages_per_second),
+            'AI time: {:.2f} ms'.format(
+                self.game_loop.game.computer_move_time * 1000),
+            'Sound latency: {1:.1f} ms (max {2:.1f} ms)'.format(
+                *self.game_loop.game.renderer.assets.audio.get_latency_report()),
+        ]
+        if self.game_loop.input_monitor is not None:
+            input_monitor = self.game_loop.input_monitor
+            texts.append('Input latency p99: {3:.1f} ms (target {0:.1f} ms)'.format(
+                input_monitor.latency_target * 1000, *input_monitor.get_latency_report()[1:]))
+        self.lines = [self.font.render(text, 1, (255, 255, 255))
+                      for text in texts]
+
+    def get_area(self):
+        '''Returns the area of the screen the overlay covers'''
+        return pg.Rect(5, 5, PANEL_WIDTH, STAT_LINES * LINE_HEIGHT + GRAPH_HEIGHT + 15)
+
+    def draw(self, surface):
+        '''Draws the overlay on the surface'''
+        area = self.get_area()
+        surface.fill((0, 0, 0), area)
+
+        y = area.top + 5
+        for line in self.lines:
+            surface.blit(line, (area.left + 5, y))
+            y += LINE_HEIGHT
+
+        # One bar per frame, red when the frame took longer than the target frame time
+        graph_bottom = area.bottom - 5
+        bar_width = max(1, (PANEL_WIDTH - 10) // GRAPH_FRAMES)
+        for i, frame_time in enumerate(self.frame_times):
+            bar_height = min(GRAPH_HEIGHT, int(
+                frame_time / GRAPH_MAX_FRAME_TIME * GRAPH_HEIGHT))
+            color = (220, 60, 60) if frame_time > self.target_frame_time * \
+                1.5 else (60, 200, 90)
+            surface.fill(color, (area.left + 5 + i * bar_width, graph_bottom - bar_height,
+                                 bar_width, bar_height))
+
+        target_y = graph_bottom - \
+            int(self.target_frame_time / GRAPH_MAX_FRAME_TIME * GRAPH_HEIGHT)
+        pg.draw.line(surface, (255, 255, 0), (area.left + 5, target_y),
+                     (area.right - 5, target_y))
@@ -5,437 +5,141 @@
 # The player who plays first is represented by 1 and the player who plays second is represented by 2
 # The player who plays first is represented by the LED that is turned on and the player who plays second is represented by the LED that is turned off
 
+import atexit
 import time
 import os
 import random
+import struct
+import zlib
 from pyfirmata import Arduino
 import pygame as pg
 from pygame.locals import *
 import sys
+from cabinet_config import BLINK_INTERVAL, PinTable
+from event_bus import ChampionDecided, EventBus, MoveMade, RoundDrawn, RoundWon, SessionLeft, SessionStarted
+from game_core import Cell, GameRules
+from input_monitor import InputMonitor
+from input_trace import TraceRecorder
+from move_cache import CACHE_FILE, MoveCache
+from serial_writer import SerialWriter
+from session_store import STORE_FILE, SessionRecorder, SessionStore
+from spectator import SpectatorStream
+from telemetry import Telemetry
+
+# Constants
+MAX_UPDATE_LAG = 0.1
+SNAPSHOT_FILE = 'session.snapshot'
+SNAPSHOT_FOOTER = struct.Struct('!II')
+
+# The move cache shared by all the games of the process
+move_cache = None
+
+# The session store shared by all the games of the process
+session_store = None
+
 # Classes
 
 
-class Led:
+class Led(Cell):
     '''Represents an LED object that can be turned on, turned off, blinked, and selected'''
 
-    def __init__(self, pin, board):
+    __slots__ = ('board', 'pin_number', 'serial_writer', 'pin')
+
+    def __init__(self, pin, board, serial_writer=None, output=None):
         '''Initializes the LED object with the pin number and the board
         pin: The pin number of the LED
         board: The Arduino board object
-        state: The state of the LED (0 or 1)
-        last_time_blinked: The last time the LED blinked
-        can_blink: A boolean that represents whether the LED can blink or not
-        selected: A boolean that represents whether the LED is selected or not
+        serial_writer: The SerialWriter that writes the pin from its thread, the pin is written directly if it is None
+        output: The pyfirmata output pin of the LED, it is resolved from the pin number if it is None
         '''
         if not isinstance(pin, int):
             raise TypeError('pin must be an integer')
         if not isinstance(board, Arduino):
             raise TypeError('board must be an Arduino object')
 
+        super().__init__()
         self.board = board
-        self.pin = self.board.get_pin('d:' + str(pin) + ':o')
-        self.state = 0
-        self.last_time_blinked = 0
-        self.can_blink = False
-        self.selected = 0
+        self.pin_number = pin
+        self.serial_writer = serial_writer
+        if serial_writer is None:
+            self.pin = output or self.board.get_pin('d:' + str(pin) + ':o')
+        else:
+            serial_writer.add_output_pin(pin, output)
 
     def turn_on(self):
         '''Turns the LED on by writing 1 to the pin and setting the state to 1'''
-        self.pin.write(1)
+        self.write(1)
         self.state = 1
 
     def turn_off(self):
         '''Turns the LED off by writing 0 to the pin and setting the state to 0'''
-        self.pin.write(0)
+        self.write(0)
         self.state = 0
 
-    def start_blinking(self):
-        '''Starts blinking the LED by setting can_blink to True'''
-        self.can_blink = True
-
-    def stop_blinking(self):
-        '''Stops blinking the LED by setting can_blink to False'''
-        self.can_blink = False
-
-    def reset(self):
-        '''Resets the LED by turning it off, stopping blinking, setting selected to 0, setting last_time_blinked to 0, and setting state to 0'''
-        self.turn_off()
-        self.stop_blinking()
-        self.selected = 0
-        self.last_time_blinked = 0
-        self.can_blink = False
-        self.state = 0
-        self.matched = False
+    def write(self, value):
+        '''Writes the value to the pin, through the serial writer if there is one'''
+        if self.serial_writer is None:
+            self.pin.write(value)
+        else:
+            self.serial_writer.write(self.pin_number, value)
 
 
-class Game:
-    '''Represents a Tic Tac Toe Game'''
+class Game(GameRules):
+    '''Represents a Tic Tac Toe Game played with the buttons and LEDs of a board'''
 
-    def __init__(self, leds):
-        '''Initializes the game with the LEDs and the chances
+    __slots__ = ('can_skip_instruction', 'can_use_select_button', 'session_store', 'cabinet', 'session_id',
+                 'round_start_time', 'spectator_stream', 'snapshot_file', 'renderer', 'event_bus', 'press_time')
+
+    def __init__(self, leds, renderer=None, computer_player=None, session_store=None, cabinet='',
+                 spectator_stream=None, snapshot_file=None, event_bus=None):
+        '''Initializes the game with the LEDs, the rules and the renderer
         leds: A list of LED objects
-        chances: The number of chances each player gets
-        started: A boolean that represents whether the game has started or not
-        finished: A boolean that represents whether the game is finished or not
-        navigation_button_position: The position of the navigation button
-        current_player: The current player
-        player_played_first: The player who played first
-        remaining_chances: The remaining chances
-        score: The score of the players
-        computer_vs_human_mode: A boolean that represents whether the game is in computer vs human mode or not
-        computer_move: A boolean that represents whether the computer is making a move or not
-        computer_move_start_time: The time when the computer started making a move
-        computer_move_delay: The delay between the computer moves
-        can_get_input: A boolean that represents whether the game can get input or not
-        can_start_again: A boolean that represents whether the game can start again or not
+        renderer: The Renderer that shows the game, a pygame window is opened if it is None
+        computer_player: The function that returns the move of the computer, the heuristic is used if it is None
+        session_store: The SessionStore the sessions are recorded in, they are not recorded if it is None
+        cabinet: The name of the cabinet the game is played on
+        spectator_stream: The SpectatorStream the state of the game is published to, it is not published if it is None
+        snapshot_file: The file the session is saved to after every move so it can be resumed, it is not saved if it is None
+        event_bus: The EventBus the events of the game are emitted on, a bus of this game is made if it is None
+        can_skip_instruction: A boolean that represents whether the instruction window can be skipped or not
+        can_use_select_button: A boolean that represents whether the select button can be used or not
+        session_id: The id of the session in the session store, None if no session is recorded
+        round_start_time: The time when the current round started
+        press_time: The time.perf_counter() of the button press handled in the current step, None if there is none
         '''
         if not isinstance(leds, list):
             raise TypeError('leds must be a list')
-        if not isinstance(leds[0], Led):
-            raise TypeError('leds must be a list of Led objects')
-
-        self.leds = leds
-        self.chances = 3
-        self.started = False
-        self.finished = False
-        self.navigation_button_position = 0
-        self.navigation_button_last_position = 0
-        self.current_player = 1
-        self.player_played_first = 1
-        self.remaining_chances = self.chances
-        self.score = {1: 0, 2: 0}
-        self.computer_vs_human_mode = False
-        self.computer_move = False
-        self.computer_move_start_time = 0
-        self.computer_move_delay = 3
-        self.can_get_input = False
-        self.can_start_again = False
-        self.can_skip_instruction = False
-        self.notification_in_screen = False
-        self.can_use_select_button = False
+        if not isinstance(leds[0], Cell):
+            raise TypeError('leds must be a list of Cell objects')
 
-        self.SCREEN_WIDTH = 1200
-        self.SCREEN_HEIGHT = 800
-        self.CELL_COORDINATES = [(73, 77), (256, 77), (439, 77), (73, 259),
-                                 (256, 259), (439, 259), (73, 442), (256, 442), (439, 442)]
-        self.BOARD_COORDINATES = [(101, 101), (288, 101), (468, 101), (101, 281),
-                                  (288, 281), (468, 281), (101, 466), (288, 466), (468, 466)]
-
-        self.initialize_gui()
-
-    def initialize_gui(self):
-        '''Initializes the GUI'''
-        # Initialize pygame
-        pg.init()
-
-        # Initialize the font
-        pg.font.init()
-
-        self.default_font = pg.font.get_default_font()
-        self.font_renderer = pg.font.Font(self.default_font, 30)
-
-        # Create the screen object
-        self.screen = pg.display.set_mode(
-            (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-
-        # Set the window title
-        pg.display.set_caption('Tic Tac Toe')
-
-        # Load the images
-        self.loading_window = pg.image.load("assets/images/loading.png")
-        self.instruction_window = pg.image.load(
-            "assets/images/instruction.png")
-        self.choose_mode_window = pg.image.load(
-            "assets/images/choose_mode.png")
-        self.champion_player_o_window = pg.image.load(
-            "assets/images/champion_player_o.png")
-        self.champion_player_x_window = pg.image.load(
-            "assets/images/champion_player_x.png")
-        self.match_is_draw_window = pg.image.load(
-            "assets/images/match_is_draw.png")
-        self.computer_is_thinking = pg.image.load(
-            "assets/images/computer_is_thinking.png")
-        self.computer_is_thinking_bg = pg.image.load(
-            "assets/images/computer_is_thinking_bg.png")
-        self.cell_selected_bg = pg.image.load(
-            "assets/images/cell_selected.png")
-        self.cell_not_selected_bg = pg.image.load(
-            "assets/images/cell_not_selected.png")
-        self.select_position = pg.image.load(
-            "assets/images/select_position.png")
-        self.thankyou_window = pg.image.load("assets/images/thankyou.png")
-        self.player_o_won = pg.image.load("assets/images/player_o_won.png")
-        self.player_x_won = pg.image.load("assets/images/player_x_won.png")
-        self.game_is_tie = pg.image.load("assets/images/game_is_tie.png")
-        self.game_board = pg.image.load("assets/images/game_board.png")
-        self.x_img = pg.image.load("assets/images/x.png")
-        self.o_img = pg.image.load("assets/images/o.png")
-        self.life = pg.image.load("assets/images/life.png")
-        self.player_bg = pg.image.load("assets/images/player_bg.png")
-
-        # Resize images
-        self.loading_window = pg.transform.scale(
-            self.loading_window, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.instruction_window = pg.transform.scale(
-            self.instruction_window, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.choose_mode_window = pg.transform.scale(
-            self.choose_mode_window, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.champion_player_o_window = pg.transform.scale(
-            self.champion_player_o_window, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.champion_player_x_window = pg.transform.scale(
-            self.champion_player_x_window, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.match_is_draw_window = pg.transform.scale(
-            self.match_is_draw_window, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.thankyou_window = pg.transform.scale(
-            self.thankyou_window, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.game_board = pg.transform.scale(
-            self.game_board, (self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
-        self.computer_is_thinking = pg.transform.scale(
-            self.computer_is_thinking, (561, 121))
-        self.computer_is_thinking_bg = pg.transform.scale(
-            self.computer_is_thinking_bg, (561, 121))
-        self.cell_selected_bg = pg.transform.scale(
-            self.cell_selected_bg, (164, 164))
-        self.cell_not_selected_bg = pg.transform.scale(
-            self.cell_not_selected_bg, (164, 164))
-        self.select_position = pg.transform.scale(
-            self.select_position, (561, 121))
-        self.player_o_won = pg.transform.scale(self.player_o_won, (764, 548))
-        self.player_x_won = pg.transform.scale(self.player_x_won, (764, 548))
-        self.game_is_tie = pg.transform.scale(self.game_is_tie, (764, 548))
-        self.x_img = pg.transform.scale(self.x_img, (107, 118))
-        self.o_img = pg.transform.scale(self.o_img, (107, 118))
-        self.player_x = pg.transform.scale(self.x_img, (53.5, 59))
-        self.player_o = pg.transform.scale(self.o_img, (53.5, 59))
-        self.player_bg = pg.transform.scale(self.player_bg, (53.5, 59))
-        self.life = pg.transform.scale(self.life, (54, 48))
-        self.life_bg = pg.transform.scale(self.player_bg, (54, 48))
-
-        # Load the sounds
-        self.select_sound = pg.mixer.Sound("assets/sounds/select.wav")
-        self.start_game_sound = pg.mixer.Sound("assets/sounds/start_game.wav")
-        self.won_game_sound = pg.mixer.Sound("assets/sounds/won_game.wav")
-        self.announce_champion_sound = pg.mixer.Sound(
-            "assets/sounds/announce_champion.wav")
-        self.click_button_sound = pg.mixer.Sound(
-            "assets/sounds/click_button.wav")
-        self.alert_sound = pg.mixer.Sound("assets/sounds/alert.wav")
-
-        # Load the music
-        self.intro_music = pg.mixer.music.load(
-            "assets/sounds/intro.wav")
+        super().__init__(leds, computer_player)
 
-        # Play the music
-        pg.mixer.music.play(-1)
-
-    def stop_music(self):
-        '''Stops the music'''
-        pg.mixer.music.stop()
-
-    def show_computer_is_thinking(self):
-        '''Shows the computer is thinking message'''
-        self.screen.blit(self.computer_is_thinking, (65, 660))
-        self.notification_in_screen = True
-        pg.display.update()
-
-    def show_select_position(self):
-        '''Shows the select position message'''
-        self.screen.blit(self.select_position, (65, 660))
-        self.notification_in_screen = True
-        pg.display.update()
-
-    def clear_notification(self):
-        '''Clears the notification'''
-        self.screen.blit(self.computer_is_thinking_bg, (65, 660))
-        pg.display.update()
-
-    def show_player_o_won(self):
-        '''Shows the player O won message'''
-        self.screen.blit(self.player_o_won, (218, 116))
-        pg.display.update()
-
-    def show_player_x_won(self):
-        '''Shows the player X won message'''
-        self.screen.blit(self.player_x_won, (218, 116))
-        pg.display.update()
-
-    def show_game_is_tie(self):
-        '''Shows the game is tie message'''
-        self.screen.blit(self.game_is_tie, (218, 116))
-        pg.display.update()
-
-    def draw_score(self):
-        '''Draws the score on the screen'''
-        player_1_score = self.font_renderer.render(
-            str(self.score[1]), 1, (255, 255, 255))
-        player_2_score = self.font_renderer.render(
-            str(self.score[2]), 1, (255, 255, 255))
-        self.screen.blit(player_1_score, (982, 503))
-        self.screen.blit(player_2_score, (982, 590))
-        pg.display.update()
-
-    def draw_x(self, position):
-        '''Draws X on the screen'''
-        self.screen.blit(self.x_img, position)
-        pg.display.update()
-
-    def draw_o(self, position):
-        '''Draws O on the screen'''
-        self.screen.blit(self.o_img, position)
-        pg.display.update()
-
-    def draw_cell_selected(self, position):
-        '''Draws cell selected on the screen'''
-        self.screen.blit(self.cell_selected_bg, position)
-        pg.display.update()
-
-    def draw_cell_not_selected(self, position):
-        '''Draws cell not selected on the screen'''
-        self.screen.blit(self.cell_not_selected_bg, position)
-        pg.display.update()
-
-    def update_game_board(self):
-        '''Updates the game board'''
-        for i in range(9):
-            if self.leds[i].selected == 1:
-                self.draw_cell_not_selected(self.CELL_COORDINATES[i])
-                self.draw_o(self.BOARD_COORDINATES[i])
-            elif self.leds[i].selected == 2:
-                self.draw_cell_not_selected(self.CELL_COORDINATES[i])
-                self.draw_x(self.BOARD_COORDINATES[i])
-
-    def draw_player_x(self):
-        '''Draws player X on the screen'''
-        self.screen.blit(self.player_bg, (912, 130))
-        self.screen.blit(self.player_x, (912, 130))
-        pg.display.update()
-
-    def draw_player_o(self):
-        '''Draws player O on the screen'''
-        self.screen.blit(self.player_bg, (912, 130))
-        self.screen.blit(self.player_o, (912, 130))
-        pg.display.update()
-
-    def draw_life(self):
-        '''Draws the remaining chances'''
-        if self.remaining_chances == 3:
-            self.screen.blit(self.life, (894, 220))
-            self.screen.blit(self.life, (960, 220))
-            self.screen.blit(self.life, (1026, 220))
-        elif self.remaining_chances == 2:
-            self.screen.blit(self.life, (894, 220))
-            self.screen.blit(self.life, (960, 220))
-            self.screen.blit(self.life_bg, (1026, 220))
-        elif self.remaining_chances == 1:
-            self.screen.blit(self.life, (894, 220))
-            self.screen.blit(self.life_bg, (960, 220))
-        elif self.remaining_chances == 0:
-            self.screen.blit(self.life_bg, (894, 220))
-
-        pg.display.update()
-
-    def show_game_board(self):
-        '''Shows the game board'''
-        # Displaying over gamescreen
-        self.screen.blit(self.game_board, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-
-    def show_choose_mode_window(self):
-        '''Shows the choose mode window'''
-        # Displaying over gamescreen
-        self.screen.blit(self.choose_mode_window, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-
-    def show_loading_window(self):
-        '''Shows the loading window'''
-        # Displaying over gamescreen
-        self.screen.blit(self.loading_window, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-        time.sleep(3)
-
-    def show_instruction_window(self):
-        '''Shows the instruction window'''
-        # Displaying over gamescreen
-        self.screen.blit(self.instruction_window, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-
-    def show_thankyou_window(self):
-        '''Shows the thankyou window'''
-        # Displaying over gamescreen
-        self.screen.blit(self.thankyou_window, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-
-    def show_champion_player_o_window(self):
-        '''Shows the champion player O window'''
-        # Displaying over gamescreen
-        self.screen.blit(self.champion_player_o_window, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-
-    def show_champion_player_x_window(self):
-        '''Shows the champion player X window'''
-        # Displaying over gamescreen
-        self.screen.blit(self.champion_player_x_window, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-
-    def show_match_is_draw_window(self):
-        '''Shows the match is draw window'''
-        # Displaying over gamescreen
-        self.screen.blit(self.match_is_draw_window, (0, 0))
-
-        # Updating the display
-        pg.display.update()
-
-    def refresh_game_board(self):
-        '''Refreshes the game board'''
-        self.show_game_board()
-        if self.current_player == 1:
-            self.draw_player_o()
-
-        if self.current_player == 2:
-            self.draw_player_x()
-
-        self.draw_life()
-
-        self.draw_score()
-
-    def reset_all_leds(self):
-        '''Resets all the LEDs'''
-        for led in self.leds:
-            led.reset()
-
-    def turn_on_all(self):
-        '''Turns on all the LEDs'''
-        for led in self.leds:
-            led.turn_on()
-
-    def turn_off_all(self):
-        '''Turns off all the LEDs'''
-        for led in self.leds:
-            led.turn_off()
-            led.stop_blinking()
-
-    def blink_all(self):
-        '''Blinks all the LEDs '''
-        for led in self.leds:
-            led.start_blinking()
+        self.can_skip_instruction = False
+        self.can_use_select_button = False
+        self.session_store = session_store
+        self.cabinet = cabinet
+        self.session_id = None
+        self.round_start_time = 0
+        self.press_time = None
+        self.spectator_stream = spectator_stream
+        self.snapshot_file = snapshot_file
+        self.event_bus = event_bus or EventBus()
+        if session_store is not None:
+            # The rounds and the end of the session are recorded from the events
+            SessionRecorder(session_store, cabinet).subscribe(self.event_bus)
+        # The events are shown on the screen and played as sounds in the game thread
+        GameView(self).subscribe(self.event_bus)
+
+        if renderer is None:
+            # Import pygame only when the game is shown in a window
+            from renderer import PygameRenderer
+            renderer = PygameRenderer()
+        self.renderer = renderer
 
     def welcome(self):
         '''Turns on all the LEDs for 1 second to welcome the player'''
-        os.system('cls')
+        if os.name == 'nt':
+            os.system('cls')
         self.turn_on_all()
         time.sleep(1)
         self.turn_off_all()
@@ -446,464 +150,80 @@ class Game:
         '''Starts the self'''
         self.started = True
         self.welcome()
-        self.refresh_game_board()
-        pg.mixer.Sound.play(self.start_game_sound)
-
-    def do_all_leds_selected(self):
-        '''Returns True if all the LEDs are selected'''
-        for led in self.leds:
-            if led.selected == 0:
-                return False
+        if self.session_store is not None:
+            self.session_id = self.session_store.start_session(
+                self.cabinet, self.computer_vs_human_mode)
+        self.round_start_time = time.time()
+        self.event_bus.emit(SessionStarted(self.cabinet, self.session_id, self.computer_vs_human_mode))
+        self.save_snapshot()
+
+    def resume(self):
+        '''Resumes the session saved in the snapshot file, returns True if there was one to resume'''
+        if self.snapshot_file is None or not os.path.exists(self.snapshot_file):
+            return False
+        try:
+            with open(self.snapshot_file, 'rb') as file:
+                data = file.read()
+            snapshot = data[:-SNAPSHOT_FOOTER.size]
+            session_id, checksum = SNAPSHOT_FOOTER.unpack(data[-SNAPSHOT_FOOTER.size:])
+            if zlib.crc32(snapshot + struct.pack('!I', session_id)) != checksum:
+                raise ValueError('the snapshot was not fully written')
+            self.restore_snapshot(snapshot)
+        except (OSError, ValueError, struct.error) as e:
+            print('Error while resuming the session: {}'.format(e))
+            self.remove_snapshot()
+            return False
+
+        self.session_id = session_id or None
+        self.round_start_time = time.time()
+        self.can_skip_instruction = False
+        self.can_use_select_button = True
+        self.can_get_input = True
+        self.renderer.refresh_game_board(
+            self.current_player, self.remaining_chances, self.score)
+        self.renderer.update_game_board(self.leds)
+        if self.computer_move and not self.finished:
+            self.renderer.show_computer_is_thinking()
         return True
 
-    def navigate(self):
-        '''Navigates the LEDS using the navigation button'''
-        if self.do_all_leds_selected():
-            return
-
-        self.navigation_button_last_position = self.navigation_button_position
-
-        self.navigation_button_position = self.navigation_button_position % len(
-            self.leds) + 1
-
-        while self.leds[self.navigation_button_position - 1].selected != 0:
-            self.navigation_button_position = self.navigation_button_position % len(
-                self.leds) + 1
-
-        if self.current_player == 1:
-            self.leds[self.navigation_button_position - 1].turn_on()
-        else:
-            self.leds[self.navigation_button_position - 1].start_blinking()
-
-        for led in self.leds:
-            if led != self.leds[self.navigation_button_position - 1] and led.selected == 0:
-                led.turn_off()
-                led.stop_blinking()
-
-    def enable_computer_vs_human_mode(self):
-        '''Enables computer vs human mode'''
-        self.computer_vs_human_mode = True
-
-    def disable_computer_vs_human_mode(self):
-        '''Disables computer vs human mode'''
-        self.computer_vs_human_mode = False
-
-    def disable_computer_move(self):
-        '''Disables computer move'''
-        self.computer_move = False
-
-    def enable_computer_move(self):
-        '''Enables computer move'''
-        self.computer_move = True
-
-    def do_computer_move(self):
-        '''Computer move for easy level it set the random position for navigation button'''
-        game_board = [led.selected for led in self.leds]
-        symbol = 2
-
-        if self.do_all_leds_selected():
-            raise Exception('All LEDs are selected')
-
-        # Define a list of possible moves
-        all_possible_moves = [
-            i for i, val in enumerate(game_board) if val == 0]
-
-        # Check if there is an opportunity to win the self
-        for move in all_possible_moves:
-            test_board = game_board.copy()
-            test_board[move] = symbol
-            for i in range(3):
-                # Check rows
-                if test_board[i*3:(i+1)*3] == [symbol]*3:
-                    self.navigation_button_position = move + 1
-                    return
-                # Check columns
-                if test_board[i::3] == [symbol]*3:
-                    self.navigation_button_position = move + 1
-                    return
-            # Check diagonals
-            if test_board[0::4] == [symbol]*3 or test_board[2:7:2] == [symbol]*3:
-                self.navigation_button_position = move + 1
-                return
-
-        # Check if the opponent has an opportunity to win
-        opponent_symbol = 1 if symbol == 2 else 2
-        for move in all_possible_moves:
-            test_board = game_board.copy()
-            test_board[move] = opponent_symbol
-            for i in range(3):
-                # Check rows
-                if test_board[i*3:(i+1)*3] == [opponent_symbol]*3:
-                    self.navigation_button_position = move + 1
-                    return
-                # Check columns
-                if test_board[i::3] == [opponent_symbol]*3:
-                    self.navigation_button_position = move + 1
-                    return
-            # Check diagonals
-            if test_board[0::4] == [opponent_symbol]*3 or test_board[2:7:2] == [opponent_symbol]*3:
-                self.navigation_button_position = move + 1
-                return
-
-        def add_available_positions(list1, list2):
-            for i in list2:
-                if i not in list1:
-                    list1.append(i)
-            return list1
-
-            # Check if a empty cell is available near to already selected cell by the computer
-        if symbol in game_board:
-            positions = [i for i, val in enumerate(
-                game_board) if val == symbol]
-            possible_moves = []
-            for position in positions:
-                if position == 0:
-                    can_1 = True if (
-                        game_board[1] == 0 and game_board[2] == 0) else False
-                    can_3 = True if (
-                        game_board[3] == 0 and game_board[6] == 0) else False
-                    can_4 = True if (
-                        game_board[4] == 0 and game_board[8] == 0) else False
-
-                    if can_1 and can_3 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 3, 4, 2, 6, 8])
-                    elif can_1 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 3, 2, 6])
-                    elif can_1 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 4, 2, 8])
-                    elif can_3 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [3, 4, 6, 8])
-                    elif can_1:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 2])
-                    elif can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [3, 6])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [4, 8])
-
-                elif position == 1:
-                    can_0 = True if (
-                        game_board[0] == 0 and game_board[2] == 0) else False
-                    can_4 = True if (
-                        game_board[0] == 0 and game_board[8] == 0) else False
-
-                    if can_0 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 4, 2, 8])
-                    elif can_0:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 2])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [4, 8])
-
-                elif position == 2:
-                    can_1 = True if (
-                        game_board[0] == 0 and game_board[1] == 0) else False
-                    can_5 = True if (
-                        game_board[5] == 0 and game_board[8] == 0) else False
-                    can_4 = True if (
-                        game_board[4] == 0 and game_board[6] == 0) else False
-
-                    if can_1 and can_5 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 5, 4, 0, 8, 6])
-                    elif can_1 and can_5:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 5, 0, 8])
-                    elif can_1 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 4, 0, 6])
-                    elif can_5 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [5, 4, 8, 6])
-                    elif can_1:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 0])
-                    elif can_5:
-                        possible_moves = add_available_positions(
-                            possible_moves, [5, 8])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [4, 6])
-
-                elif position == 3:
-                    can_0 = True if (
-                        game_board[0] == 0 and game_board[6] == 0) else False
-                    can_4 = True if (
-                        game_board[4] == 0 and game_board[5] == 0) else False
-
-                    if can_0 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 4, 6, 5])
-                    elif can_0:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 6])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [4, 5])
-
-                elif position == 4:
-                    can_0 = True if (
-                        game_board[0] == 0 and game_board[8] == 0) else False
-                    can_1 = True if (
-                        game_board[1] == 0 and game_board[7] == 0) else False
-                    can_2 = True if (
-                        game_board[2] == 0 and game_board[6] == 0) else False
-                    can_3 = True if (
-                        game_board[3] == 0 and game_board[5] == 0) else False
-
-                    if can_0 and can_1 and can_2 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 1, 2, 3, 5, 6, 7, 8])
-                    elif can_0 and can_1 and can_2:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 1, 2, 6, 7, 8])
-                    elif can_0 and can_1 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 1, 3, 5, 7, 8])
-                    elif can_0 and can_2 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 2, 3, 5, 6, 8])
-                    elif can_1 and can_2 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 2, 3, 5, 6, 7])
-                    elif can_0 and can_1:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 1, 7, 8])
-                    elif can_0 and can_2:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 2, 6, 8])
-                    elif can_0 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 3, 5, 8])
-                    elif can_1 and can_2:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 2, 6, 7])
-                    elif can_1 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 3, 5, 7])
-                    elif can_2 and can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 3, 5, 6])
-                    elif can_0:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 8])
-                    elif can_1:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 7])
-                    elif can_2:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 6])
-                    elif can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [3, 5])
-
-                elif position == 5:
-                    can_2 = True if (
-                        game_board[2] == 0 and game_board[8] == 0) else False
-                    can_4 = True if (
-                        game_board[3] == 0 and game_board[4] == 0) else False
-
-                    if can_2 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 3, 4, 8])
-                    elif can_2:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 8])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [3, 4])
-
-                elif position == 6:
-                    can_3 = True if (
-                        game_board[0] == 0 and game_board[3] == 0) else False
-                    can_7 = True if (
-                        game_board[7] == 0 and game_board[8] == 0) else False
-                    can_4 = True if (
-                        game_board[2] == 0 and game_board[4] == 0) else False
-
-                    if can_3 and can_7 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 2, 3, 4, 7, 8])
-                    elif can_3 and can_7:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 3, 7, 8])
-                    elif can_3 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 2, 3, 4])
-                    elif can_7 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 4, 7, 8])
-                    elif can_3:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 3])
-                    elif can_7:
-                        possible_moves = add_available_positions(
-                            possible_moves, [7, 8])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 4])
-
-                elif position == 7:
-                    can_6 = True if (
-                        game_board[6] == 0 and game_board[8] == 0) else False
-                    can_4 = True if (
-                        game_board[1] == 0 and game_board[4] == 0) else False
-
-                    if can_6 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 4, 6, 8])
-                    elif can_6:
-                        possible_moves = add_available_positions(
-                            possible_moves, [6, 8])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [1, 4])
-
-                elif position == 8:
-                    can_7 = True if (
-                        game_board[6] == 0 and game_board[7] == 0) else False
-                    can_5 = True if (
-                        game_board[2] == 0 and game_board[5] == 0) else False
-                    can_4 = True if (
-                        game_board[0] == 0 and game_board[4] == 0) else False
-
-                    if can_7 and can_5 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 2, 4, 5, 6, 7])
-                    elif can_7 and can_5:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 5, 6, 7])
-                    elif can_7 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 4, 6, 7])
-                    elif can_5 and can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 2, 4, 5])
-                    elif can_7:
-                        possible_moves = add_available_positions(
-                            possible_moves, [6, 7])
-                    elif can_5:
-                        possible_moves = add_available_positions(
-                            possible_moves, [2, 5])
-                    elif can_4:
-                        possible_moves = add_available_positions(
-                            possible_moves, [0, 4])
-            if len(possible_moves) != 0:
-                self.navigation_button_position = random.choice(
-                    possible_moves) + 1
-                return
-
-        # If there is no opportunity to win or block the opponent's winning move, sdo a random move
-        self.navigation_button_position = random.choice(all_possible_moves) + 1
-
-    def select(self):
-        '''Selects the LED using the select button'''
-        if self.navigation_button_position == 0:
+    def save_snapshot(self):
+        '''Saves the session to the snapshot file, the file is replaced at once so a power loss keeps the old one'''
+        if self.snapshot_file is None or not self.started:
             return
-        elif self.leds[self.navigation_button_position - 1].selected != 0:
+        data = self.get_snapshot() + struct.pack('!I', self.session_id or 0)
+        try:
+            with open(self.snapshot_file + '.tmp', 'wb') as file:
+                file.write(data + struct.pack('!I', zlib.crc32(data)))
+            os.replace(self.snapshot_file + '.tmp', self.snapshot_file)
+        except OSError as e:
+            print('Error while saving the session: {}'.format(e))
+
+    def remove_snapshot(self):
+        '''Removes the snapshot file when the session is over'''
+        if self.snapshot_file is None:
             return
-
-        if self.current_player == 1:
-            self.leds[self.navigation_button_position - 1].turn_on()
-            self.leds[self.navigation_button_position - 1].selected = 1
-        else:
-            self.leds[self.navigation_button_position - 1].start_blinking()
-            self.leds[self.navigation_button_position - 1].selected = 2
-
-    def switch_players(self):
-        '''Switches the current player'''
-        self.current_player = 1 if self.current_player == 2 else 2
-
-        if self.computer_vs_human_mode:
-            if self.computer_move:
-                self.disable_computer_move()
-            else:
-                self.enable_computer_move()
-                self.computer_move_start_time = time.time()
-
-    def check_for_win(self):
-        '''Checks if the current player has won'''
-        # Check for rows
-        for i in range(0, len(self.leds), 3):
-            if self.leds[i].selected == self.leds[i + 1].selected == self.leds[i + 2].selected != 0:
-                return True
-        # Check for columns
-        for i in range(0, 3):
-            if self.leds[i].selected == self.leds[i + 3].selected == self.leds[i + 6].selected != 0:
-                return True
-        # Check for diagonals
-        if self.leds[0].selected == self.leds[4].selected == self.leds[8].selected != 0:
-            return True
-        if self.leds[2].selected == self.leds[4].selected == self.leds[6].selected != 0:
-            return True
-        return False
-
-    def check_for_draw(self):
-        '''Checks if the self is a draw'''
-        if self.do_all_leds_selected():
-            return True
-        return False
-
-    def handle_win(self):
-        '''Handles the win'''
-        self.score[self.current_player] += 100
-        self.finished = True
-        self.remaining_chances -= 1
-
-    def handle_draw(self):
-        '''Handles the draw'''
-        self.score[1] += 50
-        self.score[2] += 50
-        self.finished = True
-        self.remaining_chances -= 1
-
-    def play_next_chance(self):
-        '''Plays the next chance'''
-        self.reset_all_leds()
-        self.finished = False
-        self.navigation_button_position = 0
-        self.switch_players()
-        self.player_played_first = self.current_player
-
-    def reset_game(self):
-        '''Resets the self'''
-        self.reset_all_leds()
-        self.finished = False
-        self.navigation_button_position = 0
-        self.current_player = 1
-        self.player_played_first = 1
-        self.remaining_chances = self.chances
-        self.score = {1: 0, 2: 0}
-        self.computer_vs_human_mode = False
-        self.computer_move = False
-        self.computer_move_start_time = 0
-        self.started = False
-        self.can_start_again = True
-        self.can_get_input = True
+        try:
+            os.remove(self.snapshot_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print('Error while removing the session: {}'.format(e))
 
     def handle_navigation(self):
         '''Handles the navigation button'''
         try:
-            if self.notification_in_screen:
-                self.clear_notification()
+            if self.renderer.notification_in_screen:
+                self.renderer.clear_notification()
 
             self.navigate()
 
             if self.navigation_button_last_position != 0:
-                self.draw_cell_not_selected(
-                    self.CELL_COORDINATES[self.navigation_button_last_position - 1])
+                self.renderer.draw_cell_not_selected(
+                    self.navigation_button_last_position - 1)
 
             if self.navigation_button_position != 0:
-                self.draw_cell_selected(
-                    self.CELL_COORDINATES[self.navigation_button_position - 1])
+                self.renderer.draw_cell_selected(
+                    self.navigation_button_position - 1)
 
         except Exception as e:
             print('\n')
@@ -912,73 +232,90 @@ class Game:
     def handle_selection(self):
         '''Handles the selection of the navigation button'''
         if self.navigation_button_position == 0:
-            self.show_select_position()
-            pg.mixer.Sound.play(self.alert_sound)
+            self.renderer.show_select_position()
+            self.renderer.play_sound('alert', self.press_time)
             return
         try:
             self.can_get_input = False
             self.select()
             self.navigation_button_position = 0
-            self.update_game_board()
-            pg.mixer.Sound.play(self.select_sound)
+            self.event_bus.emit(MoveMade(self.cabinet, self.session_id, *self.move_history[-1]))
 
             self.can_get_input = True
 
-            if self.notification_in_screen:
-                self.clear_notification()
+            if self.renderer.notification_in_screen:
+                self.renderer.clear_notification()
 
             if self.check_for_win():
                 self.handle_win()
-                if self.current_player == 1:
-                    self.show_player_o_won()
-                    pg.mixer.Sound.play(self.won_game_sound)
-                elif self.current_player == 2:
-                    self.show_player_x_won()
-                    pg.mixer.Sound.play(self.won_game_sound)
+                self.event_bus.emit(RoundWon(self.cabinet, self.session_id, self.current_player,
+                                             *self.get_round_summary(), self.get_winning_line()))
 
             elif self.check_for_draw():
                 self.handle_draw()
-                self.show_game_is_tie()
-                pg.mixer.Sound.play(self.won_game_sound)
+                self.event_bus.emit(RoundDrawn(self.cabinet, self.session_id, 0, *self.get_round_summary()))
 
             if not self.finished:
                 self.switch_players()
 
-                if self.current_player == 1:
-                    self.draw_player_o()
-
-                if self.current_player == 2:
-                    self.draw_player_x()
-
-                self.draw_life()
+                self.renderer.draw_current_player(self.current_player)
+                self.renderer.draw_life(self.remaining_chances)
 
             if self.computer_move:
-                self.show_computer_is_thinking()
+                self.renderer.show_computer_is_thinking()
 
             if self.remaining_chances == 0:
                 print('\nNo more chances left.')
-                if self.score[1] > self.score[2]:
-                    self.show_champion_player_o_window()
-                    pg.mixer.Sound.play(self.announce_champion_sound)
-                elif self.score[1] < self.score[2]:
-                    self.show_champion_player_x_window()
-                    pg.mixer.Sound.play(self.announce_champion_sound)
-                else:
-                    self.show_match_is_draw_window()
-                    pg.mixer.Sound.play(self.announce_champion_sound)
-
+                self.end_session(ChampionDecided(
+                    self.cabinet, self.session_id,
+                    1 if self.score[1] > self.score[2] else 2 if self.score[1] < self.score[2] else 0, dict(self.score)))
                 self.reset_game()
+                self.remove_snapshot()
+            else:
+                self.save_snapshot()
+
+        except Exception as e:
+            print('\n')
+            print(e)
+
+    def handle_back(self):
+        '''Handles the back button, undoes the last move and redraws only the cells that changed'''
+        try:
+            highlighted_position = self.navigation_button_position
+            if not self.undo():
+                return
+
+            # Clear the cell highlighted by the navigation button
+            if highlighted_position != 0 and self.leds[highlighted_position - 1].selected == 0:
+                self.leds[highlighted_position - 1].turn_off()
+                self.leds[highlighted_position - 1].stop_blinking()
+                self.renderer.draw_cell_not_selected(highlighted_position - 1)
+
+            if self.renderer.notification_in_screen:
+                self.renderer.clear_notification()
+
+            self.renderer.update_game_board(self.leds)
+            self.renderer.draw_current_player(self.current_player)
+            self.save_snapshot()
 
         except Exception as e:
             print('\n')
             print(e)
 
-    def handle_exit(self):
-        '''Handles the exit button'''
+    def handle_exit(self, welcome=True):
+        '''Handles the exit button
+        welcome: A boolean that represents whether the LEDs welcome the next player or not, False when the game is closed
+        '''
         try:
+            # The session was left before it had a champion
+            if self.started:
+                self.end_session(SessionLeft(self.cabinet, self.session_id, dict(self.score)))
+
             # Reset the self
             self.reset_game()
-            self.welcome()
+            self.remove_snapshot()
+            if welcome:
+                self.welcome()
         except Exception as e:
             print('\n')
             print(e)
@@ -987,8 +324,11 @@ class Game:
         '''Handles the play next chance button'''
         try:
             self.play_next_chance()
-            self.refresh_game_board()
-            pg.mixer.Sound.play(self.start_game_sound)
+            self.round_start_time = time.time()
+            self.renderer.refresh_game_board(
+                self.current_player, self.remaining_chances, self.score)
+            self.renderer.play_sound('start_game', self.press_time)
+            self.save_snapshot()
 
         except Exception as e:
             print('\n')
@@ -1004,109 +344,178 @@ class Game:
         self.can_get_input = False
         self.welcome()
         # Play the music
-        pg.mixer.music.play(-1)
-        self.show_loading_window()
-        self.show_choose_mode_window()
+        self.renderer.play_music()
+        self.renderer.show_loading_window()
+        self.renderer.show_choose_mode_window()
         self.can_get_input = True
         self.can_start_again = False
 
-    def play_button_click_sound(self):
-        '''Plays the button sound'''
-        pg.mixer.Sound.play(self.click_button_sound)
-
-# Functions
-
-
-def blink_all(leds, delay=0.1):
-    '''Blinks all the LEDs by turning them on and off after a delay
-    leds: the list of LED objects
-    delay: the delay between each blink
-    '''
-    current_time = time.time()
-    for led in leds:
-        if current_time - led.last_time_blinked >= delay and led.can_blink:
-            if led.state == 0:
-                led.turn_on()
-            else:
-                led.turn_off()
-
-            led.last_time_blinked = current_time
+    def get_round_summary(self):
+        '''Returns the round number, the first player, the positions played, the duration and the score of the round'''
+        return (self.chances - self.remaining_chances, self.player_played_first,
+                tuple(position for position, player, computer_move in self.move_history),
+                time.time() - self.round_start_time, dict(self.score))
 
+    def end_session(self, event):
+        '''Emits the end of the session, a ChampionDecided or SessionLeft event, and forgets the session'''
+        self.event_bus.emit(event)
+        self.session_id = None
 
-def play_tic_tac_toe(NAV_BUTTON_PIN, SELECT_BUTTON_PIN, BACK_BUTTON_PIN, LED_PINS,  board):
-    '''Plays the tic tac toe game
-    NAV_BUTTON_PIN: the pin number of the navigation button
-    SELECT_BUTTON_PIN: the pin number of the select button
-    LED_PINS: the dictionary of the LED pins
-    board: the pyfirmata board object
-    '''
+    def publish_state(self):
+        '''Publishes the state of the game to the spectators if it has changed, after the steps that changed it'''
+        if self.spectator_stream is not None:
+            self.spectator_stream.publish(self)
 
-    if not isinstance(NAV_BUTTON_PIN, int):
-        raise TypeError('NAV_BUTTON_PIN must be an integer')
-
-    if not isinstance(SELECT_BUTTON_PIN, int):
-        raise TypeError('SELECT_BUTTON_PIN must be an integer')
-
-    if not isinstance(LED_PINS, dict):
-        raise TypeError('LED_PINS must be a dictionary')
-
-    if not isinstance(board, Arduino):
-        raise TypeError('board must be a Arduino object')
+    def play_button_click_sound(self):
+        '''Plays the button sound'''
+        self.renderer.play_sound('click_button', self.press_time)
 
-    # variables
-    last_nav_button_state = False
-    last_select_button_state = False
-    last_back_button_state = False
 
-    try:
-        # Create a list of LED objects
-        leds = [Led(pin, board) for pin in LED_PINS.values()]
-    except Exception as e:
-        print('Error while creating the LED objects: {}'.format(e))
-        exit(1)
+    def stop_music(self):
+        '''Stops the music'''
+        self.renderer.stop_music()
 
-    # Set navigate button pin mode to INPUT_PULLUP
-    NAV_BUTTON = board.get_pin('d:{}:i'.format(NAV_BUTTON_PIN))
-    SELECT_BUTTON = board.get_pin('d:{}:i'.format(SELECT_BUTTON_PIN))
-    BACK_BUTTON = board.get_pin('d:{}:i'.format(BACK_BUTTON_PIN))
 
-    # Enable reporting for the buttons
-    NAV_BUTTON.enable_reporting()
-    SELECT_BUTTON.enable_reporting()
-    BACK_BUTTON.enable_reporting()
-    try:
-        # Create the Game object
-        ttt_game = Game(leds)
-    except Exception as e:
-        print('Error while creating the Game object: {}'.format(e))
-        exit(1)
-    # Start the game
-    ttt_game.welcome()
-    ttt_game.show_loading_window()
-    ttt_game.can_skip_instruction = True
-    ttt_game.can_get_input = True
-    ttt_game.show_instruction_window()
+class GameView:
+    '''Shows the events of a game on its renderer and plays their sounds, it is called in the game thread'''
 
-    # Main Loop
-    while True:
-        for event in pg.event.get():
-            if event.type == QUIT:
-                ttt_game.handle_exit()
-                pg.quit()
-                sys.exit()
+    def __init__(self, game):
+        '''Initializes the view
+        game: The Game whose renderer shows the events, the events of the other cabinets on the same bus are ignored
+        '''
+        self.game = game
+
+    def subscribe(self, event_bus):
+        '''Subscribes the view to the events of the bus, inline since pygame is driven from the game thread'''
+        event_bus.subscribe(SessionStarted, self.show_session_started)
+        event_bus.subscribe(MoveMade, self.show_move)
+        event_bus.subscribe(RoundWon, self.show_round_won)
+        event_bus.subscribe(RoundDrawn, self.show_round_drawn)
+        event_bus.subscribe(ChampionDecided, self.show_champion)
+
+    def is_shown(self, event):
+        '''Returns True if the event is of the game of the view'''
+        return event.cabinet == self.game.cabinet
+
+    def show_session_started(self, event):
+        '''Shows the game board of the new session'''
+        if self.is_shown(event):
+            game = self.game
+            game.renderer.refresh_game_board(game.current_player, game.remaining_chances, game.score)
+            game.renderer.play_sound('start_game', game.press_time)
+
+    def show_move(self, event):
+        '''Shows the selected cell'''
+        if self.is_shown(event):
+            self.game.renderer.update_game_board(self.game.leds)
+            self.game.renderer.play_sound('select', self.game.press_time)
+
+    def show_round_won(self, event):
+        '''Draws the winning line and shows the winner'''
+        if self.is_shown(event):
+            renderer = self.game.renderer
+            renderer.draw_win_line(event.line)
+            if event.winner == 1:
+                renderer.show_player_o_won()
+            else:
+                renderer.show_player_x_won()
+            renderer.play_sound('won_game', self.game.press_time)
+
+    def show_round_drawn(self, event):
+        '''Shows the tie'''
+        if self.is_shown(event):
+            self.game.renderer.show_game_is_tie()
+            self.game.renderer.play_sound('won_game', self.game.press_time)
+
+    def show_champion(self, event):
+        '''Shows the champion of the match'''
+        if self.is_shown(event):
+            renderer = self.game.renderer
+            if event.champion == 1:
+                renderer.show_champion_player_o_window()
+            elif event.champion == 2:
+                renderer.show_champion_player_x_window()
+            else:
+                renderer.show_match_is_draw_window()
+            renderer.play_sound('announce_champion', self.game.press_time)
+
+
+class GameLoop:
+    '''Reads the buttons of one board and dispatches the presses to its game'''
+
+    def __init__(self, game, nav_button, select_button, back_button, input_monitor=None, serial_writer=None,
+                 blink_interval=BLINK_INTERVAL):
+        '''Initializes the loop with the game and the button pins
+        game: The Game object
+        nav_button: The pyfirmata pin of the navigation button
+        select_button: The pyfirmata pin of the select button
+        back_button: The pyfirmata pin of the back button
+        input_monitor: The InputMonitor that measures the latency and turns the reporting of the buttons on and off,
+                       it is not used if it is None
+        serial_writer: The SerialWriter of the LEDs of the board, None if the LEDs are written directly
+        blink_interval: The time in seconds between the blinks of the LEDs
+        last_nav_button_state: The state of the navigation button in the previous step
+        last_select_button_state: The state of the select button in the previous step
+        last_back_button_state: The state of the back button in the previous step
+        step_count: The number of steps run
+        '''
+        self.game = game
+        self.nav_button = nav_button
+        self.select_button = select_button
+        self.back_button = back_button
+        self.input_monitor = input_monitor
+        self.serial_writer = serial_writer
+        self.blink_interval = blink_interval
+        self.last_nav_button_state = False
+        self.last_select_button_state = False
+        self.last_back_button_state = False
+        self.step_count = 0
+
+    def start(self):
+        '''Welcomes the player and shows the instructions, or resumes the session that was played before a restart'''
+        ttt_game = self.game
+        if not ttt_game.resume():
+            ttt_game.welcome()
+            ttt_game.renderer.show_loading_window()
+            ttt_game.can_skip_instruction = True
+            ttt_game.can_get_input = True
+            ttt_game.renderer.show_instruction_window()
+        ttt_game.publish_state()
+
+    def get_press_time(self, button):
+        '''Returns the time.perf_counter() the press of the button was read from the board, or now if it is not known'''
+        if self.input_monitor is not None:
+            message_time = self.input_monitor.message_times.get(button.port.port_number)
+            if message_time is not None:
+                return message_time
+        return time.perf_counter()
+
+    def step(self):
+        '''Runs one logic update: reads the buttons, runs the computer timer and blinks the LEDs'''
+        ttt_game = self.game
+        leds = ttt_game.leds
 
         random_computer_thinking_time = random.randint(
             1, ttt_game.computer_move_delay)
 
-        current_time = time.time()
+        current_time = ttt_game.clock()
         # Read the buttons' states
-        nav_button_state = NAV_BUTTON.read()
-        select_button_state = SELECT_BUTTON.read()
-        back_button_state = BACK_BUTTON.read()
-
-        nav_button_pressed = ttt_game.can_get_input and nav_button_state and last_nav_button_state != nav_button_state
-        select_button_pressed = ttt_game.can_get_input and select_button_state and last_select_button_state != select_button_state and ttt_game.can_use_select_button
-        back_button_pressed = ttt_game.can_get_input and back_button_state and last_back_button_state != back_button_state
+        nav_button_state = self.nav_button.read()
+        select_button_state = self.select_button.read()
+        back_button_state = self.back_button.read()
+
+        nav_button_pressed = ttt_game.can_get_input and nav_button_state and self.last_nav_button_state != nav_button_state
+        select_button_pressed = ttt_game.can_get_input and select_button_state and self.last_select_button_state != select_button_state and ttt_game.can_use_select_button
+        back_button_pressed = ttt_game.can_get_input and back_button_state and self.last_back_button_state != back_button_state
+
+        # Measure the latency of the presses and stamp the press time the sounds of this step are measured from
+        ttt_game.press_time = None
+        for button, pressed in ((self.nav_button, nav_button_pressed), (self.select_button, select_button_pressed),
+                                (self.back_button, back_button_pressed)):
+            if pressed:
+                ttt_game.press_time = self.get_press_time(button)
+                if self.input_monitor is not None:
+                    self.input_monitor.record_press(button)
 
         can_skip_instruction = nav_button_pressed and not ttt_game.started and ttt_game.can_skip_instruction
         can_start_again = nav_button_pressed and ttt_game.can_start_again
@@ -1125,20 +534,20 @@ def play_tic_tac_toe(NAV_BUTTON_PIN, SELECT_BUTTON_PIN, BACK_BUTTON_PIN, LED_PIN
 
         if can_skip_instruction:
             ttt_game.play_button_click_sound()
-            ttt_game.show_choose_mode_window()
+            ttt_game.renderer.show_choose_mode_window()
             ttt_game.can_use_select_button = True
             ttt_game.can_skip_instruction = False
 
-            last_nav_button_state = nav_button_state
+            self.last_nav_button_state = nav_button_state
 
-        if can_start_again and last_nav_button_state != nav_button_state:
+        if can_start_again and self.last_nav_button_state != nav_button_state:
             ttt_game.play_button_click_sound()
             ttt_game.handle_start_again()
 
-            last_nav_button_state = nav_button_state
+            self.last_nav_button_state = nav_button_state
 
         # If the game is not started, then
-        if human_vs_human and last_nav_button_state != nav_button_state:
+        if human_vs_human and self.last_nav_button_state != nav_button_state:
             ttt_game.play_button_click_sound()
             ttt_game.stop_music()
             ttt_game.start_game()
@@ -1165,7 +574,7 @@ def play_tic_tac_toe(NAV_BUTTON_PIN, SELECT_BUTTON_PIN, BACK_BUTTON_PIN, LED_PIN
             ttt_game.play_button_click_sound()
             ttt_game.handle_play_next_chance()
 
-            last_nav_button_state = nav_button_state
+            self.last_nav_button_state = nav_button_state
 
         # If the navigation button state has changed and the game is not finished, then
         if can_nav:
@@ -1176,14 +585,220 @@ def play_tic_tac_toe(NAV_BUTTON_PIN, SELECT_BUTTON_PIN, BACK_BUTTON_PIN, LED_PIN
         if can_select:
             ttt_game.handle_selection()
 
+        # If the back button state has changed and the game is not finished, then
+        if can_go_back:
+            ttt_game.handle_back()
+
         # Update the last button states
-        last_nav_button_state = nav_button_state
-        last_select_button_state = select_button_state
-        last_back_button_state = back_button_state
+        self.last_nav_button_state = nav_button_state
+        self.last_select_button_state = select_button_state
+        self.last_back_button_state = back_button_state
 
         # Blink all the LEDs which are enabled to blink
-        blink_all(leds)
+        blink_all(leds, self.blink_interval, ttt_game.clock)
+
+        # Send the changes of the game to the spectators, the state only changes on a press or a computer move
+        if nav_button_pressed or select_button_pressed or back_button_pressed or can_computer_play:
+            ttt_game.publish_state()
+
+        # Turn off the reporting of the buttons that are ignored on this screen
+        if self.input_monitor is not None:
+            self.input_monitor.update_reporting(self.get_needed_buttons())
+
+        self.step_count += 1
+
+    def reconnect(self, board):
+        '''Reads the buttons from the reconnected board
+        board: The new Arduino board object
+        '''
+        self.nav_button = board.get_pin('d:{}:i'.format(self.nav_button.pin_number))
+        self.select_button = board.get_pin('d:{}:i'.format(self.select_button.pin_number))
+        self.back_button = board.get_pin('d:{}:i'.format(self.back_button.pin_number))
+
+        buttons = [self.nav_button, self.select_button, self.back_button]
+        for button in buttons:
+            button.enable_reporting()
+
+        if self.input_monitor is not None:
+            self.input_monitor = InputMonitor(board, buttons, self.serial_writer, self.input_monitor.latency_target)
+
+    def get_needed_buttons(self):
+        '''Returns the buttons the game can act on in its current state'''
+        ttt_game = self.game
+        if not ttt_game.can_get_input:
+            return []
+        if not ttt_game.started:
+            if ttt_game.can_use_select_button:
+                return [self.nav_button, self.select_button]
+            return [self.nav_button]
+        if ttt_game.finished:
+            return [self.nav_button, self.select_button]
+        if ttt_game.computer_move:
+            return [self.back_button]
+        return [self.nav_button, self.select_button, self.back_button]
+
+# Functions
+
+
+def blink_all(leds, delay=0.1, clock=time.time):
+    '''Blinks all the LEDs by turning them on and off after a delay
+    leds: the list of LED objects
+    delay: the delay between each blink
+    clock: the function that returns the current time in seconds
+    '''
+    current_time = clock()
+    for led in leds:
+        if current_time - led.last_time_blinked >= delay and led.can_blink:
+            if led.state == 0:
+                led.turn_on()
+            else:
+                led.turn_off()
+
+            led.last_time_blinked = current_time
+
+
+def get_move_cache():
+    '''Returns the move cache shared by all the games of the process, it is loaded from its file the first time'''
+    global move_cache
+    if move_cache is None:
+        move_cache = MoveCache(file_name=CACHE_FILE)
+    return move_cache
+
+
+def get_session_store():
+    '''Returns the session store shared by all the games of the process, the queued writes are saved at exit'''
+    global session_store
+    if session_store is None:
+        session_store = SessionStore(STORE_FILE)
+        atexit.register(session_store.close)
+    return session_store
+
+
+def create_game_loop(config, board, renderer=None, session_store=None, spectator_stream=None, snapshot_file=None,
+                     computer_player=None, event_bus=None):
+    '''Creates the LEDs, the buttons and the game of one board and returns its GameLoop
+    config: the CabinetConfig with the pins and the timing of the board, it was checked when it was loaded
+    board: the pyfirmata board object
+    renderer: the Renderer that shows the game, a pygame window is opened if it is None
+    session_store: the SessionStore the sessions are recorded in, the store of the process is used if it is None
+    spectator_stream: the SpectatorStream the state of the game is published to, it is not published if it is None
+    snapshot_file: the file the session is saved to so it is resumed after a restart, it is not saved if it is None
+    computer_player: the function that returns the move of the computer, the cached heuristic is used if it is None
+    event_bus: the EventBus the events of the game are emitted on, a bus of the game is made if it is None
+    '''
+
+    if not isinstance(board, Arduino):
+        raise TypeError('board must be a Arduino object')
+
+    # Resolve the pins of the LEDs and the buttons once
+    pin_table = PinTable(board, config)
+
+    # Write the LEDs from a background thread that reconnects the board when the link drops
+    serial_writer = SerialWriter(board)
+
+    try:
+        # Create a list of LED objects
+        leds = [Led(pin, board, serial_writer, pin_table.leds[pin]) for pin in config.led_pins.values()]
+    except Exception as e:
+        print('Error while creating the LED objects: {}'.format(e))
+        exit(1)
+
+    buttons = [pin_table.nav_button, pin_table.select_button, pin_table.back_button]
+
+    # Enable reporting for the buttons
+    for button in buttons:
+        button.enable_reporting()
+    try:
+        # Create the Game object
+        ttt_game = Game(leds, renderer, computer_player or get_move_cache().computer_move,
+                        session_store or get_session_store(), board.name, spectator_stream, snapshot_file, event_bus)
+        ttt_game.computer_move_delay = config.computer_move_delay
+    except Exception as e:
+        print('Error while creating the Game object: {}'.format(e))
+        exit(1)
+
+    # Measure the input latency and turn off the reporting of the buttons that are not used
+    input_monitor = InputMonitor(board, buttons, serial_writer, config.input_latency_target)
+
+    game_loop = GameLoop(ttt_game, *buttons, input_monitor, serial_writer, config.blink_interval)
+    serial_writer.add_reconnect_handler(game_loop.reconnect)
+    return game_loop
+
+
+def play_tic_tac_toe(config, board, trace_file=None, spectator_hub=None, snapshot_file=None, renderer=None,
+                     screen_size=None, computer_player=None):
+    '''Plays the tic tac toe game
+    config: the CabinetConfig with the pins and the timing of the board
+    board: the pyfirmata board object
+    trace_file: the file the button presses are recorded to so they can be replayed, nothing is recorded if it is None
+    spectator_hub: the host and port of the spectator hub the game is streamed to as the cabinet number of the config,
+                   it is not streamed if it is None
+    snapshot_file: the file the session is saved to so it is resumed after a restart, it is not saved if it is None
+    renderer: the Renderer that shows the game, a pygame window with the debug overlay is opened if it is None
+    screen_size: the width and height of the pygame window, 1200x800 if it is None
+    computer_player: the function that returns the move of the computer, the cached heuristic is used if it is None
+    '''
+    pygame_window = renderer is None
+    if pygame_window:
+        from renderer import PygameRenderer
+        renderer = PygameRenderer(size=screen_size)
+
+    spectator_stream = None
+    if spectator_hub is not None:
+        spectator_stream = SpectatorStream(config.cabinet, board.name, spectator_hub)
 
-        pg.display.update()
+    game_loop = create_game_loop(config, board, renderer, spectator_stream=spectator_stream,
+                                 snapshot_file=snapshot_file, computer_player=computer_player)
+
+    # Record the button edges and the LED writes of the session
+    trace_recorder = None
+    if trace_file is not None:
+        trace_recorder = TraceRecorder(game_loop, config.update_interval, config.led_pins,
+                                       config.nav_button_pin, config.select_button_pin, config.back_button_pin)
+
+    # Start the game
+    game_loop.start()
+    telemetry = Telemetry(game_loop, config.fps) if pygame_window else None
+
+    def quit_game():
+        '''Leaves the session, saves the trace and exits'''
+        game_loop.game.handle_exit(welcome=False)
+        if trace_recorder is not None:
+            trace_recorder.save(trace_file)
+        pg.quit()
+        sys.exit()
+
+    # Main Loop
+    # The logic is updated every update interval and the screen is rendered fps times per second,
+    # so the timing of the buttons, the blinks and the computer does not depend on the rendering
+    next_update_time = time.perf_counter()
+    next_render_time = next_update_time
+    while True:
+        current_time = time.perf_counter()
+
+        if current_time >= next_update_time:
+            game_loop.step()
+            if telemetry is not None:
+                telemetry.record_update()
+
+            # After a long stall the missed updates are skipped instead of run all at once
+            next_update_time = max(next_update_time + config.update_interval,
+                                   current_time - MAX_UPDATE_LAG)
+
+        if current_time >= next_render_time:
+            if pygame_window:
+                for event in pg.event.get():
+                    if event.type == QUIT:
+                        quit_game()
+                    telemetry.handle_event(event)
+
+                telemetry.record_frame()
+                renderer.render(telemetry if telemetry.visible else None)
+            else:
+                if renderer.is_closed():
+                    quit_game()
+                renderer.render()
+            next_render_time = max(
+                next_render_time + 1 / config.fps, current_time)
 
-        # fps_clock.tick(FPS)
+        time.sleep(max(0, min(next_update_time, next_render_time) - time.perf_counter()))
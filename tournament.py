@@ -0,0 +1,241 @@
+# Plays every registered computer player against every other one and rates them
+# The matches are split into batches that are played by a pool of worker processes, each game with the
+# rules of GameRules and the first player alternating between the games of a match
+# The results give Elo ratings (Bradley-Terry fit, anchored on the heuristic of do_computer_move) with
+# bootstrap confidence intervals, and the time of every move gives the latency distribution of each player
+# The exit code is 1 when the gated player is worse than the heuristic or plays an illegal move
+#
+# Usage: python tournament.py [--games N] [--processes N] [--gate NAME] [--value-table FILE]
+
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from game_core import Cell, GameRules, computer_players, register_computer_player
+import move_cache  # registers the cached player
+from tablebase import Tablebase, get_table_file_name
+
+# Constants
+GAMES_PER_PAIR = 200
+BATCH_SIZE = 50
+BOOTSTRAP_SAMPLES = 200
+ANCHOR_PLAYER = 'heuristic'
+ANCHOR_ELO = 1500
+
+# Functions
+
+
+def register_players(tablebase_file, value_table_file=None):
+    '''Registers the players that need a file, it runs in every worker process
+    tablebase_file: the 3x3 tablebase file, the perfect player is registered if it exists
+    value_table_file: the 3x3 value table of value_learning.py, the learned player is registered if it exists
+    '''
+    if tablebase_file is not None and os.path.exists(tablebase_file):
+        register_computer_player(
+            'tablebase', Tablebase(tablebase_file).computer_move)
+    if value_table_file is not None and os.path.exists(value_table_file):
+        # NumPy is only needed when there is a learned player
+        from value_learning import LearnedPlayer
+        register_computer_player(
+            'learned', LearnedPlayer(value_table_file).computer_move)
+
+
+def get_player_view(game_board, player):
+    '''Returns the board as seen by a computer player, which always plays as player 2'''
+    if player == 2:
+        return game_board
+    return [(0, 2, 1)[value] for value in game_board]
+
+
+def play_batch(task):
+    '''Plays a batch of games between two players and returns the results
+    task: the names of the players, the number of games, the player that starts the first game and the seed
+    Returns the names, the list of the scores of the first player (1, 0.5 or 0), the move times of each
+    player and the number of illegal moves of each player
+    '''
+    names, games, first_player, seed = task
+    random.seed(seed)
+    players = {1: computer_players[names[0]], 2: computer_players[names[1]]}
+    move_times = {1: [], 2: []}
+    illegal_moves = {1: 0, 2: 0}
+    scores = []
+
+    game = GameRules([Cell() for _ in range(9)])
+    game.started = True
+    for i in range(games):
+        # The first player alternates like play_next_chance, also after a win
+        game.play_next_chance()
+        game.current_player = first_player if i % 2 == 0 else 3 - first_player
+        game.player_played_first = game.current_player
+
+        winner = 0
+        while not game.finished:
+            player = game.current_player
+            game_board = [led.selected for led in game.leds]
+            start_time = time.perf_counter()
+            position = players[player](get_player_view(game_board, player))
+            move_times[player].append(time.perf_counter() - start_time)
+
+            # A move on an occupied cell would be ignored by select, so it loses the game
+            if position not in range(1, 10) or game_board[position - 1] != 0:
+                illegal_moves[player] += 1
+                winner = 3 - player
+                break
+
+            game.play_position(position)
+            if game.finished and game.check_for_win():
+                winner = player
+
+        scores.append(1 if winner == 1 else 0 if winner == 2 else 0.5)
+    return names, scores, move_times, illegal_moves
+
+
+def fit_ratings(names, results):
+    '''Returns the Elo rating of every player from the results of the matches
+    names: the list of the names of the players
+    results: a dictionary of the pairs of names and the list of the scores of the first name
+    '''
+    # Every pair gets a virtual draw so that a player that never scores keeps a finite rating
+    wins = {name: 0 for name in names}
+    games = {}
+    for (name_a, name_b), scores in results.items():
+        wins[name_a] += sum(scores) + 0.5
+        wins[name_b] += len(scores) - sum(scores) + 0.5
+        games[name_a, name_b] = games[name_b, name_a] = len(scores) + 1
+
+    # Minorization-maximization of the Bradley-Terry model
+    strengths = {name: 1.0 for name in names}
+    for _ in range(100):
+        for name in names:
+            denominator = sum(count / (strengths[name] + strengths[other])
+                              for (player, other), count in games.items() if player == name)
+            if denominator > 0:
+                strengths[name] = wins[name] / denominator
+
+    anchor = ANCHOR_PLAYER if ANCHOR_PLAYER in names else names[0]
+    return {name: ANCHOR_ELO + 400 * math.log10(strengths[name] / strengths[anchor]) for name in names}
+
+
+def get_confidence_intervals(names, results, samples=BOOTSTRAP_SAMPLES):
+    '''Returns the 95% confidence interval of the rating of every player by resampling the games'''
+    ratings = {name: [] for name in names}
+    for _ in range(samples):
+        resampled_results = {pair: random.choices(scores, k=len(scores))
+                             for pair, scores in results.items()}
+        for name, rating in fit_ratings(names, resampled_results).items():
+            ratings[name].append(rating)
+
+    intervals = {}
+    for name in names:
+        ratings[name].sort()
+        intervals[name] = (ratings[name][int(samples * 0.025)],
+                           ratings[name][int(samples * 0.975) - 1])
+    return intervals
+
+
+def get_percentile(values, percentile):
+    '''Returns the percentile of the sorted values'''
+    return values[min(len(values) - 1, len(values) * percentile // 100)]
+
+
+def run_tournament(names, games_per_pair, processes=None, tablebase_file=None, value_table_file=None):
+    '''Plays every player against every other one in a process pool
+    Returns the results of the matches, the move times and the illegal moves of every player and the elapsed time
+    '''
+    tasks = []
+    seed = 0
+    for pair in itertools.combinations(names, 2):
+        for start in range(0, games_per_pair, BATCH_SIZE):
+            # Every batch starts with the other player, so odd batch sizes stay balanced
+            first_player = 1 if start // BATCH_SIZE % 2 == 0 else 2
+            tasks.append((pair, min(BATCH_SIZE, games_per_pair - start),
+                         first_player, seed))
+            seed += 1
+
+    results = {pair: [] for pair in itertools.combinations(names, 2)}
+    move_times = {name: [] for name in names}
+    illegal_moves = {name: 0 for name in names}
+
+    start_time = time.perf_counter()
+    with multiprocessing.Pool(processes, register_players, (tablebase_file, value_table_file)) as pool:
+        for pair, scores, batch_move_times, batch_illegal_moves in pool.imap_unordered(play_batch, tasks):
+            results[pair].extend(scores)
+            for player, name in zip((1, 2), pair):
+                move_times[name].extend(batch_move_times[player])
+                illegal_moves[name] += batch_illegal_moves[player]
+    elapsed_time = time.perf_counter() - start_time
+
+    return results, move_times, illegal_moves, elapsed_time
+
+
+def print_report(names, results, move_times, illegal_moves, elapsed_time):
+    '''Prints the ratings, the results and the latencies of the players and returns the ratings and intervals'''
+    ratings = fit_ratings(names, results)
+    intervals = get_confidence_intervals(names, results)
+
+    games = sum(len(scores) for scores in results.values())
+    moves = sum(len(times) for times in move_times.values())
+    print('Games: {} in {:.1f} s ({:.0f} games per second, {:.0f} moves per second)'.format(
+        games, elapsed_time, games / elapsed_time, moves / elapsed_time))
+
+    print('\n{:<12}{:>8}{:>18}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+        'Player', 'Elo', '95% interval', 'Illegal', 'p50 us', 'p90 us', 'p99 us', 'Max us'))
+    for name in sorted(names, key=ratings.get, reverse=True):
+        times = sorted(move_times[name])
+        print('{:<12}{:>8.0f}{:>18}{:>10}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}'.format(
+            name, ratings[name], '[{:.0f}, {:.0f}]'.format(*intervals[name]), illegal_moves[name],
+            get_percentile(times, 50) * 1e6, get_percentile(times, 90) * 1e6,
+            get_percentile(times, 99) * 1e6, times[-1] * 1e6))
+
+    print('\n{:<26}{:>8}{:>8}{:>8}'.format('Match', 'Wins', 'Draws', 'Losses'))
+    for (name_a, name_b), scores in results.items():
+        print('{:<26}{:>8}{:>8}{:>8}'.format('{} - {}'.format(name_a, name_b),
+              scores.count(1), scores.count(0.5), scores.count(0)))
+
+    return ratings, intervals
+
+
+# Main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Play the computer players against each other')
+    parser.add_argument('--games', type=int, default=GAMES_PER_PAIR,
+                        help='the number of games of every pair of players')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='the number of worker processes, all the cores by default')
+    parser.add_argument('--players', nargs='+', default=None,
+                        help='the names of the players, all the registered players by default')
+    parser.add_argument('--tablebase', default=get_table_file_name(3),
+                        help='the 3x3 tablebase file of the perfect player')
+    parser.add_argument('--value-table', default='value_table_3x3.npy',
+                        help='the 3x3 value table of the learned player')
+    parser.add_argument('--gate', default=None,
+                        help='exit with 1 if this player is worse than the heuristic or plays an illegal move')
+    args = parser.parse_args()
+
+    register_players(args.tablebase, args.value_table)
+    names = args.players or list(computer_players)
+    for name in names:
+        if name not in computer_players:
+            print('Unknown player {}, the players are {}'.format(
+                name, ', '.join(computer_players)))
+            sys.exit(2)
+    if len(names) < 2:
+        print('A tournament needs at least 2 players')
+        sys.exit(2)
+
+    results, move_times, illegal_moves, elapsed_time = run_tournament(
+        names, args.games, args.processes, args.tablebase, args.value_table)
+    ratings, intervals = print_report(
+        names, results, move_times, illegal_moves, elapsed_time)
+
+    if args.gate is not None:
+        # The gated player fails if its whole interval is under the rating of the heuristic (the anchor)
+        if illegal_moves.get(args.gate, 0) > 0 or intervals[args.gate][1] < ANCHOR_ELO:
+            print('\n{} failed the gate'.format(args.gate))
+            sys.exit(1)
+        print('\n{} passed the gate'.format(args.gate))
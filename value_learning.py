@@ -0,0 +1,257 @@
+# Learns a value table of the positions by reinforcement learning and plays with it as a computer player
+# The value of a position is the result the player who just moved gets from it (1 win, 0 draw, -1 loss), stored
+# once for the canonical board (the smallest of its rotations and reflections) with the pieces of that player as 1
+# Whole batches of self-play games, and the rounds recorded in the session store, are played and scored at once
+# with NumPy, and every position of a batch moves towards the mean result of its games in one update
+# The table is saved as a .npy file and read with a memory map, so the computer player starts at once
+#
+# Usage: python value_learning.py [--size N] [--episodes N] [--sessions FILE] [--file FILE]
+
+import argparse
+import math
+import os
+import random
+import time
+import numpy as np
+
+# Constants
+EPISODES = 100000
+BATCH_SIZE = 2000
+LEARNING_RATE = 0.2
+START_EXPLORATION = 0.5
+END_EXPLORATION = 0.05
+# The view of a board by the other player, its pieces become 1 and the opponent's pieces 2
+SWAP_PLAYERS = np.array([0, 2, 1], dtype=np.int8)
+
+# Functions
+
+
+def get_table_file_name(size):
+    '''Returns the default file name of the value table of the board size'''
+    return 'value_table_{0}x{0}.npy'.format(size)
+
+
+def get_symmetries(size):
+    '''Returns the 8 rotations and reflections of the board as an array of cell indexes
+    The cell i of a transformed board is the cell symmetry[i] of the original board
+    '''
+    cells = np.arange(size * size).reshape(size, size)
+    symmetries = []
+    for turns in range(4):
+        rotated = np.rot90(cells, turns)
+        symmetries.append(rotated.ravel())
+        symmetries.append(np.fliplr(rotated).ravel())
+    return np.array(symmetries)
+
+
+def get_lines(size):
+    '''Returns the cells of the rows, columns and diagonals of the board as an array'''
+    cells = np.arange(size * size).reshape(size, size)
+    return np.array(list(cells) + list(cells.T) + [cells.diagonal(), np.fliplr(cells).diagonal()])
+
+
+def get_size(table):
+    '''Returns the number of cells of a side of the board of a value table'''
+    cells = round(math.log(len(table), 3))
+    size = math.isqrt(cells)
+    if 3 ** cells != len(table) or size * size != cells:
+        raise ValueError('a value table has 3 ** (size * size) values')
+    return size
+
+
+def create_table(size, file_name):
+    '''Creates a value table of zeros for the board size, memory mapped from the file'''
+    return np.lib.format.open_memmap(file_name, mode='w+', dtype=np.float32, shape=(3 ** (size * size),))
+
+
+def play_self_play_games(table, positions, games, exploration, rng):
+    '''Plays a batch of games of the table against itself
+    exploration: The probability of a random move instead of the best one
+    Returns the canonical position after every move of every game (-1 after the end) and the winner of every game
+    '''
+    boards = np.zeros((games, positions.cells), dtype=np.int8)
+    moves = np.full((games, positions.cells), -1, dtype=np.int64)
+    winners = np.zeros(games, dtype=np.int8)
+    playing = np.arange(games)
+    for turn in range(positions.cells):
+        player = 1 if turn % 2 == 0 else 2
+        board = boards[playing]
+        next_positions = positions.get_moves(board if player == 1 else SWAP_PLAYERS[board])
+
+        # The best free cell, the ties and the exploring games are broken at random
+        noise = rng.random(next_positions.shape)
+        scores = np.where(rng.random(len(playing))[:, None] < exploration, noise,
+                          table[next_positions] + noise * 1e-3)
+        cells = np.where(board == 0, scores, -np.inf).argmax(axis=1)
+
+        boards[playing, cells] = player
+        moves[playing, turn] = next_positions[np.arange(len(playing)), cells]
+        won = positions.has_line(boards[playing], player)
+        winners[playing[won]] = player
+        playing = playing[~won]
+        if len(playing) == 0:
+            break
+    return moves, winners
+
+
+def replay_games(positions, games):
+    '''Replays recorded games
+    games: The lists of the positions from 1 played in every game, the first player can be either player
+    Returns the canonical position after every move of every complete game (-1 after the end) and its winner
+    '''
+    played = np.full((len(games), positions.cells), -1, dtype=np.int64)
+    for i, game in enumerate(games):
+        played[i, :len(game)] = np.array(game[:positions.cells]) - 1
+
+    boards = np.zeros(played.shape, dtype=np.int8)
+    moves = np.full(played.shape, -1, dtype=np.int64)
+    winners = np.zeros(len(games), dtype=np.int8)
+    playing = np.arange(len(games))
+    for turn in range(positions.cells):
+        # The players are named by their turn, 1 for the first one, the table is seen by the player to move
+        player = 1 if turn % 2 == 0 else 2
+        cells = played[playing, turn]
+        board = boards[playing]
+        legal = cells >= 0
+        rows = np.flatnonzero(legal)
+        legal[rows] = board[rows, cells[rows]] == 0
+        playing, cells, board = playing[legal], cells[legal], board[legal]
+        if len(playing) == 0:
+            break
+
+        next_positions = positions.get_moves(board if player == 1 else SWAP_PLAYERS[board])
+        boards[playing, cells] = player
+        moves[playing, turn] = next_positions[np.arange(len(playing)), cells]
+        won = positions.has_line(boards[playing], player)
+        winners[playing[won]] = player
+        playing = playing[~won]
+
+    # A game that stops before a line or a full board is not learned
+    complete = (winners != 0) | (moves >= 0).all(axis=1)
+    return moves[complete], winners[complete]
+
+
+def update_table(table, moves, winners, learning_rate):
+    '''Moves the value of every position of the games towards the mean result of the player who moved there
+    moves: The canonical positions of the games by turn, -1 after the end of a game
+    winners: The winner of every game (the player of the first turn is 1), 0 for a draw
+    '''
+    movers = np.where(np.arange(moves.shape[1]) % 2 == 0, 1, 2)
+    results = np.where(winners[:, None] == 0, 0, np.where(winners[:, None] == movers[None, :], 1, -1))
+    played = moves >= 0
+    indexes, inverse = np.unique(moves[played], return_inverse=True)
+    errors = np.bincount(inverse, weights=results[played] - table[moves[played]])
+    counts = np.bincount(inverse)
+    table[indexes] += learning_rate * errors / counts
+
+
+def train(table, episodes=EPISODES, recorded_games=(), batch_size=BATCH_SIZE, learning_rate=LEARNING_RATE, seed=None):
+    '''Trains the value table by self-play and on the recorded games
+    episodes: The number of self-play games, the exploration goes down from START_EXPLORATION to END_EXPLORATION
+    recorded_games: The lists of the positions from 1 played in recorded games, they are learned before self-play
+    '''
+    positions = Positions(get_size(table))
+    rng = np.random.default_rng(seed)
+    for start in range(0, len(recorded_games), batch_size):
+        update_table(table, *replay_games(positions, recorded_games[start:start + batch_size]), learning_rate)
+
+    batches = max(1, math.ceil(episodes / batch_size))
+    for batch in range(batches):
+        exploration = START_EXPLORATION + (END_EXPLORATION - START_EXPLORATION) * batch / max(1, batches - 1)
+        games = min(batch_size, episodes - batch * batch_size)
+        if games > 0:
+            update_table(table, *play_self_play_games(table, positions, games, exploration, rng), learning_rate)
+
+
+def load_recorded_games(file_name):
+    '''Returns the moves of the rounds recorded in a session store file, an empty list if there is no file'''
+    if not os.path.exists(file_name):
+        return []
+    from session_store import SessionStore
+    store = SessionStore(file_name)
+    try:
+        return [[int(position) for position in moves] for moves in store.get_round_moves()]
+    finally:
+        store.close()
+
+# Classes
+
+
+class Positions:
+    '''Finds the canonical positions a batch of boards can move to'''
+
+    def __init__(self, size):
+        '''Prepares the symmetries of the board size
+        size: The number of cells of a side of the board
+        powers: The value of a piece 1 on every cell in the index of a board, the board read as a base 3 number
+        placed: The index added by a piece 1 on every cell, in every symmetry of the board
+        lines: The cells of the rows, columns and diagonals
+        '''
+        self.size = size
+        self.cells = size * size
+        self.powers = 3 ** np.arange(self.cells, dtype=np.int64)
+        self.symmetries = get_symmetries(size)
+        # A piece on the cell j is on the cell inverse[s][j] of the board transformed by the symmetry s
+        inverse = np.argsort(self.symmetries, axis=1)
+        self.placed = self.powers[inverse].T
+        self.lines = get_lines(size)
+
+    def get_moves(self, views):
+        '''Returns the index of the canonical board after a move on every cell, for every board
+        views: The boards seen by the player to move, its pieces are 1, shape (boards, cells)
+        '''
+        indexes = views[:, self.symmetries].astype(np.int64) @ self.powers
+        return (indexes[:, None, :] + self.placed[None, :, :]).min(axis=2)
+
+    def has_line(self, boards, player):
+        '''Returns for every board whether the player fills a line or not'''
+        return (boards[:, self.lines] == player).all(axis=2).any(axis=1)
+
+    def get_views(self, boards, players):
+        '''Returns the boards seen by the player to move of each board'''
+        return np.where((players == 1)[:, None], boards, SWAP_PLAYERS[boards])
+
+
+class LearnedPlayer:
+    '''Plays the moves with the best learned value, read from a memory mapped value table'''
+
+    def __init__(self, file_name):
+        '''Opens the value table file
+        file_name: The file saved by the training
+        '''
+        self.table = np.load(file_name, mmap_mode='r')
+        self.positions = Positions(get_size(self.table))
+
+    def computer_move(self, game_board, symbol=2):
+        '''Returns the position the computer plays, it can be used as the computer player of a game'''
+        if 0 not in game_board:
+            raise Exception('All LEDs are selected')
+        view = np.array([game_board], dtype=np.int8)
+        if symbol != 1:
+            view = SWAP_PLAYERS[view]
+        values = np.where(view[0] == 0, self.table[self.positions.get_moves(view)[0]], -np.inf)
+        return random.choice(np.flatnonzero(values == values.max()).tolist()) + 1
+
+
+# Main function
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the value table of the learned computer player')
+    parser.add_argument('--size', type=int, default=3, help='the number of cells of a side of the board')
+    parser.add_argument('--episodes', type=int, default=EPISODES, help='the number of self-play games')
+    parser.add_argument('--sessions', default='sessions.db',
+                        help='the session store whose recorded rounds are learned first')
+    parser.add_argument('--file', default=None, help='the file the value table is saved to')
+    args = parser.parse_args()
+
+    file_name = args.file or get_table_file_name(args.size)
+    recorded_games = load_recorded_games(args.sessions) if args.size == 3 else []
+    start_time = time.perf_counter()
+
+    # The table is trained in a new file that replaces the old one at once, so a running game keeps its map
+    table = create_table(args.size, file_name + '.tmp')
+    train(table, args.episodes, recorded_games)
+    table.flush()
+    del table
+    os.replace(file_name + '.tmp', file_name)
+    print('Learned {} recorded rounds and {} self-play games in {:.1f} s, saved the table to {}'.format(
+        len(recorded_games), args.episodes, time.perf_counter() - start_time, file_name))